@@ -3,12 +3,56 @@
 提供统一的API接口，支持多种AI服务提供商。
 """
 
+import importlib
+
 from api_providers.base import BaseAPIProvider
-from api_providers.deepseek_provider import DeepSeekProvider
-from api_providers.openai_provider import OpenAIProvider
+from api_providers.errors import (
+    ProviderError,
+    ProviderTimeoutError,
+    ProviderUnavailableError,
+    ProviderRateLimitError,
+    CircuitOpenError,
+    ProviderAuthError,
+    ProviderBadRequestError,
+)
+
+# 具体的提供者在第一次访问时才导入（openai、anthropic SDK 导入很慢，只加载实际用到的）
+_LAZY_EXPORTS = {
+    'DeepSeekProvider': 'api_providers.deepseek_provider',
+    'OpenAIProvider': 'api_providers.openai_provider',
+    'AnthropicProvider': 'api_providers.anthropic_provider',
+    'MockProvider': 'api_providers.mock_provider',
+    'RouterProvider': 'api_providers.router_provider',
+    'create_provider': 'api_providers.factory',
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_EXPORTS))
 
 __all__ = [
     'BaseAPIProvider',
     'DeepSeekProvider',
     'OpenAIProvider',
+    'AnthropicProvider',
+    'MockProvider',
+    'RouterProvider',
+    'create_provider',
+    # 异常
+    'ProviderError',
+    'ProviderTimeoutError',
+    'ProviderUnavailableError',
+    'ProviderRateLimitError',
+    'CircuitOpenError',
+    'ProviderAuthError',
+    'ProviderBadRequestError',
 ]
\ No newline at end of file
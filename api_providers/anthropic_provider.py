@@ -0,0 +1,233 @@
+"""Anthropic Claude API提供者"""
+from typing import List, Dict, Optional, Iterator, Tuple, Any
+from anthropic import Anthropic, AsyncAnthropic
+from config import Config
+from .base import BaseAPIProvider
+from .errors import translate_anthropic_error
+from .resilience import get_circuit_breaker, call_with_resilience, async_call_with_resilience
+
+
+class AnthropicProvider(BaseAPIProvider):
+    """
+    Anthropic Claude API提供者实现（Messages API）
+    
+    人设和长期记忆组成的系统提示在每轮对话中都相同且较长，这里把它作为带 cache_control 的
+    system 块发送，后续请求命中提示缓存，按缓存读取计费并跳过重复处理。
+    """
+    
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        prompt_cache: Optional[bool] = None
+    ):
+        """
+        初始化Anthropic提供者
+        
+        Args:
+            api_key: Anthropic API密钥
+            model: 模型名称（如 claude-3-sonnet-20240229）
+            base_url: 可选的API端点，为空时使用官方端点（可指向本地模拟服务）
+            max_tokens: 最大输出 token 数，默认读取配置
+            prompt_cache: 是否对系统提示启用提示缓存，默认读取配置
+        """
+        super().__init__(api_key, model)
+        self.base_url = base_url
+        self.max_tokens = max_tokens or Config.ANTHROPIC_MAX_TOKENS
+        self.prompt_cache = Config.ANTHROPIC_PROMPT_CACHE if prompt_cache is None else prompt_cache
+        self.client = Anthropic(api_key=api_key, base_url=base_url)
+        self.async_client = AsyncAnthropic(api_key=api_key, base_url=base_url)
+        # 同一端点的所有实例共享一个熔断器
+        self.circuit_breaker = get_circuit_breaker("Anthropic", base_url)
+        # 最近一次调用的 token 用量（含缓存写入/读取），便于观察缓存命中情况
+        self.last_usage: Optional[Dict[str, int]] = None
+    
+    def _get_client(self, api_key: Optional[str]) -> Anthropic:
+        """用户提供了不同的 key 时创建临时 client，否则使用默认 client"""
+        if api_key and api_key != self.api_key:
+            return Anthropic(api_key=api_key, base_url=self.base_url)
+        return self.client
+    
+    def _get_async_client(self, api_key: Optional[str]) -> AsyncAnthropic:
+        """异步版本的 _get_client"""
+        if api_key and api_key != self.api_key:
+            return AsyncAnthropic(api_key=api_key, base_url=self.base_url)
+        return self.async_client
+    
+    def build_request(self, messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
+        """
+        把 OpenAI 风格的消息列表转换为 Messages API 的请求参数
+        
+        - system 消息合并为 system 块，最后一个块带 cache_control（缓存整个系统提示前缀）
+        - 连续的同角色消息合并为一条（Messages API 要求 user/assistant 交替）
+        - 开头的 assistant 消息被丢弃（历史截断后可能出现，Messages API 要求以 user 开头）
+        
+        Args:
+            messages: 消息列表
+            **kwargs: 其他参数（temperature, max_tokens等）
+        
+        Returns:
+            messages.create 的关键字参数
+        """
+        system_blocks, chat_messages = self._split_messages(messages)
+        request = {
+            "model": self.model,
+            "max_tokens": kwargs.pop("max_tokens", self.max_tokens),
+            "messages": chat_messages,
+            **kwargs
+        }
+        if system_blocks:
+            if self.prompt_cache:
+                system_blocks[-1]["cache_control"] = {"type": "ephemeral"}
+            request["system"] = system_blocks
+        return request
+    
+    @staticmethod
+    def _split_messages(messages: List[Dict[str, str]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+        """拆分出 system 块和对话消息"""
+        system_blocks = []
+        chat_messages = []
+        for msg in messages:
+            role = msg.get("role")
+            content = msg.get("content") or ""
+            if role == "system":
+                if content:
+                    system_blocks.append({"type": "text", "text": content})
+                continue
+            if not chat_messages and role != "user":
+                continue
+            if chat_messages and chat_messages[-1]["role"] == role:
+                chat_messages[-1]["content"] += f"\n\n{content}"
+            else:
+                chat_messages.append({"role": role, "content": content})
+        return system_blocks, chat_messages
+    
+    def _record_usage(self, usage) -> None:
+        """记录 token 用量"""
+        if usage is None:
+            return
+        self.last_usage = {
+            "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+            "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+            "cache_creation_input_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+            "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+        }
+    
+    @staticmethod
+    def _extract_text(response) -> str:
+        """拼接响应中的文本块"""
+        return "".join(block.text for block in response.content if block.type == "text")
+    
+    def chat(self, messages: List[Dict[str, str]], api_key: Optional[str] = None, **kwargs) -> str:
+        """
+        发送聊天请求到Anthropic API
+        
+        Args:
+            messages: 消息列表
+            api_key: 可选的 API 密钥，如果提供则优先使用，否则使用默认密钥
+            **kwargs: 其他参数（temperature, max_tokens等）；request_budget 为本次请求（含重试）的总预算秒数
+        
+        Returns:
+            AI的回复文本
+        
+        Raises:
+            ProviderError: API调用失败时抛出（按失败原因区分子类）
+        """
+        request_budget = kwargs.pop("request_budget", None)
+        client = self._get_client(api_key)
+        request = self.build_request(messages, **kwargs)
+        
+        def _call(timeout: float) -> str:
+            try:
+                # 由 call_with_resilience 统一控制超时和重试，关闭 SDK 自带的重试
+                response = client.with_options(timeout=timeout, max_retries=0).messages.create(**request)
+            except Exception as e:
+                raise translate_anthropic_error(e) from e
+            self._record_usage(response.usage)
+            return self._extract_text(response)
+        
+        return call_with_resilience(self.circuit_breaker, _call, request_budget=request_budget)
+    
+    async def achat(self, messages: List[Dict[str, str]], api_key: Optional[str] = None, **kwargs) -> str:
+        """
+        异步发送聊天请求到Anthropic API
+        
+        Args:
+            messages: 消息列表
+            api_key: 可选的 API 密钥
+            **kwargs: 其他参数；request_budget 为本次请求（含重试）的总预算秒数
+        
+        Returns:
+            AI的回复文本
+        
+        Raises:
+            ProviderError: API调用失败时抛出
+        """
+        request_budget = kwargs.pop("request_budget", None)
+        client = self._get_async_client(api_key)
+        request = self.build_request(messages, **kwargs)
+        
+        async def _call(timeout: float) -> str:
+            try:
+                response = await client.with_options(timeout=timeout, max_retries=0).messages.create(**request)
+            except Exception as e:
+                raise translate_anthropic_error(e) from e
+            self._record_usage(response.usage)
+            return self._extract_text(response)
+        
+        return await async_call_with_resilience(self.circuit_breaker, _call, request_budget=request_budget)
+    
+    def chat_stream(self, messages: List[Dict[str, str]], api_key: Optional[str] = None, **kwargs) -> Iterator[str]:
+        """
+        以流式方式发送聊天请求，逐段返回回复文本
+        
+        已经开始输出后无法透明重试，因此流式请求不做重试，只受熔断器保护。
+        
+        Args:
+            messages: 消息列表
+            api_key: 可选的 API 密钥
+            **kwargs: 其他参数（request_budget 在流式请求中作为整体超时）
+        
+        Yields:
+            回复文本片段
+        
+        Raises:
+            ProviderError: API调用失败时抛出
+        """
+        timeout = kwargs.pop("request_budget", None) or Config.PROVIDER_REQUEST_BUDGET
+        client = self._get_client(api_key)
+        request = self.build_request(messages, **kwargs)
+        
+        self.circuit_breaker.before_call()
+        try:
+            with client.with_options(timeout=timeout, max_retries=0).messages.stream(**request) as stream:
+                for text in stream.text_stream:
+                    yield text
+                self._record_usage(stream.get_final_message().usage)
+        except (GeneratorExit, KeyboardInterrupt):
+            # 调用方提前停止读取（如用户中断），不算上游故障
+            self.circuit_breaker.release()
+            raise
+        except Exception as e:
+            error = translate_anthropic_error(e)
+            if error.counts_for_circuit:
+                self.circuit_breaker.record_failure()
+            else:
+                self.circuit_breaker.release()
+            raise error from e
+        self.circuit_breaker.record_success()
+    
+    def format_message(self, role: str, content: str) -> Dict[str, str]:
+        """
+        格式化消息（统一使用 OpenAI 风格，发送前由 build_request 转换为 Messages API 格式）
+        
+        Args:
+            role: 角色（user, assistant, system）
+            content: 消息内容
+        
+        Returns:
+            格式化后的消息字典
+        """
+        return {"role": role, "content": content}
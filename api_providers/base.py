@@ -1,6 +1,7 @@
 """API提供者抽象基类"""
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 
 
 class BaseAPIProvider(ABC):
@@ -31,10 +32,42 @@ class BaseAPIProvider(ABC):
             AI的回复文本
         
         Raises:
-            Exception: API调用失败时抛出异常
+            ProviderError: API调用失败时抛出异常（见 api_providers.errors）
         """
         pass
     
+    def chat_stream(self, messages: List[Dict[str, str]], api_key: Optional[str] = None, **kwargs) -> Iterator[str]:
+        """
+        以流式方式发送聊天请求，逐段返回回复文本
+        
+        默认实现会等待完整回复后一次性返回，支持流式输出的提供者应重写此方法。
+        
+        Args:
+            messages: 消息列表
+            api_key: 可选的 API 密钥
+            **kwargs: 其他参数
+        
+        Yields:
+            回复文本片段
+        """
+        yield self.chat(messages, api_key=api_key, **kwargs)
+    
+    async def achat(self, messages: List[Dict[str, str]], api_key: Optional[str] = None, **kwargs) -> str:
+        """
+        异步发送聊天请求
+        
+        默认实现在线程池中执行同步的 chat，不会阻塞事件循环；有异步客户端的提供者应重写此方法。
+        
+        Args:
+            messages: 消息列表
+            api_key: 可选的 API 密钥
+            **kwargs: 其他参数
+        
+        Returns:
+            AI的回复文本
+        """
+        return await asyncio.to_thread(self.chat, messages, api_key, **kwargs)
+    
     @abstractmethod
     def format_message(self, role: str, content: str) -> Dict[str, str]:
         """
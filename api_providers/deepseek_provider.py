@@ -1,7 +1,10 @@
 """DeepSeek API提供者"""
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 from openai import OpenAI
 from .base import BaseAPIProvider
+from .errors import translate_openai_error
+from .openai_provider import stream_chat_completion
+from .resilience import get_circuit_breaker, call_with_resilience
 
 
 class DeepSeekProvider(BaseAPIProvider):
@@ -10,20 +13,24 @@ class DeepSeekProvider(BaseAPIProvider):
     # DeepSeek API端点
     BASE_URL = "https://api.deepseek.com"
     
-    def __init__(self, api_key: str, model: str):
+    def __init__(self, api_key: str, model: str, base_url: Optional[str] = None):
         """
         初始化DeepSeek提供者
         
         Args:
             api_key: DeepSeek API密钥
             model: 模型名称（如 deepseek-chat, deepseek-coder）
+            base_url: 可选的API端点，默认使用 DeepSeek 官方端点（可指向本地模拟服务）
         """
         super().__init__(api_key, model)
+        self.base_url = base_url or self.BASE_URL
         # 使用OpenAI SDK，但指向DeepSeek的端点
         self.client = OpenAI(
             api_key=api_key,
-            base_url=self.BASE_URL
+            base_url=self.base_url
         )
+        # 同一端点的所有实例共享一个熔断器
+        self.circuit_breaker = get_circuit_breaker("DeepSeek", self.base_url)
     
     def chat(self, messages: List[Dict[str, str]], api_key: Optional[str] = None, **kwargs) -> str:
         """
@@ -32,33 +39,58 @@ class DeepSeekProvider(BaseAPIProvider):
         Args:
             messages: 消息列表
             api_key: 可选的 API 密钥，如果提供则优先使用，否则使用默认密钥
-            **kwargs: 其他参数（temperature, max_tokens等）
+            **kwargs: 其他参数（temperature, max_tokens等）；request_budget 为本次请求（含重试）的总预算秒数
         
         Returns:
             AI的回复文本
         
         Raises:
-            Exception: API调用失败时抛出异常
+            ProviderError: API调用失败时抛出（按失败原因区分子类）
         """
-        try:
-            # 如果传入了 api_key，使用它创建临时 client；否则使用默认 client
-            key_to_use = api_key or self.api_key
-            if api_key and api_key != self.api_key:
-                # 使用用户提供的 key 创建临时 client
-                from openai import OpenAI
-                client = OpenAI(api_key=key_to_use, base_url=self.BASE_URL)
-            else:
-                # 使用默认 client
-                client = self.client
-            
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                **kwargs
-            )
+        request_budget = kwargs.pop("request_budget", None)
+        
+        # 如果传入了 api_key，使用它创建临时 client；否则使用默认 client
+        key_to_use = api_key or self.api_key
+        if api_key and api_key != self.api_key:
+            # 使用用户提供的 key 创建临时 client
+            client = OpenAI(api_key=key_to_use, base_url=self.base_url)
+        else:
+            # 使用默认 client
+            client = self.client
+        
+        def _call(timeout: float) -> str:
+            try:
+                # 由 call_with_resilience 统一控制超时和重试，关闭 SDK 自带的重试
+                response = client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    **kwargs
+                )
+            except Exception as e:
+                raise translate_openai_error(e, "DeepSeek") from e
             return response.choices[0].message.content
-        except Exception as e:
-            raise Exception(f"DeepSeek API调用失败: {str(e)}")
+        
+        return call_with_resilience(self.circuit_breaker, _call, request_budget=request_budget)
+    
+    def chat_stream(self, messages: List[Dict[str, str]], api_key: Optional[str] = None, **kwargs) -> Iterator[str]:
+        """
+        以流式方式发送聊天请求，逐段返回回复文本
+        
+        Args:
+            messages: 消息列表
+            api_key: 可选的 API 密钥
+            **kwargs: 其他参数（request_budget 在流式请求中作为整体超时）
+        
+        Yields:
+            回复文本片段
+        
+        Raises:
+            ProviderError: API调用失败时抛出
+        """
+        client = self.client
+        if api_key and api_key != self.api_key:
+            client = OpenAI(api_key=api_key, base_url=self.base_url)
+        return stream_chat_completion(client, self.circuit_breaker, "DeepSeek", self.model, messages, **kwargs)
     
     def format_message(self, role: str, content: str) -> Dict[str, str]:
         """
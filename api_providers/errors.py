@@ -0,0 +1,129 @@
+"""API提供者异常类型
+
+所有提供者都抛出 ProviderError 的子类，web_app 根据 status_code 返回对应的 HTTP 状态码。
+"""
+from typing import Optional
+
+
+class ProviderError(Exception):
+    """API提供者调用失败的基类"""
+    
+    # 返回给前端的 HTTP 状态码
+    status_code: int = 502
+    # 是否值得重试（瞬时故障）
+    retryable: bool = False
+    # 是否计入熔断器的失败次数（上游整体故障，而不是单个请求或单个 Key 的问题）
+    counts_for_circuit: bool = False
+    
+    def __init__(self, message: str, provider: Optional[str] = None, retry_after: Optional[float] = None):
+        """
+        初始化异常
+        
+        Args:
+            message: 错误信息
+            provider: 提供者名称（如 DeepSeek、OpenAI）
+            retry_after: 建议的重试等待时间（秒）
+        """
+        if provider:
+            message = f"{provider} API调用失败: {message}"
+        super().__init__(message)
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class ProviderTimeoutError(ProviderError):
+    """上游超时或请求预算耗尽"""
+    status_code = 504
+    retryable = True
+    counts_for_circuit = True
+
+
+class ProviderUnavailableError(ProviderError):
+    """上游不可用（5xx、连接失败）"""
+    status_code = 503
+    retryable = True
+    counts_for_circuit = True
+
+
+class ProviderRateLimitError(ProviderError):
+    """上游限流（429）"""
+    status_code = 429
+    retryable = True
+
+
+class CircuitOpenError(ProviderError):
+    """熔断器已打开，快速失败，不再请求上游"""
+    status_code = 503
+
+
+class ProviderAuthError(ProviderError):
+    """API Key 无效或无权限"""
+    status_code = 400
+
+
+class ProviderBadRequestError(ProviderError):
+    """请求本身有问题（参数错误、上下文超长等）"""
+    status_code = 400
+
+
+def translate_openai_error(error: Exception, provider: str) -> ProviderError:
+    """
+    把 OpenAI SDK 的异常转换为 ProviderError（DeepSeek 同样使用 OpenAI SDK）
+    
+    Args:
+        error: OpenAI SDK 抛出的异常
+        provider: 提供者名称
+    
+    Returns:
+        对应的 ProviderError 子类实例
+    """
+    import openai
+    
+    return _translate_sdk_error(openai, error, provider)
+
+
+def translate_anthropic_error(error: Exception, provider: str = "Anthropic") -> ProviderError:
+    """
+    把 Anthropic SDK 的异常转换为 ProviderError
+    
+    Args:
+        error: Anthropic SDK 抛出的异常
+        provider: 提供者名称
+    
+    Returns:
+        对应的 ProviderError 子类实例
+    """
+    import anthropic
+    
+    return _translate_sdk_error(anthropic, error, provider)
+
+
+def _translate_sdk_error(sdk, error: Exception, provider: str) -> ProviderError:
+    """按异常类型转换（OpenAI 和 Anthropic SDK 的异常层次结构相同）"""
+    if isinstance(error, ProviderError):
+        return error
+    if isinstance(error, sdk.APITimeoutError):
+        return ProviderTimeoutError(f"请求超时: {error}", provider)
+    if isinstance(error, sdk.APIConnectionError):
+        return ProviderUnavailableError(f"连接失败: {error}", provider)
+    if isinstance(error, sdk.RateLimitError):
+        return ProviderRateLimitError(str(error), provider, retry_after=_retry_after(error))
+    if isinstance(error, (sdk.AuthenticationError, sdk.PermissionDeniedError)):
+        return ProviderAuthError(f"API Key 无效或无权限: {error}", provider)
+    if isinstance(error, sdk.APIStatusError):
+        # Anthropic 过载时返回 529
+        if error.status_code >= 500:
+            return ProviderUnavailableError(str(error), provider, retry_after=_retry_after(error))
+        return ProviderBadRequestError(str(error), provider)
+    return ProviderError(str(error), provider)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """从上游响应头中读取 Retry-After（秒）"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
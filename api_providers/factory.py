@@ -0,0 +1,69 @@
+"""根据配置创建API提供者"""
+from typing import Optional
+from config import Config
+from .base import BaseAPIProvider
+
+
+def create_provider(name: str) -> BaseAPIProvider:
+    """
+    根据名称和配置创建API提供者
+    
+    Args:
+        name: 提供者名称（openai, deepseek, claude, mock, router）
+    
+    Returns:
+        API提供者实例
+    
+    Raises:
+        ValueError: 不支持的提供者
+    """
+    if name == "router":
+        return _create_router()
+    return _create_single(name, Config.get_api_key(name))
+
+
+def _create_single(name: str, api_key: Optional[str]) -> BaseAPIProvider:
+    """创建单个上游的API提供者"""
+    if name == "openai":
+        from .openai_provider import OpenAIProvider
+        return OpenAIProvider(api_key, Config.OPENAI_MODEL, base_url=Config.OPENAI_BASE_URL)
+    elif name == "deepseek":
+        from .deepseek_provider import DeepSeekProvider
+        return DeepSeekProvider(api_key, Config.DEEPSEEK_MODEL, base_url=Config.DEEPSEEK_BASE_URL)
+    elif name == "claude":
+        from .anthropic_provider import AnthropicProvider
+        return AnthropicProvider(api_key, Config.ANTHROPIC_MODEL, base_url=Config.ANTHROPIC_BASE_URL)
+    elif name == "mock":
+        # 模拟提供者：不发起网络请求，用于离线压测
+        from .mock_provider import MockProvider
+        return MockProvider(
+            model=Config.MOCK_MODEL,
+            latency_ms=Config.MOCK_LATENCY_MS,
+            latency_jitter_ms=Config.MOCK_LATENCY_JITTER_MS,
+            latency_distribution=Config.MOCK_LATENCY_DISTRIBUTION,
+            tokens_per_second=Config.MOCK_TOKENS_PER_SECOND,
+            error_rate=Config.MOCK_ERROR_RATE,
+            seed=Config.MOCK_SEED
+        )
+    else:
+        raise ValueError(f"不支持的API提供者: {name}")
+
+
+def _create_router() -> BaseAPIProvider:
+    """按 ROUTER_BACKENDS 创建多上游路由提供者"""
+    from .router_provider import RouterProvider
+    
+    backends = {}
+    has_default_key = {}
+    for name in Config.ROUTER_BACKENDS:
+        default_key = Config.get_api_key(name)
+        # 没有系统默认 Key 的后端只服务于自带 Key 的用户，客户端先用空 Key 创建
+        backends[name] = _create_single(name, default_key or "")
+        has_default_key[name] = bool(default_key)
+    return RouterProvider(
+        backends,
+        has_default_key=has_default_key,
+        hedge=Config.ROUTER_HEDGE,
+        hedge_min_samples=Config.ROUTER_HEDGE_MIN_SAMPLES,
+        window_seconds=Config.ROUTER_WINDOW_SECONDS
+    )
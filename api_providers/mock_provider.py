@@ -0,0 +1,213 @@
+"""模拟API提供者 - 用于离线压测和延迟测试"""
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import List, Dict, Optional, Iterator
+from .base import BaseAPIProvider
+from .errors import ProviderUnavailableError
+
+
+class MockProvider(BaseAPIProvider):
+    """
+    模拟API提供者实现（不发起任何网络请求）
+    
+    - 回复内容只由输入决定，相同输入得到相同回复
+    - 延迟按配置的分布采样，随机数使用固定种子，保证多次运行结果可复现
+    - 识别记忆过滤器和记忆总结器的提示词，返回合法的 JSON
+    """
+    
+    # 用于识别记忆系统提示词的标记（见 MemoryFilter.FILTER_PROMPT / MemorySummarizer.SUMMARIZE_PROMPT）
+    FILTER_MARKER = '"记忆过滤器"'
+    SUMMARIZER_MARKER = '"记忆分析助手"'
+    
+    # 认为"值得记忆"的关键词，用于生成确定性的过滤结果
+    SAVE_CUES = ["我叫", "我是", "喜欢", "讨厌", "以后", "明天", "下周", "计划", "记住", "提醒"]
+    
+    LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+    
+    def __init__(
+        self,
+        api_key: str = "mock",
+        model: str = "mock-chat",
+        latency_ms: float = 200,
+        latency_jitter_ms: float = 50,
+        latency_distribution: str = "normal",
+        tokens_per_second: float = 0,
+        error_rate: float = 0,
+        seed: int = 42
+    ):
+        """
+        初始化模拟提供者
+        
+        Args:
+            api_key: 任意字符串（不会被使用）
+            model: 模型名称
+            latency_ms: 首字节前的平均延迟（毫秒）
+            latency_jitter_ms: 延迟波动幅度（毫秒），含义取决于分布类型
+            latency_distribution: 延迟分布（fixed, uniform, normal, lognormal）
+            tokens_per_second: 流式输出速度，0 表示不模拟逐字输出耗时
+            error_rate: 注入错误的概率（0-1）
+            seed: 随机数种子
+        """
+        super().__init__(api_key, model)
+        if latency_distribution not in self.LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"不支持的延迟分布: {latency_distribution}，支持: {', '.join(self.LATENCY_DISTRIBUTIONS)}"
+            )
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.latency_distribution = latency_distribution
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.call_count = 0
+    
+    def sample_latency(self) -> float:
+        """
+        按配置的分布采样一次延迟
+        
+        Returns:
+            延迟秒数（不小于0）
+        """
+        mean = self.latency_ms
+        jitter = self.latency_jitter_ms
+        with self._rng_lock:
+            if self.latency_distribution == "fixed" or jitter <= 0:
+                value = mean
+            elif self.latency_distribution == "uniform":
+                value = self._rng.uniform(mean - jitter, mean + jitter)
+            elif self.latency_distribution == "normal":
+                value = self._rng.gauss(mean, jitter)
+            else:
+                # lognormal: 以 mean 为中位数，jitter/mean 作为形状参数，产生长尾
+                sigma = jitter / mean if mean > 0 else 0
+                value = mean * self._rng.lognormvariate(0, sigma)
+        return max(value, 0) / 1000
+    
+    def should_fail(self) -> bool:
+        """按错误率决定本次调用是否注入错误"""
+        if self.error_rate <= 0:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < self.error_rate
+    
+    def build_reply(self, messages: List[Dict[str, str]]) -> str:
+        """
+        根据输入消息生成确定性的回复
+        
+        Args:
+            messages: 消息列表
+        
+        Returns:
+            回复文本（记忆过滤器/总结器提示词返回 JSON 字符串）
+        """
+        system_text = "".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        user_text = "\n".join(m.get("content", "") for m in messages if m.get("role") == "user")
+        
+        if self.FILTER_MARKER in system_text:
+            return self._build_filter_reply(user_text)
+        if self.SUMMARIZER_MARKER in system_text:
+            return self._build_summary_reply(user_text)
+        
+        last_user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        digest = hashlib.md5(last_user.encode("utf-8")).hexdigest()[:8]
+        return f"（模拟回复 {digest}）我收到了你的消息：{last_user[:50]}"
+    
+    def _build_filter_reply(self, conversation_text: str) -> str:
+        """生成记忆过滤器的 JSON 回复"""
+        cue = next((c for c in self.SAVE_CUES if c in conversation_text), None)
+        result = {
+            "should_save": cue is not None,
+            "reason": f"包含关键词「{cue}」" if cue else "只是普通闲聊"
+        }
+        return json.dumps(result, ensure_ascii=False)
+    
+    def _build_summary_reply(self, conversation_text: str) -> str:
+        """生成记忆总结器的 JSON 回复"""
+        user_lines = [
+            line[len("用户："):] for line in conversation_text.splitlines() if line.startswith("用户：")
+        ]
+        memories = [
+            {"type": "other", "content": line[:40], "reason": "模拟总结"}
+            for line in user_lines[:2] if line
+        ]
+        result = {
+            "summary": f"模拟总结：本次对话共 {len(user_lines)} 条用户消息。",
+            "memories_to_add": memories,
+            "memories_to_update": [],
+            "should_save_memory": bool(memories),
+            "notes_for_future_conversation": ""
+        }
+        return json.dumps(result, ensure_ascii=False)
+    
+    @staticmethod
+    def split_tokens(text: str) -> List[str]:
+        """
+        把回复切分为"token"（每两个字符一段，近似中文的 token 粒度）
+        
+        Args:
+            text: 回复文本
+        
+        Returns:
+            文本片段列表
+        """
+        return [text[i:i + 2] for i in range(0, len(text), 2)]
+    
+    def chat(self, messages: List[Dict[str, str]], api_key: Optional[str] = None, **kwargs) -> str:
+        """
+        模拟一次聊天请求
+        
+        Args:
+            messages: 消息列表
+            api_key: 忽略
+            **kwargs: 忽略
+        
+        Returns:
+            模拟的回复文本
+        
+        Raises:
+            ProviderUnavailableError: 注入错误时抛出异常
+        """
+        return "".join(self.chat_stream(messages, api_key=api_key, **kwargs))
+    
+    def chat_stream(self, messages: List[Dict[str, str]], api_key: Optional[str] = None, **kwargs) -> Iterator[str]:
+        """
+        模拟一次流式聊天请求，按 tokens_per_second 逐段输出
+        
+        Args:
+            messages: 消息列表
+            api_key: 忽略
+            **kwargs: 忽略
+        
+        Yields:
+            回复文本片段
+        
+        Raises:
+            ProviderUnavailableError: 注入错误时抛出异常
+        """
+        self.call_count += 1
+        time.sleep(self.sample_latency())
+        if self.should_fail():
+            raise ProviderUnavailableError("注入的模拟错误", "Mock")
+        
+        token_delay = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        for token in self.split_tokens(self.build_reply(messages)):
+            if token_delay:
+                time.sleep(token_delay)
+            yield token
+    
+    def format_message(self, role: str, content: str) -> Dict[str, str]:
+        """
+        格式化消息（与 OpenAI 格式相同）
+        
+        Args:
+            role: 角色（user, assistant, system）
+            content: 消息内容
+        
+        Returns:
+            格式化后的消息字典
+        """
+        return {"role": role, "content": content}
@@ -0,0 +1,272 @@
+"""OpenAI / Anthropic 兼容的本地模拟服务
+
+用于在本地压测 OpenAIProvider / DeepSeekProvider / AnthropicProvider 的真实网络路径（HTTP、JSON 解析、连接池），
+回复内容、延迟分布和错误注入与 MockProvider 完全一致。Messages API 接口会模拟提示缓存，
+在 usage 中返回 cache_creation_input_tokens / cache_read_input_tokens。
+
+使用说明：
+1. 启动模拟服务：python -m api_providers.mock_server --port 9000 --latency-ms 300
+2. 在 .env 中配置：
+   API_PROVIDER=openai
+   OPENAI_API_KEY=mock
+   OPENAI_BASE_URL=http://127.0.0.1:9000/v1
+   或：
+   API_PROVIDER=claude
+   ANTHROPIC_API_KEY=mock
+   ANTHROPIC_BASE_URL=http://127.0.0.1:9000
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from api_providers.mock_provider import MockProvider
+
+
+def create_app(provider: MockProvider) -> FastAPI:
+    """
+    创建模拟服务应用
+    
+    Args:
+        provider: 用于生成回复、采样延迟和注入错误的模拟提供者
+    
+    Returns:
+        FastAPI 应用
+    """
+    app = FastAPI(title="Mock OpenAI API")
+    # 提示缓存：前缀哈希 -> 过期时间（与官方一致，5 分钟未命中即失效）
+    prompt_cache: Dict[str, float] = {}
+    
+    def _error_response() -> JSONResponse:
+        """注入的上游错误（交替返回 500 和 429，便于测试重试逻辑）"""
+        status_code = 500 if provider.call_count % 2 else 429
+        return JSONResponse(
+            status_code=status_code,
+            content={"error": {"message": "注入的模拟错误", "type": "mock_error", "code": status_code}}
+        )
+    
+    @app.get("/v1/models")
+    async def list_models():
+        """模型列表"""
+        return {"object": "list", "data": [{"id": provider.model, "object": "model", "owned_by": "mock"}]}
+    
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        """Chat Completions 接口（支持 stream=true）"""
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model", provider.model)
+        provider.call_count += 1
+        
+        await asyncio.sleep(provider.sample_latency())
+        if provider.should_fail():
+            return _error_response()
+        
+        reply = provider.build_reply(messages)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages)
+        completion_tokens = len(provider.split_tokens(reply))
+        
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            }
+        
+        async def event_stream():
+            token_delay = 1 / provider.tokens_per_second if provider.tokens_per_second > 0 else 0
+            for i, token in enumerate(provider.split_tokens(reply)):
+                if token_delay:
+                    await asyncio.sleep(token_delay)
+                delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+    
+    def _anthropic_error_response() -> JSONResponse:
+        """注入的上游错误（交替返回 529 过载和 429 限流）"""
+        status_code = 529 if provider.call_count % 2 else 429
+        error_type = "overloaded_error" if status_code == 529 else "rate_limit_error"
+        return JSONResponse(
+            status_code=status_code,
+            content={"type": "error", "error": {"type": error_type, "message": "注入的模拟错误"}}
+        )
+    
+    def _cache_usage(model: str, system) -> Tuple[int, int, int]:
+        """
+        模拟提示缓存
+        
+        Returns:
+            (未缓存的 system token 数, 缓存写入 token 数, 缓存读取 token 数)，token 数按字符数近似
+        """
+        blocks = [{"type": "text", "text": system}] if isinstance(system, str) else (system or [])
+        cached_length = 0
+        prefix = []
+        for block in blocks:
+            prefix.append(block.get("text", ""))
+            if block.get("cache_control"):
+                cached_length = sum(len(text) for text in prefix)
+                break
+        total = sum(len(block.get("text", "")) for block in blocks)
+        if not cached_length:
+            return total, 0, 0
+        
+        key = hashlib.sha256(json.dumps([model, prefix], ensure_ascii=False).encode("utf-8")).hexdigest()
+        now = time.time()
+        hit = prompt_cache.get(key, 0) > now
+        prompt_cache[key] = now + 300
+        if hit:
+            return total - cached_length, 0, cached_length
+        return total - cached_length, cached_length, 0
+    
+    def _anthropic_to_chat_messages(system, messages: List[Dict]) -> List[Dict[str, str]]:
+        """把 Messages API 请求转换为 MockProvider 使用的消息格式"""
+        def text_of(content) -> str:
+            if isinstance(content, str):
+                return content
+            return "".join(block.get("text", "") for block in content or [] if block.get("type") == "text")
+        
+        converted = []
+        system_text = text_of(system)
+        if system_text:
+            converted.append({"role": "system", "content": system_text})
+        converted.extend({"role": m.get("role"), "content": text_of(m.get("content"))} for m in messages)
+        return converted
+    
+    @app.post("/v1/messages")
+    async def messages_api(request: Request):
+        """Anthropic Messages 接口（支持 stream=true 和提示缓存）"""
+        body = await request.json()
+        model = body.get("model", provider.model)
+        messages = _anthropic_to_chat_messages(body.get("system"), body.get("messages", []))
+        provider.call_count += 1
+        
+        await asyncio.sleep(provider.sample_latency())
+        if provider.should_fail():
+            return _anthropic_error_response()
+        
+        reply = provider.build_reply(messages)
+        message_id = f"msg_{uuid.uuid4().hex[:24]}"
+        uncached, cache_creation, cache_read = _cache_usage(model, body.get("system"))
+        input_tokens = uncached + sum(len(m["content"]) for m in messages if m["role"] != "system")
+        output_tokens = len(provider.split_tokens(reply))
+        usage = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cache_creation_input_tokens": cache_creation,
+            "cache_read_input_tokens": cache_read
+        }
+        
+        if not body.get("stream"):
+            return {
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [{"type": "text", "text": reply}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": usage
+            }
+        
+        def sse(event: str, data: Dict) -> str:
+            return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        
+        async def event_stream():
+            token_delay = 1 / provider.tokens_per_second if provider.tokens_per_second > 0 else 0
+            yield sse("message_start", {"type": "message_start", "message": {
+                "id": message_id, "type": "message", "role": "assistant", "model": model,
+                "content": [], "stop_reason": None, "stop_sequence": None,
+                "usage": {**usage, "output_tokens": 0}
+            }})
+            yield sse("content_block_start", {
+                "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}
+            })
+            for token in provider.split_tokens(reply):
+                if token_delay:
+                    await asyncio.sleep(token_delay)
+                yield sse("content_block_delta", {
+                    "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": token}
+                })
+            yield sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+            yield sse("message_delta", {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": output_tokens}
+            })
+            yield sse("message_stop", {"type": "message_stop"})
+        
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+    
+    return app
+
+
+def main():
+    """命令行入口"""
+    from config import Config
+    
+    parser = argparse.ArgumentParser(description="OpenAI / Anthropic 兼容的本地模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--model", default=Config.MOCK_MODEL)
+    parser.add_argument("--latency-ms", type=float, default=Config.MOCK_LATENCY_MS)
+    parser.add_argument("--latency-jitter-ms", type=float, default=Config.MOCK_LATENCY_JITTER_MS)
+    parser.add_argument("--latency-distribution", default=Config.MOCK_LATENCY_DISTRIBUTION,
+                        choices=MockProvider.LATENCY_DISTRIBUTIONS)
+    parser.add_argument("--tokens-per-second", type=float, default=Config.MOCK_TOKENS_PER_SECOND)
+    parser.add_argument("--error-rate", type=float, default=Config.MOCK_ERROR_RATE)
+    parser.add_argument("--seed", type=int, default=Config.MOCK_SEED)
+    args = parser.parse_args()
+    
+    provider = MockProvider(
+        model=args.model,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        latency_distribution=args.latency_distribution,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+    
+    import uvicorn
+    print(f"✓ 模拟服务已启动: http://{args.host}:{args.port}/v1（OpenAI）, http://{args.host}:{args.port}（Anthropic）")
+    uvicorn.run(create_app(provider), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
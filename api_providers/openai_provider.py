@@ -1,22 +1,85 @@
 """OpenAI API提供者"""
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator
 from openai import OpenAI
+from config import Config
 from .base import BaseAPIProvider
+from .errors import translate_openai_error
+from .resilience import CircuitBreaker, get_circuit_breaker, call_with_resilience
+
+
+def stream_chat_completion(
+    client: OpenAI,
+    circuit_breaker: CircuitBreaker,
+    provider: str,
+    model: str,
+    messages: List[Dict[str, str]],
+    **kwargs
+) -> Iterator[str]:
+    """
+    以流式方式调用 Chat Completions 接口（OpenAI 和 DeepSeek 共用）
+    
+    调用方提前停止读取（关闭生成器或按 Ctrl+C）时关闭响应流，断开与上游的连接，上游随即停止生成。
+    已经开始输出后无法透明重试，因此不做重试，只受熔断器保护。
+    
+    Args:
+        client: OpenAI SDK 客户端
+        circuit_breaker: 上游的熔断器
+        provider: 提供者名称（用于错误信息）
+        model: 模型名称
+        messages: 消息列表
+        **kwargs: 其他参数（request_budget 在流式请求中作为整体超时）
+    
+    Yields:
+        回复文本片段
+    
+    Raises:
+        ProviderError: API调用失败时抛出
+    """
+    timeout = kwargs.pop("request_budget", None) or Config.PROVIDER_REQUEST_BUDGET
+    
+    circuit_breaker.before_call()
+    try:
+        stream = client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            **kwargs
+        )
+        with stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    except (GeneratorExit, KeyboardInterrupt):
+        # 调用方提前停止读取（如用户中断），不算上游故障
+        circuit_breaker.release()
+        raise
+    except Exception as e:
+        error = translate_openai_error(e, provider)
+        if error.counts_for_circuit:
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.release()
+        raise error from e
+    circuit_breaker.record_success()
 
 
 class OpenAIProvider(BaseAPIProvider):
     """OpenAI API提供者实现"""
     
-    def __init__(self, api_key: str, model: str):
+    def __init__(self, api_key: str, model: str, base_url: Optional[str] = None):
         """
         初始化OpenAI提供者
         
         Args:
             api_key: OpenAI API密钥
             model: 模型名称（如 gpt-3.5-turbo, gpt-4）
+            base_url: 可选的API端点，为空时使用官方端点（可指向本地模拟服务）
         """
         super().__init__(api_key, model)
-        self.client = OpenAI(api_key=api_key)
+        self.base_url = base_url
+        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        # 同一端点的所有实例共享一个熔断器
+        self.circuit_breaker = get_circuit_breaker("OpenAI", base_url)
     
     def chat(self, messages: List[Dict[str, str]], api_key: Optional[str] = None, **kwargs) -> str:
         """
@@ -25,33 +88,58 @@ class OpenAIProvider(BaseAPIProvider):
         Args:
             messages: 消息列表
             api_key: 可选的 API 密钥，如果提供则优先使用，否则使用默认密钥
-            **kwargs: 其他参数（temperature, max_tokens等）
+            **kwargs: 其他参数（temperature, max_tokens等）；request_budget 为本次请求（含重试）的总预算秒数
         
         Returns:
             AI的回复文本
         
         Raises:
-            Exception: API调用失败时抛出异常
+            ProviderError: API调用失败时抛出（按失败原因区分子类）
         """
-        try:
-            # 如果传入了 api_key，使用它创建临时 client；否则使用默认 client
-            key_to_use = api_key or self.api_key
-            if api_key and api_key != self.api_key:
-                # 使用用户提供的 key 创建临时 client
-                from openai import OpenAI
-                client = OpenAI(api_key=key_to_use)
-            else:
-                # 使用默认 client
-                client = self.client
-            
-            response = client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                **kwargs
-            )
+        request_budget = kwargs.pop("request_budget", None)
+        
+        # 如果传入了 api_key，使用它创建临时 client；否则使用默认 client
+        key_to_use = api_key or self.api_key
+        if api_key and api_key != self.api_key:
+            # 使用用户提供的 key 创建临时 client
+            client = OpenAI(api_key=key_to_use, base_url=self.base_url)
+        else:
+            # 使用默认 client
+            client = self.client
+        
+        def _call(timeout: float) -> str:
+            try:
+                # 由 call_with_resilience 统一控制超时和重试，关闭 SDK 自带的重试
+                response = client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    **kwargs
+                )
+            except Exception as e:
+                raise translate_openai_error(e, "OpenAI") from e
             return response.choices[0].message.content
-        except Exception as e:
-            raise Exception(f"OpenAI API调用失败: {str(e)}")
+        
+        return call_with_resilience(self.circuit_breaker, _call, request_budget=request_budget)
+    
+    def chat_stream(self, messages: List[Dict[str, str]], api_key: Optional[str] = None, **kwargs) -> Iterator[str]:
+        """
+        以流式方式发送聊天请求，逐段返回回复文本
+        
+        Args:
+            messages: 消息列表
+            api_key: 可选的 API 密钥
+            **kwargs: 其他参数（request_budget 在流式请求中作为整体超时）
+        
+        Yields:
+            回复文本片段
+        
+        Raises:
+            ProviderError: API调用失败时抛出
+        """
+        client = self.client
+        if api_key and api_key != self.api_key:
+            client = OpenAI(api_key=api_key, base_url=self.base_url)
+        return stream_chat_completion(client, self.circuit_breaker, "OpenAI", self.model, messages, **kwargs)
     
     def format_message(self, role: str, content: str) -> Dict[str, str]:
         """
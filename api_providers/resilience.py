@@ -0,0 +1,271 @@
+"""上游调用的超时、重试与熔断"""
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from config import Config
+from .errors import ProviderError, ProviderTimeoutError, CircuitOpenError
+
+T = TypeVar("T")
+
+
+class CircuitBreaker:
+    """
+    熔断器（每个上游端点一个，所有用户共享）
+    
+    - closed: 正常放行，连续失败达到阈值后打开
+    - open: 直接快速失败，经过 reset_timeout 后进入半开
+    - half_open: 只放行一个探测请求，成功则关闭，失败则重新打开
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        初始化熔断器
+        
+        Args:
+            name: 名称（用于错误信息）
+            failure_threshold: 连续失败多少次后打开
+            reset_timeout: 打开后多久允许探测（秒）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    def before_call(self) -> None:
+        """
+        调用上游前检查是否放行
+        
+        Raises:
+            CircuitOpenError: 熔断器打开时快速失败
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+        raise CircuitOpenError(
+            f"上游 {self.name} 暂时不可用（熔断中），请稍后再试",
+            retry_after=max(remaining, 1.0)
+        )
+    
+    def record_success(self) -> None:
+        """记录一次成功调用"""
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+    
+    def record_failure(self) -> None:
+        """记录一次上游故障"""
+        with self._lock:
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+    
+    def release(self) -> None:
+        """调用以非上游故障结束（如 Key 无效），释放半开状态下的探测名额"""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+_breakers: Dict[Tuple[str, Optional[str]], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, endpoint: Optional[str] = None) -> CircuitBreaker:
+    """
+    获取（或创建）指定上游的熔断器
+    
+    Args:
+        name: 上游名称（如 DeepSeek、OpenAI）
+        endpoint: 上游端点，同名但端点不同的上游使用不同的熔断器
+    
+    Returns:
+        熔断器实例
+    """
+    key = (name, endpoint)
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(
+                name,
+                failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=Config.CIRCUIT_RESET_TIMEOUT
+            )
+        return _breakers[key]
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, rng: random.Random = random) -> float:
+    """
+    计算第 attempt 次重试前的等待时间（指数退避 + 全抖动）
+    
+    Args:
+        attempt: 重试序号（从 1 开始）
+        base_delay: 基础等待时间（秒）
+        max_delay: 最大等待时间（秒）
+    
+    Returns:
+        等待秒数
+    """
+    return rng.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+
+
+class _RetryLoop:
+    """同步和异步重试循环共用的预算、熔断和退避计算"""
+    
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        request_budget: Optional[float],
+        call_timeout: Optional[float],
+        max_retries: Optional[int]
+    ):
+        self.breaker = breaker
+        self.request_budget = request_budget or Config.PROVIDER_REQUEST_BUDGET
+        self.call_timeout = call_timeout or Config.PROVIDER_CALL_TIMEOUT
+        self.max_retries = Config.PROVIDER_MAX_RETRIES if max_retries is None else max_retries
+        self.deadline = time.monotonic() + self.request_budget
+        self.attempt = 0
+    
+    def begin(self) -> float:
+        """
+        开始一次调用：经过熔断器并检查剩余预算
+        
+        Returns:
+            本次调用的超时秒数
+        
+        Raises:
+            CircuitOpenError: 熔断器打开
+            ProviderTimeoutError: 已超过请求预算
+        """
+        self.breaker.before_call()
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            self.breaker.release()
+            raise ProviderTimeoutError(f"超过请求预算 {self.request_budget:.0f} 秒", self.breaker.name)
+        return min(self.call_timeout, remaining)
+    
+    def failed(self, error: ProviderError) -> Optional[float]:
+        """
+        记录一次上游失败
+        
+        Returns:
+            重试前的等待秒数；不应重试时返回 None（调用方重新抛出错误）
+        """
+        if error.counts_for_circuit:
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+        self.attempt += 1
+        if not error.retryable or self.attempt > self.max_retries:
+            return None
+        delay = backoff_delay(self.attempt, Config.PROVIDER_RETRY_BASE_DELAY, Config.PROVIDER_RETRY_MAX_DELAY)
+        if error.retry_after:
+            delay = max(delay, error.retry_after)
+        # 等待后已没有足够预算，就不再重试
+        if time.monotonic() + delay >= self.deadline:
+            return None
+        return delay
+
+
+def call_with_resilience(
+    breaker: CircuitBreaker,
+    call: Callable[[float], T],
+    request_budget: Optional[float] = None,
+    call_timeout: Optional[float] = None,
+    max_retries: Optional[int] = None
+) -> T:
+    """
+    在请求预算内调用上游：每次调用的超时由剩余预算决定，瞬时故障按抖动退避重试，
+    上游故障计入熔断器
+    
+    Args:
+        breaker: 该上游的熔断器
+        call: 实际发起请求的函数，参数为本次调用的超时秒数
+        request_budget: 整个请求（含重试）的总预算（秒），默认读取配置
+        call_timeout: 单次调用的超时上限（秒），默认读取配置
+        max_retries: 最大重试次数，默认读取配置
+    
+    Returns:
+        call 的返回值
+    
+    Raises:
+        ProviderError: 调用最终失败
+    """
+    retry = _RetryLoop(breaker, request_budget, call_timeout, max_retries)
+    while True:
+        timeout = retry.begin()
+        try:
+            result = call(timeout)
+        except ProviderError as e:
+            delay = retry.failed(e)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        except BaseException:
+            # 包括 KeyboardInterrupt，半开状态的探测名额不能泄漏
+            breaker.release()
+            raise
+        
+        breaker.record_success()
+        return result
+
+
+async def async_call_with_resilience(
+    breaker: CircuitBreaker,
+    call: Callable[[float], Awaitable[T]],
+    request_budget: Optional[float] = None,
+    call_timeout: Optional[float] = None,
+    max_retries: Optional[int] = None
+) -> T:
+    """
+    call_with_resilience 的异步版本，退避等待不会阻塞事件循环
+    
+    Args:
+        breaker: 该上游的熔断器
+        call: 实际发起请求的协程函数，参数为本次调用的超时秒数
+        request_budget: 整个请求（含重试）的总预算（秒），默认读取配置
+        call_timeout: 单次调用的超时上限（秒），默认读取配置
+        max_retries: 最大重试次数，默认读取配置
+    
+    Returns:
+        call 的返回值
+    
+    Raises:
+        ProviderError: 调用最终失败
+    """
+    retry = _RetryLoop(breaker, request_budget, call_timeout, max_retries)
+    while True:
+        timeout = retry.begin()
+        try:
+            result = await call(timeout)
+        except ProviderError as e:
+            delay = retry.failed(e)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # 包括任务被取消（CancelledError）
+            breaker.release()
+            raise
+        
+        breaker.record_success()
+        return result
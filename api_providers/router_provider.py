@@ -0,0 +1,293 @@
+"""多上游路由提供者 - 按延迟和错误率选择后端，故障时自动切换"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Iterator, List, Dict, Optional, Union, Tuple
+
+from .base import BaseAPIProvider
+from .errors import ProviderError, ProviderBadRequestError
+
+
+class BackendStats:
+    """单个后端在统计窗口内的延迟和成功率"""
+    
+    def __init__(self, window_seconds: float = 300, max_samples: int = 500):
+        """
+        初始化统计
+        
+        Args:
+            window_seconds: 统计窗口（秒），窗口外的样本不再参与计算，故障后端会因此自然恢复
+            max_samples: 最多保留的样本数
+        """
+        self.window_seconds = window_seconds
+        # (完成时间, 延迟秒数, 是否成功)
+        self.samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+    
+    def record(self, latency: float, ok: bool) -> None:
+        """记录一次调用结果"""
+        with self._lock:
+            self.samples.append((time.monotonic(), latency, ok))
+    
+    def _recent(self) -> List[Tuple[float, float, bool]]:
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            return [s for s in self.samples if s[0] >= cutoff]
+    
+    def snapshot(self) -> Dict:
+        """
+        计算窗口内的统计值
+        
+        Returns:
+            {"samples", "error_rate", "p50", "p95"}，延迟单位为秒，没有成功样本时为 None
+        """
+        recent = self._recent()
+        latencies = sorted(s[1] for s in recent if s[2])
+        errors = sum(1 for s in recent if not s[2])
+        
+        def pct(p: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+        
+        return {
+            "samples": len(recent),
+            "error_rate": errors / len(recent) if recent else 0.0,
+            "p50": pct(0.5),
+            "p95": pct(0.95),
+        }
+
+
+class RouterProvider(BaseAPIProvider):
+    """
+    多上游路由提供者
+    
+    - 每次调用在用户有 Key 的后端中选择最健康、最快的一个
+    - 后端失败（超时、5xx、限流、熔断、Key 无效）时立即切换到下一个后端
+    - 可选对冲：首个请求超过该后端的 p95 仍未返回时，向次优后端再发一个请求，取先返回的结果
+    
+    api_key 参数为 {后端名: Key} 字典，只会路由到字典中的后端，值为 None 表示使用该后端的系统默认 Key；
+    api_key 为 None 时使用所有配置了系统默认 Key 的后端。
+    """
+    
+    # 错误率对评分的惩罚系数：错误率 10% 的后端相当于慢了 1 倍
+    ERROR_PENALTY = 10.0
+    
+    def __init__(
+        self,
+        backends: Dict[str, BaseAPIProvider],
+        has_default_key: Optional[Dict[str, bool]] = None,
+        hedge: bool = False,
+        hedge_min_samples: int = 20,
+        window_seconds: float = 300,
+        hedge_workers: int = 32
+    ):
+        """
+        初始化路由提供者
+        
+        Args:
+            backends: 后端名称到提供者实例的映射（顺序即默认优先级）
+            has_default_key: 每个后端是否配置了系统默认 Key
+            hedge: 是否启用对冲请求
+            hedge_min_samples: 后端至少有多少个成功样本才启用对冲（p95 才有意义）
+            window_seconds: 统计窗口（秒）
+            hedge_workers: 对冲请求使用的线程数
+        """
+        if not backends:
+            raise ValueError("路由提供者至少需要一个后端")
+        super().__init__(api_key="", model="router")
+        self.backends = backends
+        self.has_default_key = has_default_key or {name: True for name in backends}
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.stats = {name: BackendStats(window_seconds) for name in backends}
+        self._executor = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="router-hedge") if hedge else None
+    
+    def _eligible(self, api_key: Union[Dict[str, Optional[str]], str, None]) -> Dict[str, Optional[str]]:
+        """
+        计算本次调用可用的后端及其 Key
+        
+        Returns:
+            {后端名: Key}，Key 为 None 表示使用系统默认 Key
+        """
+        if api_key is None:
+            return {name: None for name in self.backends if self.has_default_key.get(name)}
+        if isinstance(api_key, str):
+            # 单个 Key 无法判断属于哪个后端，交给默认优先级的第一个后端
+            first = next(iter(self.backends))
+            return {first: api_key}
+        return {
+            name: key for name, key in api_key.items()
+            if name in self.backends and (key or self.has_default_key.get(name))
+        }
+    
+    def rank(self, names: List[str]) -> List[str]:
+        """
+        按评分（预期延迟 × 错误惩罚）从优到劣排序后端
+        
+        没有样本的后端排在最前面，以便尽快获得统计数据。
+        
+        Args:
+            names: 候选后端
+        
+        Returns:
+            排序后的后端列表
+        """
+        order = {name: i for i, name in enumerate(self.backends)}
+        
+        def score(name: str) -> Tuple[float, int]:
+            s = self.stats[name].snapshot()
+            if s["samples"] == 0:
+                return (0.0, order[name])
+            latency = s["p50"] if s["p50"] is not None else float("inf")
+            return (latency * (1 + self.ERROR_PENALTY * s["error_rate"]), order[name])
+        
+        return sorted(names, key=score)
+    
+    def _call_backend(self, name: str, messages: List[Dict[str, str]], api_key: Optional[str], **kwargs) -> str:
+        """调用单个后端并记录延迟和结果"""
+        start = time.monotonic()
+        try:
+            result = self.backends[name].chat(messages, api_key=api_key, **kwargs)
+        except ProviderError:
+            self.stats[name].record(time.monotonic() - start, False)
+            raise
+        self.stats[name].record(time.monotonic() - start, True)
+        return result
+    
+    def chat(self, messages: List[Dict[str, str]], api_key: Union[Dict[str, Optional[str]], str, None] = None, **kwargs) -> str:
+        """
+        把聊天请求路由到最优后端，失败时依次切换
+        
+        Args:
+            messages: 消息列表
+            api_key: {后端名: Key} 字典（见类说明）
+            **kwargs: 传给后端的其他参数
+        
+        Returns:
+            AI的回复文本
+        
+        Raises:
+            ProviderError: 所有可用后端都失败时抛出最后一个错误
+        """
+        eligible = self._eligible(api_key)
+        if not eligible:
+            raise ProviderError("没有可用的后端（未配置任何 API Key）", "Router")
+        
+        candidates = self.rank(list(eligible))
+        last_error: Optional[ProviderError] = None
+        while candidates:
+            name = candidates.pop(0)
+            try:
+                if self.hedge and candidates:
+                    return self._hedged_call(name, candidates, eligible, messages, **kwargs)
+                return self._call_backend(name, messages, eligible[name], **kwargs)
+            except ProviderBadRequestError:
+                # 请求本身有问题，换后端也不会成功
+                raise
+            except ProviderError as e:
+                print(f"[路由] 后端 {name} 调用失败，尝试下一个后端: {e}")
+                last_error = e
+        raise last_error
+    
+    def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        api_key: Union[Dict[str, Optional[str]], str, None] = None,
+        **kwargs
+    ) -> Iterator[str]:
+        """
+        把流式聊天请求路由到最优后端，由该后端的 chat_stream 逐段返回
+        
+        收到第一段回复之前失败时切换到下一个后端；已经输出回复后失败直接抛出，避免重复输出。
+        流式请求不使用对冲。
+        
+        Args:
+            messages: 消息列表
+            api_key: {后端名: Key} 字典（见类说明）
+            **kwargs: 传给后端的其他参数
+        
+        Yields:
+            回复文本片段
+        
+        Raises:
+            ProviderError: 所有可用后端都在输出之前失败时抛出最后一个错误，或输出之后失败时抛出该错误
+        """
+        eligible = self._eligible(api_key)
+        if not eligible:
+            raise ProviderError("没有可用的后端（未配置任何 API Key）", "Router")
+        
+        last_error: Optional[ProviderError] = None
+        for name in self.rank(list(eligible)):
+            start = time.monotonic()
+            started = False
+            stream = self.backends[name].chat_stream(messages, api_key=eligible[name], **kwargs)
+            try:
+                for chunk in stream:
+                    started = True
+                    yield chunk
+            except ProviderError as e:
+                self.stats[name].record(time.monotonic() - start, False)
+                if started or isinstance(e, ProviderBadRequestError):
+                    # 已经输出了部分回复，或请求本身有问题，换后端也不会成功
+                    raise
+                print(f"[路由] 后端 {name} 流式调用失败，尝试下一个后端: {e}")
+                last_error = e
+                continue
+            finally:
+                stream.close()
+            self.stats[name].record(time.monotonic() - start, True)
+            return
+        raise last_error
+    
+    def _hedged_call(self, primary: str, candidates: List[str], eligible: Dict[str, Optional[str]],
+                     messages: List[Dict[str, str]], **kwargs) -> str:
+        """
+        发起对冲请求：主请求超过其 p95 仍未完成时，向次优后端再发一个请求
+        
+        被选为对冲目标的后端会从 candidates 中移除，避免失败后重复调用。
+        """
+        stats = self.stats[primary].snapshot()
+        hedge_delay = stats["p95"] if stats["samples"] >= self.hedge_min_samples else None
+        
+        futures = {self._executor.submit(self._call_backend, primary, messages, eligible[primary], **kwargs): primary}
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done:
+            secondary = candidates.pop(0)
+            print(f"[路由] 后端 {primary} 超过 p95（{hedge_delay:.2f}s），向 {secondary} 发起对冲请求")
+            futures[self._executor.submit(self._call_backend, secondary, messages, eligible[secondary], **kwargs)] = secondary
+        
+        last_error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    # 先完成的成功结果直接返回，另一个请求在后台结束后被丢弃
+                    return future.result()
+                except ProviderError as e:
+                    last_error = e
+        raise last_error
+    
+    def get_stats(self) -> Dict[str, Dict]:
+        """
+        获取各后端的统计信息
+        
+        Returns:
+            {后端名: {"samples", "error_rate", "p50", "p95"}}
+        """
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+    
+    def format_message(self, role: str, content: str) -> Dict[str, str]:
+        """
+        格式化消息（使用第一个后端的格式）
+        
+        Args:
+            role: 角色（user, assistant, system）
+            content: 消息内容
+        
+        Returns:
+            格式化后的消息字典
+        """
+        return next(iter(self.backends.values())).format_message(role, content)
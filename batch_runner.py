@@ -0,0 +1,280 @@
+"""批量模式 - 从 JSONL 文件读取对话，按设定的并发数走完整的 ChatBot 流程，把回复和耗时写入 JSONL"""
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO
+
+from api_providers.base import BaseAPIProvider
+from api_providers.factory import create_provider
+from chat_bot import ChatBot
+from config import Config
+
+
+def load_records(path: str, base_dir: Optional[str] = None) -> List[Dict]:
+    """
+    读取批量输入文件
+    
+    每行一个 JSON 对象：
+    - prompt: 一条消息，或消息列表（在同一个对话中依次发送）
+    - persona: 可选，人设字典（字段同 PersonaManager.DEFAULT_PERSONA）或人设 JSON 文件路径
+    - id: 可选，原样写入结果
+    
+    空行跳过；无法解析的行也会返回（带 error），在结果中记为失败，不中断整批运行。
+    
+    Args:
+        path: JSONL 文件路径
+        base_dir: 人设文件相对路径的基准目录，默认为当前目录
+    
+    Returns:
+        [{"index", "id", "prompts", "persona", "error"}]，index 为行号（从 1 开始）
+    """
+    base = Path(base_dir or os.getcwd())
+    persona_files: Dict[Path, Dict] = {}
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = {"index": line_no, "id": None, "prompts": [], "persona": None, "error": None}
+            records.append(record)
+            try:
+                data = json.loads(line)
+                if not isinstance(data, dict):
+                    raise ValueError("每行应为 JSON 对象")
+                record["id"] = data.get("id")
+                prompts = data.get("prompt")
+                prompts = [prompts] if isinstance(prompts, str) else prompts
+                if not prompts or not all(isinstance(p, str) and p.strip() for p in prompts):
+                    raise ValueError("prompt 应为非空字符串或字符串列表")
+                record["prompts"] = prompts
+                persona = data.get("persona")
+                if isinstance(persona, str):
+                    # 多条记录引用同一个人设文件时只读取一次
+                    persona_path = (base / persona).resolve()
+                    if persona_path not in persona_files:
+                        with open(persona_path, "r", encoding="utf-8") as pf:
+                            persona_files[persona_path] = json.load(pf)
+                    persona = persona_files[persona_path]
+                if persona is not None and not isinstance(persona, dict):
+                    raise ValueError("persona 应为人设字典或人设文件路径")
+                record["persona"] = persona
+            except (ValueError, OSError) as e:
+                record["error"] = f"无效的记录: {e}"
+    return records
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """计算百分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+class BatchRunner:
+    """
+    并发运行批量对话
+    
+    每条记录使用独立的 ChatBot（以行号作为 user_id，人设和长期记忆互不影响），所有 ChatBot
+    共用一个 API 提供者。回复通过 chat_stream 获取，同时记录首段回复耗时和完整回复耗时。
+    """
+    
+    def __init__(
+        self,
+        api_provider: Optional[BaseAPIProvider] = None,
+        concurrency: int = 4,
+        summarize: bool = False,
+        state_dir: Optional[str] = None
+    ):
+        """
+        初始化批量运行器
+        
+        Args:
+            api_provider: API提供者实例，默认按配置创建
+            concurrency: 同时运行的记录数
+            summarize: 每条记录结束后是否总结对话（写入该记录的长期记忆，计入总结耗时）
+            state_dir: ChatBot 人设和记忆文件的根目录，默认为当前目录
+        """
+        self.api_provider = api_provider or create_provider(Config.API_PROVIDER)
+        self.concurrency = max(1, concurrency)
+        self.summarize = summarize
+        self.state_dir = state_dir
+        self._write_lock = threading.Lock()
+    
+    def run_record(self, record: Dict) -> Dict:
+        """
+        运行一条记录
+        
+        Args:
+            record: load_records 返回的记录
+        
+        Returns:
+            结果：{"index", "id", "ok", "error", "turns": [{"prompt", "reply", "first_chunk_ms", "latency_ms"}],
+            "summarize_ms", "total_ms"}
+        """
+        result = {"index": record["index"], "id": record["id"], "ok": False, "error": record["error"], "turns": []}
+        if record["error"]:
+            return result
+        
+        start = time.perf_counter()
+        try:
+            bot = ChatBot(user_id=record["index"], api_provider=self.api_provider, base_dir=self.state_dir)
+            if record["persona"] is not None:
+                bot.persona_manager.update_persona(record["persona"])
+                bot.refresh_system_message()
+            for prompt in record["prompts"]:
+                turn_start = time.perf_counter()
+                first_chunk = None
+                parts = []
+                for chunk in bot.chat_stream(prompt):
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter()
+                    parts.append(chunk)
+                turn_end = time.perf_counter()
+                result["turns"].append({
+                    "prompt": prompt,
+                    "reply": "".join(parts),
+                    "first_chunk_ms": round(((first_chunk or turn_end) - turn_start) * 1000, 2),
+                    "latency_ms": round((turn_end - turn_start) * 1000, 2),
+                })
+            if self.summarize:
+                summarize_start = time.perf_counter()
+                bot.force_summarize()
+                result["summarize_ms"] = round((time.perf_counter() - summarize_start) * 1000, 2)
+            result["ok"] = True
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+    
+    def run(self, records: List[Dict], output: TextIO) -> Dict:
+        """
+        并发运行所有记录，每完成一条立即写入一行结果（按完成顺序，用 index 对应输入行）
+        
+        按 Ctrl+C 时不再开始新的记录，等待进行中的记录结束，已完成的结果全部写入后返回。
+        
+        Args:
+            records: load_records 返回的记录
+            output: 结果输出（文本文件）
+        
+        Returns:
+            汇总报告（见 report）
+        """
+        results = []
+        started_at = time.perf_counter()
+        futures = []
+        written = set()
+        
+        def write(future) -> None:
+            result = future.result()
+            results.append(result)
+            written.add(future)
+            with self._write_lock:
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+        
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch")
+        try:
+            for record in records:
+                futures.append(executor.submit(self.run_record, record))
+            for future in as_completed(futures):
+                write(future)
+        except KeyboardInterrupt:
+            print("\n已中断：不再开始新的记录，等待进行中的记录结束...")
+            executor.shutdown(wait=True, cancel_futures=True)
+            # as_completed 被中断时，已完成但还没写入的结果也要写入
+            for future in futures:
+                if future not in written and future.done() and not future.cancelled():
+                    write(future)
+            print(f"已写入 {len(results)}/{len(records)} 条结果")
+        finally:
+            executor.shutdown(wait=False)
+        return self.report(results, time.perf_counter() - started_at)
+    
+    def report(self, results: List[Dict], elapsed: float) -> Dict:
+        """
+        汇总批量运行结果
+        
+        Args:
+            results: run_record 的返回值列表
+            elapsed: 总耗时（秒）
+        
+        Returns:
+            {"records", "ok", "errors", "turns", "elapsed_seconds", "records_per_second", "turns_per_second",
+            "latency_ms", "first_chunk_ms", "error_samples"}
+        """
+        turns = [turn for result in results for turn in result["turns"]]
+        latencies = sorted(turn["latency_ms"] for turn in turns)
+        first_chunks = sorted(turn["first_chunk_ms"] for turn in turns)
+        errors = [result for result in results if not result["ok"]]
+        
+        def summary(values: List[float]) -> Dict:
+            return {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": values[-1] if values else 0.0,
+            }
+        
+        return {
+            "records": len(results),
+            "ok": len(results) - len(errors),
+            "errors": len(errors),
+            "turns": len(turns),
+            "elapsed_seconds": round(elapsed, 2),
+            "records_per_second": round(len(results) / elapsed, 2) if elapsed > 0 else 0,
+            "turns_per_second": round(len(turns) / elapsed, 2) if elapsed > 0 else 0,
+            "latency_ms": summary(latencies),
+            "first_chunk_ms": summary(first_chunks),
+            "error_samples": [f"#{r['index']}: {r['error']}" for r in errors[:3]],
+        }
+
+
+def run_batch(
+    input_path: str,
+    output_path: Optional[str] = None,
+    concurrency: int = 4,
+    summarize: bool = False,
+    state_dir: Optional[str] = None
+) -> Dict:
+    """
+    运行批量模式（main.py --batch 的入口）
+    
+    ChatBot 的人设和长期记忆文件写在 state_dir 中（默认新建临时目录），不影响当前目录中的数据。
+    
+    Args:
+        input_path: 输入 JSONL 文件
+        output_path: 结果 JSONL 文件，默认为输入文件名加 .results.jsonl
+        concurrency: 同时运行的记录数
+        summarize: 每条记录结束后是否总结对话
+        state_dir: 人设和记忆文件的目录
+    
+    Returns:
+        汇总报告
+    """
+    input_path = os.path.abspath(input_path)
+    output_path = os.path.abspath(output_path or f"{os.path.splitext(input_path)[0]}.results.jsonl")
+    records = load_records(input_path, base_dir=os.path.dirname(input_path))
+    
+    state_dir = os.path.abspath(state_dir) if state_dir else tempfile.mkdtemp(prefix="chatbot_batch_")
+    os.makedirs(state_dir, exist_ok=True)
+    
+    runner = BatchRunner(concurrency=concurrency, summarize=summarize, state_dir=state_dir)
+    print(f"批量运行 {len(records)} 条记录（并发 {runner.concurrency}，{runner.api_provider.__class__.__name__}）")
+    with open(output_path, "w", encoding="utf-8") as output:
+        report = runner.run(records, output)
+    
+    print(f"完成 {report['records']} 条：成功 {report['ok']}，失败 {report['errors']}，"
+          f"耗时 {report['elapsed_seconds']}s（{report['turns_per_second']} 轮/秒）")
+    print(f"回复耗时 p50 {report['latency_ms']['p50']} ms，p95 {report['latency_ms']['p95']} ms；"
+          f"首段回复 p50 {report['first_chunk_ms']['p50']} ms")
+    for sample in report["error_samples"]:
+        print(f"  ✗ {sample}")
+    print(f"结果: {output_path}")
+    print(f"人设和记忆文件: {state_dir}")
+    return report
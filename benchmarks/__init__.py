@@ -0,0 +1,4 @@
+"""性能测试模块
+
+提供压测、微基准测试等性能测量工具（不参与线上运行）。
+"""
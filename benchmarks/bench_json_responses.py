@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+大体积 JSON 响应的序列化和压缩基准测试
+
+生成不同规模的长期记忆（对话总结条数不同），对比 /api/memory 的两种响应方式：
+- 原方式：按 response_model 校验后由 JSONResponse（标准库 json，ensure_ascii=False）序列化
+- 新方式：FastJSONResponse（orjson）直接序列化
+
+并测量响应体在 identity / gzip / br 下的字节数和压缩耗时（参数与 CompressionMiddleware 的默认值相同）。
+
+使用说明（在项目根目录运行）：
+    python -m benchmarks.bench_json_responses
+    python -m benchmarks.bench_json_responses --summaries 100 1000 5000 --output json_responses.json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from response_encoding import CompressionMiddleware, FastJSONResponse, orjson
+
+PHRASES = ["今天聊到了工作上的项目进度", "用户说周末想去爬山", "提到最近在学习吉他", "喜欢喝无糖的乌龙茶",
+           "对猫毛过敏", "计划明年去日本旅行", "在准备考研，目标是计算机专业", "晚上经常失眠"]
+
+
+class MemoryResponse(BaseModel):
+    """与 web_app.MemoryResponse 相同"""
+    success: bool
+    memories: Optional[Dict] = None
+    message: Optional[str] = None
+
+
+def make_memories(summaries: int, seed: int = 42) -> Dict:
+    """生成长期记忆数据（结构与 long_term_memory.json 相同）"""
+    rng = random.Random(seed)
+    
+    def text(n: int) -> str:
+        return "，".join(rng.choice(PHRASES) for _ in range(n))
+    
+    return {
+        "user_info": {"name": "小明", "age": "24", "occupation": "程序员"},
+        "preferences": [{"content": text(2), "timestamp": f"2025-01-{i % 28 + 1:02d}T12:00:00"} for i in range(50)],
+        "important_events": [{"content": text(3), "timestamp": "2025-02-01T08:30:00"} for _ in range(50)],
+        "other": [{"content": text(2), "timestamp": "2025-03-01T20:15:00"} for _ in range(50)],
+        "conversation_summaries": [
+            {"summary": text(8), "timestamp": f"2025-04-{i % 28 + 1:02d}T21:00:00", "message_count": 20}
+            for i in range(summaries)
+        ],
+    }
+
+
+def timed(fn: Callable[[], object], rounds: int) -> float:
+    """重复执行多次，返回中位数耗时（毫秒）"""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def legacy_render(memories: Dict) -> bytes:
+    """原方式：response_model 校验 + jsonable_encoder + JSONResponse"""
+    model = MemoryResponse(success=True, memories=memories)
+    validated = MemoryResponse.model_validate(model.model_dump())
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_render(memories: Dict) -> bytes:
+    """新方式：直接用 FastJSONResponse 序列化"""
+    return FastJSONResponse({"success": True, "memories": memories, "message": None}).body
+
+
+def run(args) -> Dict:
+    middleware = CompressionMiddleware(app=None)
+    results: Dict = {"orjson": orjson is not None, "encodings": middleware.encodings, "payloads": []}
+    for summaries in args.summaries:
+        memories = make_memories(summaries)
+        body = fast_render(memories)
+        assert json.loads(body) == json.loads(legacy_render(memories))
+        row = {
+            "summaries": summaries,
+            "legacy_ms": timed(lambda: legacy_render(memories), args.rounds),
+            "fast_ms": timed(lambda: fast_render(memories), args.rounds),
+            "bytes": {"identity": len(body)},
+            "compress_ms": {},
+        }
+        for encoding in middleware.encodings:
+            row["bytes"][encoding] = len(middleware.compress(body, encoding))
+            row["compress_ms"][encoding] = timed(lambda: middleware.compress(body, encoding), args.rounds)
+        results["payloads"].append(row)
+    return results
+
+
+def print_results(results: Dict) -> None:
+    print(f"orjson {'可用' if results['orjson'] else '不可用（使用标准库）'}，压缩编码: {', '.join(results['encodings'])}\n")
+    print(f"  {'总结条数':>8} {'原方式ms':>10} {'新方式ms':>10} {'原始KB':>10} {'gzip KB':>10} {'br KB':>10} "
+          f"{'gzip ms':>9} {'br ms':>9}")
+    for row in results["payloads"]:
+        size = row["bytes"]
+        ms = row["compress_ms"]
+        print(f"  {row['summaries']:>8} {row['legacy_ms']:>10} {row['fast_ms']:>10} {size['identity'] / 1024:>10.1f} "
+              f"{size.get('gzip', 0) / 1024:>10.1f} {size.get('br', 0) / 1024:>10.1f} "
+              f"{ms.get('gzip', 0):>9} {ms.get('br', 0):>9}")
+
+
+def main(argv: List[str] = None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="大体积 JSON 响应的序列化和压缩基准测试")
+    parser.add_argument("--summaries", type=int, nargs="+", default=[100, 1000, 5000], help="对话总结条数")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--output", help="结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+    
+    results = run(args)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
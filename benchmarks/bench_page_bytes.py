@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+页面加载字节数基准测试
+
+对比两种方式下打开主页面（index.html + 页面引用的本地静态资源）传输的字节数和请求数：
+- 原方式：每次从磁盘读取 index.html，通过 /static/ 提供未压缩的文件（浏览器按 ETag 重新验证）
+- 资源管线：入口页面常驻内存，资源带内容哈希、预压缩、可永久缓存
+
+分别模拟首次访问和再次访问（浏览器缓存已有内容），以及不同的 Accept-Encoding。
+CDN 上的第三方脚本（React、Babel 等）不计入。
+
+使用说明（在项目根目录运行）：
+    python -m benchmarks.bench_page_bytes
+    python -m benchmarks.bench_page_bytes --output page_bytes.json
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import HTMLResponse
+from fastapi.staticfiles import StaticFiles
+from fastapi.testclient import TestClient
+
+from static_assets import AssetPipeline
+
+STATIC_DIR = PROJECT_ROOT / "static"
+LOCAL_REF_PATTERN = re.compile(r'(?:src|href)="(/(?:static|assets)/[^"]+)"')
+ENCODINGS = {"identity": "identity", "gzip": "gzip, deflate", "br": "gzip, deflate, br"}
+
+
+def legacy_app() -> FastAPI:
+    """原方式：每次读磁盘返回 index.html，StaticFiles 提供未压缩的文件"""
+    app = FastAPI()
+    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+    
+    @app.get("/", response_class=HTMLResponse)
+    async def read_root():
+        with open(STATIC_DIR / "index.html", "r", encoding="utf-8") as f:
+            return f.read()
+    
+    return app
+
+
+def pipeline_app() -> FastAPI:
+    """资源管线：与 web_app 中的路由相同"""
+    app = FastAPI()
+    pipeline = AssetPipeline(str(STATIC_DIR))
+    pipeline.build()
+    
+    def respond(asset, request: Request) -> Response:
+        status_code, body, headers = AssetPipeline.respond(asset, request.headers)
+        return Response(content=body, status_code=status_code, headers=headers)
+    
+    @app.get("/")
+    async def read_root(request: Request):
+        return respond(pipeline.index, request)
+    
+    @app.get("/assets/{name}")
+    async def get_asset(name: str, request: Request):
+        return respond(pipeline.get(name), request)
+    
+    return app
+
+
+def response_bytes(response) -> int:
+    """响应在网络上的字节数（近似：状态行 + 响应头 + 压缩后的响应体）"""
+    header_bytes = sum(len(k) + len(v) + 4 for k, v in response.headers.items()) + 17
+    return header_bytes + int(response.headers.get("content-length", len(response.content)))
+
+
+class Browser:
+    """最小化的浏览器缓存模型：遵守 Cache-Control 的 immutable/max-age，其余按 ETag/Last-Modified 重新验证"""
+    
+    def __init__(self, client: TestClient, accept_encoding: str):
+        self.client = client
+        self.accept_encoding = accept_encoding
+        self.cache: Dict[str, Dict[str, Optional[str]]] = {}
+    
+    def fetch(self, url: str, stats: Dict) -> Optional[str]:
+        cached = self.cache.get(url)
+        if cached and "immutable" in (cached["cache_control"] or ""):
+            stats["from_cache"] += 1
+            return cached["text"]
+        headers = {"Accept-Encoding": self.accept_encoding}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+        # TestClient 会自动解压，content-length 仍是压缩后的长度
+        response = self.client.get(url, headers=headers)
+        stats["requests"] += 1
+        stats["bytes"] += response_bytes(response)
+        if response.status_code == 304:
+            stats["not_modified"] += 1
+            return cached["text"]
+        self.cache[url] = {
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "cache_control": response.headers.get("cache-control"),
+            "text": response.text,
+        }
+        return response.text
+    
+    def load_page(self) -> Dict:
+        stats = {"requests": 0, "bytes": 0, "not_modified": 0, "from_cache": 0}
+        html = self.fetch("/", stats)
+        for url in LOCAL_REF_PATTERN.findall(html):
+            self.fetch(url, stats)
+        return stats
+
+
+def measure_root_latency(client: TestClient, rounds: int) -> float:
+    """主页面请求的中位数耗时（毫秒，不压缩，避免把客户端解压时间算进去）"""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        client.get("/", headers={"Accept-Encoding": "identity"})
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def run(args) -> Dict:
+    results: Dict = {"visits": [], "root_ms": {}}
+    start = time.perf_counter()
+    apps = {"legacy": legacy_app(), "pipeline": pipeline_app()}
+    results["build_seconds"] = round(time.perf_counter() - start, 3)
+    
+    for name, app in apps.items():
+        client = TestClient(app)
+        for label, accept_encoding in ENCODINGS.items():
+            browser = Browser(client, accept_encoding)
+            first = browser.load_page()
+            repeat = browser.load_page()
+            results["visits"].append({"mode": name, "accept_encoding": label, "first": first, "repeat": repeat})
+        results["root_ms"][name] = measure_root_latency(client, args.rounds)
+    return results
+
+
+def print_results(results: Dict) -> None:
+    print(f"资源管线构建耗时: {results['build_seconds']}s\n")
+    print(f"  {'方式':<10} {'编码':<10} {'首次字节':>10} {'首次请求':>8} {'再次字节':>10} {'再次请求':>8}")
+    for row in results["visits"]:
+        first, repeat = row["first"], row["repeat"]
+        print(f"  {row['mode']:<10} {row['accept_encoding']:<10} {first['bytes']:>10} {first['requests']:>8} "
+              f"{repeat['bytes']:>10} {repeat['requests']:>8}")
+    print(f"\n主页面请求耗时（中位数）: 原方式 {results['root_ms']['legacy']} ms，"
+          f"资源管线 {results['root_ms']['pipeline']} ms")
+
+
+def main(argv: List[str] = None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="页面加载字节数基准测试")
+    parser.add_argument("--rounds", type=int, default=200, help="测量主页面耗时的请求次数")
+    parser.add_argument("--output", help="结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+    
+    results = run(args)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
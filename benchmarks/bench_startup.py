@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+冷启动基准测试：导入耗时和启动耗时
+
+分别在新的 Python 进程中（带 -X importtime）测量两个入口：
+- cli：导入 main（显示提示前的耗时），再创建 ChatBot（可以开始对话）
+- web：导入 web_app，再执行启动事件（初始化数据库、构建静态资源等）
+
+解析 -X importtime 的输出，报告总导入耗时和耗时最多的模块（按累计耗时）。
+在临时目录中运行（使用模拟提供者），不会读写项目中的数据库和记忆文件。
+
+使用说明（在项目根目录运行）：
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 5 --top 15 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# 在子进程中执行：分阶段计时，结果以 JSON 打印到标准输出
+ENTRY_SCRIPTS = {
+    "cli": """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from chat_bot import ChatBot
+ChatBot()
+ready = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (ready - imported) * 1000}))
+""",
+    "web": """
+import asyncio, json, time
+start = time.perf_counter()
+import web_app
+imported = time.perf_counter()
+asyncio.run(web_app.app.router.startup())
+ready = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (ready - imported) * 1000}))
+""",
+}
+
+IMPORTTIME_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """
+    解析 -X importtime 的输出
+    
+    Args:
+        stderr: 子进程的标准错误输出
+    
+    Returns:
+        [{"module", "self_us", "cumulative_us", "depth"}]，按导入完成的顺序
+    """
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match:
+            rows.append({
+                "module": match.group(4),
+                "self_us": int(match.group(1)),
+                "cumulative_us": int(match.group(2)),
+                "depth": len(match.group(3)) // 2,
+            })
+    return rows
+
+
+def run_entry(script: str, workdir: str) -> Dict:
+    """在新进程中运行一次入口脚本"""
+    env = dict(os.environ, API_PROVIDER="mock", HOT_RELOAD_ENABLED="false",
+               PYTHONPATH=str(PROJECT_ROOT), PYTHONDONTWRITEBYTECODE="1")
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(process.stdout.strip().splitlines()[-1])
+    timings["modules"] = parse_importtime(process.stderr)
+    return timings
+
+
+def summarize(runs: List[Dict], top: int) -> Dict:
+    """汇总多次运行：阶段耗时取中位数，模块耗时取最后一次运行"""
+    modules = runs[-1]["modules"]
+    # 只列出项目模块和直接依赖（缩进不超过 2 层），避免同一棵导入树重复出现
+    heaviest = sorted((m for m in modules if m["depth"] <= 2), key=lambda m: m["cumulative_us"], reverse=True)
+    return {
+        "import_ms": round(statistics.median(r["import_ms"] for r in runs), 1),
+        "startup_ms": round(statistics.median(r["startup_ms"] for r in runs), 1),
+        "modules_imported": len(modules),
+        "heaviest": [
+            {"module": m["module"], "depth": m["depth"], "cumulative_ms": round(m["cumulative_us"] / 1000, 1)}
+            for m in heaviest[:top]
+        ],
+        "sdk_imported": sorted({m["module"] for m in modules} & {"openai", "anthropic", "passlib"}),
+    }
+
+
+def run(args) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    os.symlink(PROJECT_ROOT / "static", Path(workdir, "static"))
+    results: Dict = {"python": sys.version.split()[0], "entries": {}}
+    for name in args.entries:
+        runs = [run_entry(ENTRY_SCRIPTS[name], workdir) for _ in range(args.runs)]
+        results["entries"][name] = summarize(runs, args.top)
+    return results
+
+
+def print_results(results: Dict) -> None:
+    print(f"Python {results['python']}")
+    for name, entry in results["entries"].items():
+        print(f"\n[{name}] 导入 {entry['import_ms']} ms，启动 {entry['startup_ms']} ms，"
+              f"共导入 {entry['modules_imported']} 个模块，已加载的 SDK: {', '.join(entry['sdk_imported']) or '无'}")
+        for module in entry["heaviest"]:
+            print(f"  {module['cumulative_ms']:>8.1f} ms  {'  ' * module['depth']}{module['module']}")
+
+
+def main(argv: List[str] = None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="冷启动基准测试（导入耗时和启动耗时）")
+    parser.add_argument("--entries", nargs="+", choices=sorted(ENTRY_SCRIPTS), default=["cli", "web"])
+    parser.add_argument("--runs", type=int, default=3, help="每个入口运行的次数（取中位数）")
+    parser.add_argument("--top", type=int, default=12, help="列出耗时最多的模块数")
+    parser.add_argument("--output", help="结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+    
+    results = run(args)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+管理接口用户分页和搜索的基准测试
+
+在临时 SQLite 数据库中生成大量用户（默认 100 万），对比：
+- OFFSET 分页与键集分页（after_id）在不同翻页深度下的耗时
+- LIKE '%x%' 扫描与 FTS5 trigram 索引的子串搜索耗时
+- 逐批遍历导出全部用户（NDJSON）的吞吐量
+
+使用说明（在项目根目录运行）：
+    python -m benchmarks.bench_user_search
+    python -m benchmarks.bench_user_search --users 200000 --output user_search.json
+
+不会读写项目中的数据库。
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from db import crud
+from db.database import ensure_username_index
+from db.models import Base
+
+WORDS = ["alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi", "ivan", "judy",
+         "mallory", "niaj", "olivia", "peggy", "rupert", "sybil", "trent", "victor", "walter", "小明", "小红"]
+
+
+def timed(fn: Callable[[], object], rounds: int = 5) -> float:
+    """重复执行多次，返回中位数耗时（毫秒）"""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def populate(engine, count: int, batch_size: int = 50000) -> None:
+    """
+    批量写入测试用户（直接执行 SQL，跳过密码哈希）
+    
+    Args:
+        engine: 数据库引擎
+        count: 用户数
+        batch_size: 每批写入的行数
+    """
+    rng = random.Random(42)
+    created_at = datetime(2025, 1, 1).isoformat(sep=" ")
+    with engine.begin() as conn:
+        for start in range(0, count, batch_size):
+            rows = [
+                {"username": f"{rng.choice(WORDS)}_{i:07d}", "password_hash": "x", "created_at": created_at}
+                for i in range(start, min(start + batch_size, count))
+            ]
+            conn.execute(
+                text("INSERT INTO users (username, password_hash, created_at) VALUES (:username, :password_hash, :created_at)"),
+                rows
+            )
+
+
+def run(args) -> Dict:
+    workdir = tempfile.mkdtemp(prefix="bench_user_search_")
+    engine = create_engine(f"sqlite:///{Path(workdir, 'bench.db')}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    
+    start = time.perf_counter()
+    populate(engine, args.users)
+    populate_seconds = time.perf_counter() - start
+    
+    # 对已有数据建立索引（rebuild），之后的写入由触发器维护
+    start = time.perf_counter()
+    has_fts = ensure_username_index(engine)
+    index_seconds = time.perf_counter() - start
+    
+    db = sessionmaker(bind=engine)()
+    results: Dict = {
+        "users": args.users,
+        "populate_seconds": round(populate_seconds, 2),
+        "index_build_seconds": round(index_seconds, 2),
+        "fts": has_fts,
+        "pagination": [],
+        "search": [],
+    }
+    
+    # 分页：在不同深度取一页
+    for depth in [0, args.users // 10, args.users // 2, args.users - args.page_size]:
+        after_id = depth or None  # 自增 ID 从 1 开始连续，第 depth 行之后的游标就是 depth
+        results["pagination"].append({
+            "depth": depth,
+            "offset_ms": timed(lambda: crud.get_all_users(db, skip=depth, limit=args.page_size)),
+            "keyset_ms": timed(lambda: crud.get_users_page(db, after_id=after_id, limit=args.page_size)),
+        })
+        db.expunge_all()
+    
+    # 搜索：常见词（匹配很多行，取第一页）、稀有子串（匹配少量行）、不存在的子串（LIKE 最坏情况）
+    for query in ["alice", "_0123", "0999999", "zzz_not_found"]:
+        results["search"].append({
+            "query": query,
+            "matches_first_page": len(crud.search_users_page(db, query, limit=args.page_size)),
+            "like_ms": timed(lambda: crud.search_users_by_username(db, query, limit=args.page_size)),
+            "index_ms": timed(lambda: crud.search_users_page(db, query, limit=args.page_size)),
+        })
+        db.expunge_all()
+    
+    # 导出：逐批遍历并序列化为 NDJSON
+    start = time.perf_counter()
+    exported = 0
+    for user in crud.iter_users(db):
+        json.dumps({"id": user.id, "username": user.username, "api_key": user.api_key,
+                    "created_at": user.created_at.isoformat()}, ensure_ascii=False)
+        exported += 1
+    export_seconds = time.perf_counter() - start
+    results["export"] = {
+        "rows": exported,
+        "seconds": round(export_seconds, 2),
+        "rows_per_second": round(exported / export_seconds) if export_seconds else None,
+    }
+    
+    db.close()
+    engine.dispose()
+    results["db_bytes"] = os.path.getsize(Path(workdir, "bench.db"))
+    return results
+
+
+def print_results(results: Dict) -> None:
+    print(f"用户数: {results['users']}（写入 {results['populate_seconds']}s，建索引 {results['index_build_seconds']}s，"
+          f"trigram 索引{'可用' if results['fts'] else '不可用'}，数据库 {results['db_bytes'] / 1e6:.0f} MB）")
+    print("\n分页（每页耗时，毫秒）:")
+    print(f"  {'深度':>10} {'OFFSET':>10} {'键集':>10}")
+    for row in results["pagination"]:
+        print(f"  {row['depth']:>10} {row['offset_ms']:>10} {row['keyset_ms']:>10}")
+    print("\n搜索（第一页耗时，毫秒）:")
+    print(f"  {'搜索词':<16} {'匹配':>6} {'LIKE':>10} {'索引':>10}")
+    for row in results["search"]:
+        print(f"  {row['query']:<16} {row['matches_first_page']:>6} {row['like_ms']:>10} {row['index_ms']:>10}")
+    export = results["export"]
+    print(f"\n导出: {export['rows']} 行，{export['seconds']}s（{export['rows_per_second']} 行/秒）")
+
+
+def main(argv: List[str] = None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="用户分页和搜索基准测试")
+    parser.add_argument("--users", type=int, default=1_000_000, help="生成的用户数")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--output", help="结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+    
+    results = run(args)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
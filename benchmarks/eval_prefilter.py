@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+记忆预筛器离线评估
+
+在带标注的对话样本上运行 HeuristicPreFilter，报告：
+- 跳过率：多少次 LLM 记忆过滤调用被省掉
+- 召回损失：标注为"值得储存"的对话中，被预筛错误跳过的比例（应尽量为 0）
+- 单次判断耗时
+
+样本文件为 JSONL，每行：{"should_save": true/false, "conversation": [{"role": "user", "content": "..."}, ...]}
+
+使用说明（在项目根目录运行）：
+    python -m benchmarks.eval_prefilter
+    python -m benchmarks.eval_prefilter --samples my_samples.jsonl --verbose
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from memory.prefilter import HeuristicPreFilter
+
+DEFAULT_SAMPLES = Path(__file__).resolve().parent / "data" / "prefilter_samples.jsonl"
+
+
+def load_samples(path: Path) -> List[Dict]:
+    """
+    读取标注样本
+
+    Args:
+        path: JSONL 文件路径
+
+    Returns:
+        样本列表
+    """
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                samples.append(json.loads(line))
+    return samples
+
+
+def evaluate(prefilter: HeuristicPreFilter, samples: List[Dict], verbose: bool = False) -> Dict:
+    """
+    在样本上评估预筛器
+
+    Args:
+        prefilter: 预筛器
+        samples: 标注样本
+        verbose: 是否打印每条被跳过的样本
+
+    Returns:
+        评估结果
+    """
+    positives = sum(1 for s in samples if s["should_save"])
+    negatives = len(samples) - positives
+    skipped = 0
+    skipped_negatives = 0
+    missed = []
+
+    for sample in samples:
+        skip, reason = prefilter.classify(sample["conversation"])
+        if not skip:
+            continue
+        skipped += 1
+        first_user = next((m["content"] for m in sample["conversation"] if m["role"] == "user"), "")
+        if sample["should_save"]:
+            missed.append((first_user, reason))
+        else:
+            skipped_negatives += 1
+        if verbose:
+            mark = "✗" if sample["should_save"] else "✓"
+            print(f"  {mark} 跳过: {first_user[:30]}（{reason}）")
+
+    # 单次判断耗时
+    rounds = 200
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for sample in samples:
+            prefilter._classify(sample["conversation"])
+    per_call_us = (time.perf_counter() - start) / (rounds * len(samples)) * 1e6
+
+    return {
+        "samples": len(samples),
+        "positives": positives,
+        "negatives": negatives,
+        "skipped": skipped,
+        "skip_rate": skipped / len(samples) if samples else 0.0,
+        "negative_skip_rate": skipped_negatives / negatives if negatives else 0.0,
+        "recall_loss": len(missed) / positives if positives else 0.0,
+        "missed": missed,
+        "per_call_us": per_call_us
+    }
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="记忆预筛器离线评估")
+    parser.add_argument("--samples", type=Path, default=DEFAULT_SAMPLES, help="标注样本（JSONL）")
+    parser.add_argument("--verbose", action="store_true", help="打印每条被跳过的样本")
+    args = parser.parse_args()
+
+    prefilter = HeuristicPreFilter()
+    samples = load_samples(args.samples)
+    result = evaluate(prefilter, samples, verbose=args.verbose)
+
+    print(f"样本数: {result['samples']}（值得储存 {result['positives']}，不值得储存 {result['negatives']}）")
+    print(f"跳过 LLM 调用: {result['skipped']} 次，跳过率 {result['skip_rate']:.1%}")
+    print(f"不值得储存的对话中被跳过: {result['negative_skip_rate']:.1%}")
+    print(f"召回损失: {result['recall_loss']:.1%}")
+    for text, reason in result["missed"]:
+        print(f"  漏掉: {text}（{reason}）")
+    print(f"单次判断耗时: {result['per_call_us']:.1f} µs")
+
+    # 有召回损失时退出码为 1，便于在调整规则后快速发现问题
+    sys.exit(1 if result["missed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
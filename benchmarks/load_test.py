@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+端到端压测脚本：模拟用户按 static/app.jsx 的方式使用 Web 应用
+
+每个虚拟用户依次执行：
+    检查登录状态 -> 登录 -> 加载人设 -> 加载记忆 -> 按思考时间多轮聊天
+    -> 手动总结 -> 重新加载记忆 -> 登出
+
+所有虚拟用户运行在同一个 asyncio 进程中，共享一个连接池，
+结束后输出每个接口的 p50/p95/p99 延迟、错误数和吞吐量。
+
+使用说明：
+1. 以模拟上游启动服务（不消耗真实 API 额度）：
+   API_PROVIDER=mock MOCK_LATENCY_MS=800 uvicorn web_app:app --port 8000
+2. 首次运行时创建压测账户（需要 admin 账户）：
+   python benchmarks/load_test.py --users 2000 --create-users --admin-password admin123
+3. 运行压测：
+   python benchmarks/load_test.py --users 2000 --chats 5 --think-time 3 --output load_result.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import defaultdict
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import Dict, List, Optional
+
+import httpx
+
+
+class LoadStats:
+    """收集每个接口的延迟和错误"""
+    
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_samples: Dict[str, str] = {}
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+    
+    def record(self, endpoint: str, latency_ms: float, error: Optional[str] = None):
+        """
+        记录一次请求
+        
+        Args:
+            endpoint: 接口名（如 "POST /api/chat"）
+            latency_ms: 延迟（毫秒）
+            error: 错误描述，成功时为 None
+        """
+        self.latencies[endpoint].append(latency_ms)
+        if error:
+            self.errors[endpoint] += 1
+            self.error_samples.setdefault(endpoint, error)
+    
+    @staticmethod
+    def percentile(sorted_values: List[float], pct: float) -> float:
+        """计算百分位数（最近秩法）"""
+        if not sorted_values:
+            return 0.0
+        rank = math.ceil(pct / 100 * len(sorted_values))
+        return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+    
+    def report(self) -> Dict:
+        """
+        生成压测报告
+        
+        Returns:
+            报告字典
+        """
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        endpoints = {}
+        total_requests = 0
+        total_errors = 0
+        for endpoint, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            total_requests += len(ordered)
+            total_errors += self.errors[endpoint]
+            endpoints[endpoint] = {
+                "count": len(ordered),
+                "errors": self.errors[endpoint],
+                "p50_ms": round(self.percentile(ordered, 50), 2),
+                "p95_ms": round(self.percentile(ordered, 95), 2),
+                "p99_ms": round(self.percentile(ordered, 99), 2),
+                "max_ms": round(ordered[-1], 2),
+                "rps": round(len(ordered) / elapsed, 2) if elapsed > 0 else 0,
+                "error_sample": self.error_samples.get(endpoint),
+            }
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "total_requests": total_requests,
+            "total_errors": total_errors,
+            "throughput_rps": round(total_requests / elapsed, 2) if elapsed > 0 else 0,
+            "endpoints": endpoints,
+        }
+
+
+class VirtualUser:
+    """一个虚拟用户，复现前端的请求顺序"""
+    
+    def __init__(self, client: httpx.AsyncClient, stats: LoadStats, username: str, password: str, args):
+        self.client = client
+        self.stats = stats
+        self.username = username
+        self.password = password
+        self.args = args
+        self.session_id: Optional[str] = None
+        self.rng = random.Random(f"{args.seed}-{username}")
+    
+    async def request(self, method: str, path: str, name: Optional[str] = None,
+                      expect_success: bool = False, **kwargs) -> Optional[httpx.Response]:
+        """
+        发送一次请求并记录延迟
+        
+        Args:
+            method: HTTP 方法
+            path: 请求路径
+            name: 统计用的接口名，默认为 "METHOD path"
+            expect_success: 是否把响应体中的 success=false 也计为错误
+            **kwargs: 传给 httpx 的其他参数
+        
+        Returns:
+            响应对象，网络错误时返回 None
+        """
+        name = name or f"{method} {path}"
+        headers = kwargs.pop("headers", {})
+        if self.session_id:
+            headers["Cookie"] = f"session_id={self.session_id}"
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.stats.record(name, (time.perf_counter() - start) * 1000, f"{type(e).__name__}: {e}")
+            return None
+        latency_ms = (time.perf_counter() - start) * 1000
+        
+        error = None
+        if response.status_code >= 400:
+            error = f"HTTP {response.status_code}: {response.text[:200]}"
+        elif expect_success:
+            try:
+                body = response.json()
+                if not body.get("success", False):
+                    error = f"success=false: {body.get('error') or body.get('message')}"
+            except ValueError:
+                error = "响应不是 JSON"
+        self.stats.record(name, latency_ms, error)
+        return response
+    
+    async def think(self):
+        """模拟用户思考时间（指数分布）"""
+        if self.args.think_time > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / self.args.think_time))
+    
+    async def run(self):
+        """执行一次完整的用户会话"""
+        # 页面加载时检查登录状态（未登录返回 401，不计为错误）
+        start = time.perf_counter()
+        try:
+            await self.client.get("/auth/me")
+            self.stats.record("GET /auth/me", (time.perf_counter() - start) * 1000)
+        except httpx.HTTPError as e:
+            self.stats.record("GET /auth/me", (time.perf_counter() - start) * 1000, str(e))
+        
+        response = await self.request(
+            "POST", "/auth/login",
+            json={"username": self.username, "password": self.password}
+        )
+        if response is None or response.status_code != 200:
+            return
+        self.session_id = response.cookies.get("session_id")
+        
+        await self.request("GET", "/api/persona", expect_success=True)
+        await self.request("GET", "/api/memory", expect_success=True)
+        
+        for i in range(self.args.chats):
+            await self.think()
+            message = self.rng.choice(self.args.messages)
+            await self.request("POST", "/api/chat", json={"message": f"{message}（第{i + 1}轮）"}, expect_success=True)
+        
+        if self.args.summarize:
+            await self.request("POST", "/api/summarize")
+            await self.request("GET", "/api/memory", expect_success=True)
+        
+        await self.request("POST", "/auth/logout")
+
+
+DEFAULT_MESSAGES = [
+    "你好呀，今天过得怎么样？",
+    "我叫小林，是一名程序员，住在杭州。",
+    "好困啊，今天加班到很晚。",
+    "我喜欢猫，家里养了一只橘猫叫年糕。",
+    "明天提醒我早点起床去跑步。",
+    "哈哈哈，这个笑话真好笑。",
+    "最近在准备考研，压力有点大。",
+]
+
+
+async def create_users(args):
+    """以 admin 身份批量创建压测账户（已存在的账户会被跳过）"""
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+        response = await client.post(
+            "/auth/login", json={"username": args.admin_username, "password": args.admin_password}
+        )
+        if response.status_code != 200:
+            print(f"❌ admin 登录失败: {response.status_code} {response.text}")
+            sys.exit(1)
+        cookie = {"Cookie": f"session_id={response.cookies.get('session_id')}"}
+        semaphore = asyncio.Semaphore(args.max_connections)
+        created = 0
+        
+        async def create(index: int):
+            nonlocal created
+            async with semaphore:
+                r = await client.post(
+                    "/admin/create_user",
+                    headers=cookie,
+                    json={"username": f"{args.user_prefix}{index}", "password": args.password}
+                )
+                if r.status_code == 200:
+                    created += 1
+        
+        await asyncio.gather(*(create(i) for i in range(args.users)))
+        print(f"✓ 已创建 {created} 个压测账户（共 {args.users} 个）")
+
+
+async def run_load(args) -> Dict:
+    """运行压测并返回报告"""
+    stats = LoadStats()
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    # 所有虚拟用户共享一个连接池，因此客户端不能保存 Cookie，会话 Cookie 由每个虚拟用户自己携带
+    no_cookies = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits,
+                                 cookies=no_cookies) as client:
+        tasks = []
+        for i in range(args.users):
+            user = VirtualUser(client, stats, f"{args.user_prefix}{i}", args.password, args)
+            tasks.append(asyncio.create_task(user.run()))
+            # 在 ramp-up 时间内均匀启动虚拟用户
+            if args.ramp_up > 0:
+                await asyncio.sleep(args.ramp_up / args.users)
+        await asyncio.gather(*tasks)
+    stats.finished_at = time.perf_counter()
+    return stats.report()
+
+
+def print_report(report: Dict):
+    """打印压测报告"""
+    print("\n" + "=" * 100)
+    print(f"压测结果：耗时 {report['elapsed_seconds']}s，"
+          f"请求 {report['total_requests']} 次，错误 {report['total_errors']} 次，"
+          f"吞吐量 {report['throughput_rps']} req/s")
+    print("=" * 100)
+    print(f"{'接口':<24} {'次数':>8} {'错误':>6} {'p50(ms)':>10} {'p95(ms)':>10} {'p99(ms)':>10} {'max(ms)':>10} {'rps':>8}")
+    print("-" * 100)
+    for endpoint, s in report["endpoints"].items():
+        print(f"{endpoint:<24} {s['count']:>8} {s['errors']:>6} {s['p50_ms']:>10} {s['p95_ms']:>10} "
+              f"{s['p99_ms']:>10} {s['max_ms']:>10} {s['rps']:>8}")
+    for endpoint, s in report["endpoints"].items():
+        if s["error_sample"]:
+            print(f"⚠️  {endpoint} 错误示例: {s['error_sample']}")
+    print("=" * 100)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="登录 + 聊天会话的端到端压测")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=100, help="虚拟用户数")
+    parser.add_argument("--chats", type=int, default=5, help="每个用户的聊天轮数")
+    parser.add_argument("--think-time", type=float, default=2.0, help="两次聊天之间的平均思考时间（秒）")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="启动全部虚拟用户所用的时间（秒）")
+    parser.add_argument("--no-summarize", dest="summarize", action="store_false", help="不触发 /api/summarize")
+    parser.add_argument("--user-prefix", default="loadtest_")
+    parser.add_argument("--password", default="loadtest_password")
+    parser.add_argument("--create-users", action="store_true", help="压测前以 admin 身份创建账户")
+    parser.add_argument("--admin-username", default="admin")
+    parser.add_argument("--admin-password", default="")
+    parser.add_argument("--max-connections", type=int, default=500, help="连接池大小")
+    parser.add_argument("--timeout", type=float, default=120.0, help="单次请求超时（秒）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="把报告写入 JSON 文件")
+    args = parser.parse_args(argv)
+    args.messages = DEFAULT_MESSAGES
+    return args
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    if args.create_users:
+        asyncio.run(create_users(args))
+    
+    print(f"开始压测：{args.users} 个虚拟用户，每人 {args.chats} 轮聊天，目标 {args.base_url}")
+    report = asyncio.run(run_load(args))
+    print_report(report)
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✓ 报告已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+核心热点路径的微基准测试
+
+覆盖：
+- SimpleMemory.add_message / get_history（不同历史长度）
+- LongTermMemory.to_system_context（缓存命中 / 记忆变化后）/ update_memory / add_summary（10 ~ 10k 条记忆）
+- PersonaManager.to_system_message
+- web_app._get_user_api_key_for_provider
+- security.auth.get_current_user（已填充数据的 SQLite）
+- argon2 密码验证
+
+使用说明（在项目根目录运行）：
+1. 运行并保存为基线：python -m benchmarks.micro_bench run --output benchmarks/baseline.json
+2. 修改代码后再次运行：python -m benchmarks.micro_bench run --output bench_result.json
+3. 与基线比较（有回归时退出码为 1）：
+   python -m benchmarks.micro_bench compare benchmarks/baseline.json bench_result.json --threshold 0.25
+
+所有测试都在临时目录中运行，不会读写项目中的记忆、人设文件和数据库。
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# 记忆规模（条数）
+MEMORY_SIZES = [10, 100, 1000, 10000]
+# 对话历史长度
+HISTORY_LENGTHS = [20, 200, 2000]
+
+MEMORY_CATEGORIES = ["personal_profile", "preference", "relationship", "important_event", "plan", "long_term_goal", "other"]
+
+
+# ========== 计时工具 ==========
+
+def measure(fn: Callable[[], None], min_round_seconds: float = 0.02, rounds: int = 7, max_number: int = 100000) -> Dict:
+    """
+    测量函数单次调用耗时
+    
+    先自动确定每轮调用次数（使一轮至少持续 min_round_seconds），再重复多轮取中位数。
+    
+    Args:
+        fn: 被测函数（无参数）
+        min_round_seconds: 每轮最短时间
+        rounds: 轮数
+        max_number: 每轮最大调用次数
+    
+    Returns:
+        {"median_us", "min_us", "mean_us", "rounds", "number"}
+    """
+    number = 1
+    while number < max_number:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_round_seconds:
+            break
+        number *= 2
+    
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    
+    return {
+        "median_us": round(statistics.median(samples), 3),
+        "min_us": round(min(samples), 3),
+        "mean_us": round(statistics.fmean(samples), 3),
+        "rounds": rounds,
+        "number": number,
+    }
+
+
+# ========== 测试数据 ==========
+
+def build_memories(size: int) -> Dict:
+    """生成包含 size 条记忆的记忆字典"""
+    memories = {category: [] for category in MEMORY_CATEGORIES}
+    for i in range(size):
+        category = MEMORY_CATEGORIES[i % len(MEMORY_CATEGORIES)]
+        memories[category].append({
+            "content": f"用户的第{i}条记忆：喜欢在周末去第{i % 97}家咖啡店看书",
+            "reason": "稳定偏好",
+            "created_at": "2025-01-01T00:00:00"
+        })
+    memories["conversation_summaries"] = [
+        {"summary": f"第{i}次对话总结", "memories_added": [], "memories_updated": [], "notes": "", "created_at": "2025-01-01T00:00:00"}
+        for i in range(size // 10)
+    ]
+    memories["notes_for_future"] = "多关心用户的睡眠情况"
+    return memories
+
+
+def write_memory_file(user_id: int, size: int):
+    """为指定用户写入记忆文件"""
+    Path("memory").mkdir(exist_ok=True)
+    with open(f"memory/user_{user_id}_long_term_memory.json", "w", encoding="utf-8") as f:
+        json.dump(build_memories(size), f, ensure_ascii=False)
+
+
+# ========== 测试用例 ==========
+
+def bench_simple_memory() -> List[Tuple[str, Callable[[], None], Dict]]:
+    from memory.simple_memory import SimpleMemory
+    
+    cases = []
+    for length in HISTORY_LENGTHS:
+        memory = SimpleMemory(max_length=length)
+        memory.set_system_message("系统消息" * 100)
+        for i in range(length):
+            memory.add_message("user" if i % 2 == 0 else "assistant", f"消息{i}")
+        
+        # 历史已满，每次添加都会触发裁剪（稳定状态）
+        cases.append((f"simple_memory.add_message[len={length}]",
+                      lambda m=memory: m.add_message("user", "新的消息"), {}))
+        cases.append((f"simple_memory.get_history[len={length}]",
+                      lambda m=memory: m.get_history(), {}))
+    return cases
+
+
+def bench_long_term_memory() -> List[Tuple[str, Callable[[], None], Dict]]:
+    from memory.long_term_memory import LongTermMemory
+    
+    cases = []
+    for size in MEMORY_SIZES:
+        user_id = 1000 + size
+        write_memory_file(user_id, size)
+        ltm = LongTermMemory(user_id=user_id)
+        
+        # 记忆没有变化时命中按版本号缓存的渲染结果
+        cases.append((f"long_term_memory.to_system_context[n={size}]",
+                      lambda m=ltm: m.to_system_context(), {}))
+        
+        def to_system_context_uncached(m=ltm):
+            # 先标记记忆已变化，测量缓存失效后的完整渲染
+            m.touch()
+            m.to_system_context()
+        
+        cases.append((f"long_term_memory.to_system_context_uncached[n={size}]", to_system_context_uncached, {}))
+        
+        # 更新最后一条记忆（最坏情况的查找路径），内容不变以保持规模稳定
+        last = ltm.memories[MEMORY_CATEGORIES[(size - 1) % len(MEMORY_CATEGORIES)]][-1]["content"]
+        cases.append((f"long_term_memory.update_memory[n={size}]",
+                      lambda m=ltm, t=last: m.update_memory(t, t, "基准测试"),
+                      {"max_number": 200}))
+        
+        summary = {
+            "summary": "基准测试总结",
+            "memories_to_add": [{"type": "preference", "content": "喜欢喝拿铁", "reason": "稳定偏好"}],
+            "memories_to_update": [{"target": last, "content": last, "reason": "基准测试"}],
+            "should_save_memory": True,
+            "notes_for_future_conversation": ""
+        }
+        
+        def add_summary(m=ltm, s=summary):
+            m.add_summary(s)
+            # 通过公开接口回退新增的条目，保持记忆规模和 n-gram 索引稳定，并让版本号记录这次变化
+            m.delete_memory("preference", len(m.memories["preference"]) - 1, save=False)
+            with m.lock:
+                m.memories["conversation_summaries"].pop()
+                m.touch()
+        
+        cases.append((f"long_term_memory.add_summary[n={size}]", add_summary, {"max_number": 50}))
+    return cases
+
+
+def bench_persona() -> List[Tuple[str, Callable[[], None], Dict]]:
+    from persona.persona_manager import PersonaManager
+    
+    manager = PersonaManager(user_id=1)
+    manager.update_persona({field: f"{field}的描述" * 20 for field in PersonaManager.DEFAULT_PERSONA})
+    return [("persona_manager.to_system_message", manager.to_system_message, {})]
+
+
+def bench_api_key_lookup() -> List[Tuple[str, Callable[[], None], Dict]]:
+    Path("static").mkdir(exist_ok=True)
+    from web_app import _get_user_api_key_for_provider
+    
+    user = SimpleNamespace(username="alice", api_key=json.dumps({"deepseek": "sk-deepseek", "openai": "sk-openai"}))
+    legacy_user = SimpleNamespace(username="bob", api_key="sk-legacy")
+    return [
+        ("web_app._get_user_api_key_for_provider[json]",
+         lambda: _get_user_api_key_for_provider(user, "DeepSeekProvider"), {}),
+        ("web_app._get_user_api_key_for_provider[legacy]",
+         lambda: _get_user_api_key_for_provider(legacy_user, "OpenAIProvider"), {}),
+    ]
+
+
+def bench_get_current_user(user_count: int = 10000) -> List[Tuple[str, Callable[[], None], Dict]]:
+    from datetime import timedelta
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from db.models import Base, User, Session as SessionModel
+    from security.auth import get_current_user
+    
+    engine = create_engine(f"sqlite:///{Path('bench.db').absolute()}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    db = SessionLocal()
+    expires_at = datetime.utcnow() + timedelta(days=1)
+    db.bulk_save_objects([
+        User(id=i, username=f"user_{i}", password_hash="x", created_at=datetime.utcnow())
+        for i in range(1, user_count + 1)
+    ])
+    db.bulk_save_objects([
+        SessionModel(session_id=f"session_{i}", user_id=i, expires_at=expires_at, created_at=datetime.utcnow())
+        for i in range(1, user_count + 1)
+    ])
+    db.commit()
+    
+    target = f"session_{user_count // 2}"
+    
+    def lookup(session=db):
+        get_current_user(session_id=target, db=session)
+        session.expire_all()
+    
+    return [(f"auth.get_current_user[users={user_count}]", lookup, {})]
+
+
+def bench_password() -> List[Tuple[str, Callable[[], None], Dict]]:
+    from security.password import hash_password, verify_password
+    
+    hashed = hash_password("correct horse battery staple")
+    return [("password.verify_password[argon2]",
+             lambda: verify_password("correct horse battery staple", hashed),
+             {"max_number": 20})]
+
+
+SUITES = [
+    bench_simple_memory,
+    bench_long_term_memory,
+    bench_persona,
+    bench_api_key_lookup,
+    bench_get_current_user,
+    bench_password,
+]
+
+
+# ========== 命令 ==========
+
+def run(args) -> Dict:
+    """运行全部基准测试"""
+    results = {}
+    original_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="chat_bot_bench_") as workdir:
+        os.chdir(workdir)
+        try:
+            for suite in SUITES:
+                for name, fn, options in suite():
+                    if args.filter and args.filter not in name:
+                        continue
+                    rounds = 3 if args.quick else options.get("rounds", 7)
+                    result = measure(fn, rounds=rounds, max_number=options.get("max_number", 100000))
+                    results[name] = result
+                    print(f"{name:<60} {result['median_us']:>14.3f} µs  (x{result['number']})")
+        finally:
+            os.chdir(original_cwd)
+    
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ 结果已写入 {args.output}")
+    return report
+
+
+def compare(args) -> int:
+    """
+    比较两次结果，按中位数判断回归
+    
+    Returns:
+        退出码（有回归时为 1）
+    """
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)["results"]
+    
+    regressions = []
+    print(f"{'测试':<60} {'基线(µs)':>12} {'当前(µs)':>12} {'变化':>9}")
+    print("-" * 100)
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline or name not in current:
+            status = "仅基线" if name in baseline else "新增"
+            print(f"{name:<60} {status:>12}")
+            continue
+        base = baseline[name]["median_us"]
+        now = current[name]["median_us"]
+        change = (now - base) / base if base > 0 else 0
+        flag = ""
+        if change > args.threshold:
+            flag = "  ❌ 回归"
+            regressions.append(name)
+        elif change < -args.threshold:
+            flag = "  ✅ 提升"
+        print(f"{name:<60} {base:>12.3f} {now:>12.3f} {change:>+8.1%}{flag}")
+    
+    print("-" * 100)
+    if regressions:
+        print(f"❌ {len(regressions)} 项超过回归阈值 {args.threshold:.0%}")
+        return 1
+    print(f"✅ 没有超过回归阈值 {args.threshold:.0%} 的测试")
+    return 0
+
+
+def main(argv=None):
+    """主函数"""
+    parser = argparse.ArgumentParser(description="核心热点路径的微基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    run_parser = subparsers.add_parser("run", help="运行基准测试")
+    run_parser.add_argument("--output", help="结果 JSON 文件路径")
+    run_parser.add_argument("--filter", help="只运行名称包含该字符串的测试")
+    run_parser.add_argument("--quick", action="store_true", help="减少轮数，快速运行")
+    
+    compare_parser = subparsers.add_parser("compare", help="与基线比较")
+    compare_parser.add_argument("baseline", help="基线结果 JSON")
+    compare_parser.add_argument("current", help="当前结果 JSON")
+    compare_parser.add_argument("--threshold", type=float, default=0.25, help="回归阈值（相对变化，默认 0.25）")
+    
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,35 @@
 """核心聊天机器人类"""
+import threading
 import time
-from typing import Optional
+from collections import deque
+from typing import Optional, Dict, Iterator, List, Tuple
 from config import Config
 from api_providers.base import BaseAPIProvider
-from api_providers.openai_provider import OpenAIProvider
-from api_providers.deepseek_provider import DeepSeekProvider
-from memory.simple_memory import SimpleMemory
+from api_providers.factory import create_provider
+from memory.simple_memory import SimpleMemory, estimate_tokens
 from memory.memory_filter import MemoryFilter
 from memory.memory_summarizer import MemorySummarizer
 from memory.long_term_memory import LongTermMemory
+from memory.compaction import MemoryCompactor, compact_in_background
 from persona.persona_manager import PersonaManager
 
 
 class ChatBot:
     """聊天机器人核心类"""
     
-    def __init__(self, user_id: Optional[int] = None, api_provider: Optional[BaseAPIProvider] = None):
+    def __init__(
+        self,
+        user_id: Optional[int] = None,
+        api_provider: Optional[BaseAPIProvider] = None,
+        base_dir: Optional[str] = None
+    ):
         """
         初始化聊天机器人
         
         Args:
             user_id: 用户ID，用于数据隔离（可选，向后兼容）
             api_provider: API提供者实例，如果为None则根据配置自动创建
+            base_dir: 人设和记忆文件的根目录（其下的 persona/、memory/），默认为当前目录
         """
         self.user_id = user_id
         
@@ -39,20 +47,27 @@ class ChatBot:
         self.memory = SimpleMemory(max_length=Config.MAX_HISTORY_LENGTH)
         
         # 创建长期记忆管理器（按用户隔离）
-        self.long_term_memory = LongTermMemory(user_id=user_id)
+        self.long_term_memory = LongTermMemory(user_id=user_id, base_dir=base_dir)
         
         # 创建记忆过滤器和总结器
         self.memory_filter = MemoryFilter(self.api_provider)
         self.memory_summarizer = MemorySummarizer(self.api_provider)
         
         # 加载人设并设置系统消息（按用户隔离）
-        self.persona_manager = PersonaManager(user_id=user_id)
-        system_message = self._build_system_message()
-        self.memory.set_system_message(system_message)
+        self.persona_manager = PersonaManager(user_id=user_id, base_dir=base_dir)
+        self._system_message_key = None  # 当前系统消息对应的 (人设版本, 记忆版本)
+        self.refresh_system_message()
         
         # 记录最后活动时间
         self.last_activity_time = time.time()
         self.pending_conversation = []  # 待总结的对话
+        self.rolling_summary = ""  # 本次会话中已总结各段的滚动摘要（长会话分段总结时使用）
+        self._summary_lock = threading.Lock()  # 后台总结逐个执行，滚动摘要按对话顺序更新
+        self._summary_threads: List[threading.Thread] = []
+        # 后台分段总结失败的对话：后台线程不直接修改 pending_conversation，由对话所在的线程合并回去
+        self._failed_chunks: "deque[List[Dict]]" = deque()
+        # 分段总结失败后，在此时间之前不再重试，避免上游持续故障时每轮对话都重复一次失败的总结
+        self._chunk_retry_at = 0.0
     
     def _build_system_message(self) -> str:
         """
@@ -73,102 +88,242 @@ class ChatBot:
         else:
             return persona_message
     
+    def refresh_system_message(self) -> bool:
+        """
+        人设或长期记忆有变化时重新构建系统消息
+        
+        人设和长期记忆各自维护版本号，版本都没有变化时不重新渲染。
+        
+        Returns:
+            系统消息是否被更新
+        """
+        key = (self.persona_manager.version, self.long_term_memory.version)
+        if key == self._system_message_key:
+            return False
+        self.memory.set_system_message(self._build_system_message())
+        self._system_message_key = key
+        return True
+    
     def _create_api_provider(self) -> BaseAPIProvider:
         """根据配置创建API提供者"""
-        if Config.API_PROVIDER == "openai":
-            api_key = Config.OPENAI_API_KEY
-            model = Config.OPENAI_MODEL
-            return OpenAIProvider(api_key, model)
-        elif Config.API_PROVIDER == "deepseek":
-            api_key = Config.DEEPSEEK_API_KEY
-            model = Config.DEEPSEEK_MODEL
-            return DeepSeekProvider(api_key, model)
-        elif Config.API_PROVIDER == "claude":
-            # 后续实现Claude提供者时可以在这里添加
-            raise NotImplementedError("Claude提供者尚未实现")
-        else:
-            raise ValueError(f"不支持的API提供者: {Config.API_PROVIDER}")
+        return create_provider(Config.API_PROVIDER)
     
-    def chat(self, user_input: str, api_key: Optional[str] = None) -> str:
+    def chat(self, user_input: str, api_key: Optional[str] = None, background_summary: bool = False) -> str:
         """
         处理用户输入并返回AI回复
         
         Args:
             user_input: 用户输入的消息
             api_key: 可选的 API 密钥，如果提供则优先使用用户的 key，否则使用默认配置的 key
+            background_summary: 为 True 时需要的对话总结在后台线程中执行，不推迟本次回复
         
         Returns:
             AI的回复
         """
         # 检查是否需要总结之前的对话
-        self._check_and_summarize()
+        self._check_and_summarize(api_key=api_key, background=background_summary)
         
         # 更新活动时间
         self.last_activity_time = time.time()
         
-        # 添加用户消息到历史
-        self.memory.add_message("user", user_input)
-        
-        # 获取完整历史（包括system消息）
-        messages = self.memory.get_history()
-        
-        # 格式化消息为API提供者所需的格式
-        formatted_messages = [
-            self.api_provider.format_message(msg["role"], msg["content"])
-            for msg in messages
-        ]
+        formatted_messages = self._start_turn(user_input)
         
         try:
             # 调用API获取回复，传入用户提供的 api_key（如果有）
             response = self.api_provider.chat(formatted_messages, api_key=api_key)
-            
-            # 添加AI回复到历史
-            self.memory.add_message("assistant", response)
-            
-            # 记录到待总结对话（排除system消息）
-            self.pending_conversation.append({"role": "user", "content": user_input})
-            self.pending_conversation.append({"role": "assistant", "content": response})
-            
+            self._finish_turn(user_input, response)
             return response
         except Exception as e:
             # 如果API调用失败，移除刚添加的用户消息
-            if self.memory.history and self.memory.history[-1]["role"] == "user":
-                self.memory.history.pop()
+            self._cancel_turn()
             raise e
     
-    def _check_and_summarize(self) -> None:
+    def chat_stream(self, user_input: str, api_key: Optional[str] = None, background_summary: bool = False) -> Iterator[str]:
         """
-        检查是否需要总结对话（10分钟无新消息）
+        处理用户输入，逐段返回AI回复（流式输出）
+        
+        回复完整结束后才写入对话历史和待总结对话。调用方中途关闭生成器（如用户按 Ctrl+C 取消）或
+        上游出错时，关闭提供者的流以断开上游请求，并移除刚添加的用户消息。
+        
+        Args:
+            user_input: 用户输入的消息
+            api_key: 可选的 API 密钥
+            background_summary: 为 True 时需要的对话总结在后台线程中执行，不推迟本次回复
+        
+        Yields:
+            回复文本片段
         """
+        self._check_and_summarize(api_key=api_key, background=background_summary)
+        self.last_activity_time = time.time()
+        formatted_messages = self._start_turn(user_input)
+        
+        chunks = self.api_provider.chat_stream(formatted_messages, api_key=api_key)
+        parts = []
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        except BaseException:
+            # 包括调用方关闭生成器（GeneratorExit）和 Ctrl+C（KeyboardInterrupt）
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            self._cancel_turn()
+            raise
+        self._finish_turn(user_input, "".join(parts))
+    
+    def _start_turn(self, user_input: str) -> List[Dict[str, str]]:
+        """
+        把用户消息加入历史，返回发送给API提供者的消息列表
+        
+        Args:
+            user_input: 用户输入的消息
+        
+        Returns:
+            格式化后的完整历史（包括system消息）
+        """
+        self.memory.add_message("user", user_input)
+        return [
+            self.api_provider.format_message(msg["role"], msg["content"])
+            for msg in self.memory.get_history()
+        ]
+    
+    def _finish_turn(self, user_input: str, response: str) -> None:
+        """记录AI回复，并把本轮对话加入待总结对话（排除system消息）"""
+        self.memory.add_message("assistant", response)
+        self._merge_failed_chunks()
+        self.pending_conversation.append({"role": "user", "content": user_input})
+        self.pending_conversation.append({"role": "assistant", "content": response})
+    
+    def _cancel_turn(self) -> None:
+        """本轮没有得到回复时，移除刚添加的用户消息"""
+        if self.memory.history and self.memory.history[-1]["role"] == "user":
+            self.memory.history.pop()
+    
+    def _check_and_summarize(self, api_key: Optional[str] = None, background: bool = False) -> None:
+        """
+        检查是否需要总结对话
+        
+        - 10分钟无新消息：总结剩余对话，会话结束
+        - 待总结对话超过条数或 token 阈值：先总结这一段，滚动摘要带入下一段，会话继续；
+          上一次分段总结失败后，等待 MEMORY_CHUNK_RETRY_DELAY 秒再重试
+        
+        Args:
+            api_key: 可选的 API 密钥，用于总结时的 API 调用
+            background: 为 True 时在后台线程中总结（见 summarize_in_background）
+        """
+        if not self.pending_conversation:
+            return
+        
         current_time = time.time()
         time_since_last_activity = current_time - self.last_activity_time
         
+        if background:
+            idle = time_since_last_activity >= Config.MEMORY_SUMMARY_INTERVAL
+            if idle or self._chunk_summary_due():
+                self.summarize_in_background(api_key=api_key, end_session=idle)
+            return
+        
         # 如果超过设定时间且有待总结的对话
-        if (time_since_last_activity >= Config.MEMORY_SUMMARY_INTERVAL and 
-            len(self.pending_conversation) > 0):
-            
+        if time_since_last_activity >= Config.MEMORY_SUMMARY_INTERVAL:
             try:
-                self._summarize_conversation()
+                self._summarize_conversation(api_key=api_key)
             except Exception as e:
                 print(f"记忆总结失败: {e}")
             finally:
-                # 清空待总结对话
+                # 清空待总结对话，新会话不再沿用之前的滚动摘要
                 self.pending_conversation = []
+                self.rolling_summary = ""
+        elif self._chunk_summary_due():
+            self._summarize_chunk(api_key=api_key)
     
-    def _summarize_conversation(self, api_key: Optional[str] = None) -> None:
+    def _chunk_summary_due(self) -> bool:
+        """待总结对话达到分段总结的阈值，且不在上次失败后的重试等待期内"""
+        return time.time() >= self._chunk_retry_at and self._pending_exceeds_chunk_limit()
+    
+    def _pending_exceeds_chunk_limit(self) -> bool:
+        """待总结对话是否达到分段总结的阈值"""
+        return (len(self.pending_conversation) >= Config.MEMORY_CHUNK_MAX_MESSAGES or
+                estimate_tokens(self.pending_conversation) >= Config.MEMORY_CHUNK_MAX_TOKENS)
+    
+    def _summarize_chunk(self, api_key: Optional[str] = None) -> None:
+        """
+        总结当前这一段对话（长会话不等空闲也能分段入库，每次调用的提示长度有上限）
+        
+        Args:
+            api_key: 可选的 API 密钥，用于总结时的 API 调用
+        """
+        print(f"\n[记忆系统] 待总结对话已达 {len(self.pending_conversation)} 条，分段总结...")
+        try:
+            self._summarize_conversation(api_key=api_key)
+        except Exception as e:
+            print(f"记忆总结失败: {e}")
+            self._chunk_retry_at = time.time() + Config.MEMORY_CHUNK_RETRY_DELAY
+            self._limit_pending()
+            return
+        self.pending_conversation = []
+    
+    def _merge_failed_chunks(self) -> None:
+        """把后台总结失败的对话按原顺序放回待总结对话的开头，等待下次重试"""
+        if not self._failed_chunks:
+            return
+        failed = []
+        while self._failed_chunks:
+            failed.extend(self._failed_chunks.popleft())
+        self.pending_conversation = failed + self.pending_conversation
+        self._limit_pending()
+    
+    def _limit_pending(self) -> None:
+        """总结失败时保留对话等待下次重试，但最多保留两段，避免上游持续故障时无限增长"""
+        limit = Config.MEMORY_CHUNK_MAX_MESSAGES * 2
+        if len(self.pending_conversation) > limit:
+            dropped = len(self.pending_conversation) - limit
+            self.pending_conversation = self.pending_conversation[dropped:]
+            print(f"[记忆系统] 丢弃最早的 {dropped} 条待总结消息")
+    
+    def _update_rolling_summary(self, summary: str) -> None:
+        """
+        把本段的总结追加到滚动摘要，超出长度上限时丢弃最早的部分
+        
+        Args:
+            summary: 本段对话的总结
+        """
+        if not summary:
+            return
+        combined = f"{self.rolling_summary}\n{summary}".strip()
+        max_chars = Config.ROLLING_SUMMARY_MAX_CHARS
+        if len(combined) > max_chars:
+            combined = combined[-max_chars:]
+        self.rolling_summary = combined
+    
+    def _summarize_conversation(
+        self,
+        api_key: Optional[str] = None,
+        conversation: Optional[List[Dict]] = None,
+        context: Optional[str] = None
+    ) -> None:
         """
         总结对话并保存到长期记忆
         
         Args:
             api_key: 可选的 API 密钥，用于总结时的 API 调用
+            conversation: 要总结的对话，默认为当前的待总结对话
+            context: 已取出的对话的滚动摘要；传入时使用它作为上下文，并且不更新本会话的滚动摘要
         """
-        if not self.pending_conversation:
+        if conversation is None:
+            conversation = self.pending_conversation
+        if not conversation:
             return
+        detached = context is not None
+        if not detached:
+            context = self.rolling_summary
         
         print("\n[记忆系统] 正在分析对话...")
         
         # Step 1: 判断是否值得存储
-        filter_result = self.memory_filter.should_save(self.pending_conversation, api_key=api_key)
+        filter_result = self.memory_filter.should_save(
+            conversation, api_key=api_key, context=context or None
+        )
         
         if not filter_result.get("should_save", False):
             print(f"[记忆系统] 对话不值得存储: {filter_result.get('reason', '无重要信息')}")
@@ -178,15 +333,25 @@ class ChatBot:
         print("[记忆系统] 正在提取记忆...")
         
         # Step 2: 提取和总结记忆
-        summary_result = self.memory_summarizer.summarize(self.pending_conversation, api_key=api_key)
+        summary_result = self.memory_summarizer.summarize(
+            conversation, api_key=api_key, context=context or None
+        )
+        if not detached:
+            self._update_rolling_summary(summary_result.get("summary", ""))
         
         # Step 3: 保存到长期记忆
         if summary_result.get("should_save_memory", False):
             self.long_term_memory.add_summary(summary_result)
             
             # 更新系统消息（包含新的长期记忆）
-            new_system_message = self._build_system_message()
-            self.memory.set_system_message(new_system_message)
+            self.refresh_system_message()
+            
+            # 记忆超过上限时在后台压缩，完成后刷新系统消息
+            if Config.LTM_AUTO_COMPACT:
+                compact_in_background(
+                    self.long_term_memory,
+                    on_done=lambda report: self.refresh_system_message()
+                )
             
             print(f"[记忆系统] ✓ 已保存 {len(summary_result.get('memories_to_add', []))} 条新记忆")
             if summary_result.get("memories_to_update"):
@@ -203,6 +368,104 @@ class ChatBot:
         """
         self._summarize_conversation(api_key=api_key)
         self.pending_conversation = []
+        self.rolling_summary = ""
+    
+    def summarize_in_background(self, api_key: Optional[str] = None, end_session: bool = True) -> Optional[threading.Thread]:
+        """
+        在后台线程中总结当前的待总结对话，立即返回（不阻塞下一次输入）
+        
+        待总结对话在调用时取出并清空，之后的对话进入下一段；多次调用的总结按顺序逐个执行。
+        分段总结失败的对话交回对话所在的线程，在下一轮对话结束时放回待总结对话，等待下次重试。
+        
+        Args:
+            api_key: 可选的 API 密钥，用于总结时的 API 调用
+            end_session: 为 True 时总结后清空滚动摘要（会话结束），否则滚动摘要带入下一段
+        
+        Returns:
+            启动的线程，没有待总结对话时返回 None
+        """
+        self._merge_failed_chunks()
+        if not self.pending_conversation:
+            return None
+        conversation = self.pending_conversation
+        self.pending_conversation = []
+        
+        def _run():
+            with self._summary_lock:
+                try:
+                    self._summarize_conversation(api_key=api_key, conversation=conversation)
+                except Exception as e:
+                    print(f"记忆总结失败: {e}")
+                    if not end_session:
+                        self._chunk_retry_at = time.time() + Config.MEMORY_CHUNK_RETRY_DELAY
+                        self._failed_chunks.append(conversation)
+                if end_session:
+                    self.rolling_summary = ""
+        
+        thread = threading.Thread(target=_run, name="memory-summary", daemon=True)
+        self._summary_threads = [t for t in self._summary_threads if t.is_alive()]
+        self._summary_threads.append(thread)
+        thread.start()
+        return thread
+    
+    def take_pending(self) -> Tuple[List[Dict], str]:
+        """
+        取出待总结对话和滚动摘要并清空（会话结束），由调用方负责总结（见 summarize_conversation）
+        
+        Returns:
+            (待总结对话, 滚动摘要)
+        """
+        self._merge_failed_chunks()
+        conversation, context = self.pending_conversation, self.rolling_summary
+        self.pending_conversation = []
+        self.rolling_summary = ""
+        return conversation, context
+    
+    def summarize_conversation(self, conversation: List[Dict], context: str = "", api_key: Optional[str] = None) -> None:
+        """
+        总结一段已取出的对话并保存到长期记忆（与后台总结逐个执行，不影响当前会话的滚动摘要）
+        
+        Args:
+            conversation: 对话（take_pending 的返回值，或之前保存的待总结对话）
+            context: 这段对话的滚动摘要
+            api_key: 可选的 API 密钥，用于总结时的 API 调用
+        
+        Raises:
+            Exception: 总结失败时抛出（调用方决定是否重试）
+        """
+        with self._summary_lock:
+            self._summarize_conversation(api_key=api_key, conversation=conversation, context=context)
+    
+    def wait_for_summaries(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待后台总结完成
+        
+        Args:
+            timeout: 最多等待的秒数，None 表示一直等待
+        
+        Returns:
+            是否全部完成
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in list(self._summary_threads):
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        self._summary_threads = [t for t in self._summary_threads if t.is_alive()]
+        return not self._summary_threads
+    
+    def compact_memory(self, dry_run: bool = False) -> Dict:
+        """
+        立即压缩长期记忆（手动触发）：合并近似重复、限制每类条数、归档旧的对话总结
+        
+        Args:
+            dry_run: 为 True 时只返回报告，不修改记忆
+        
+        Returns:
+            压缩报告（见 MemoryCompactor.compact）
+        """
+        report = MemoryCompactor().compact(self.long_term_memory, dry_run=dry_run)
+        if not dry_run:
+            self.refresh_system_message()
+        return report
     
     def set_system_message(self, content: str) -> None:
         """
@@ -212,14 +475,30 @@ class ChatBot:
             content: 系统消息内容
         """
         self.memory.set_system_message(content)
+        # 自定义内容与版本号无关，下次刷新时重新构建
+        self._system_message_key = None
+    
+    def reload_files(self) -> bool:
+        """
+        人设或长期记忆文件被其他程序修改、删除时重新加载（文件没有变化时只检查修改时间）
+        
+        Returns:
+            是否有变化
+        """
+        memory_changed = self.long_term_memory.reload_if_changed()
+        persona_changed = self.persona_manager.reload()
+        if memory_changed or persona_changed:
+            self.refresh_system_message()
+            return True
+        return False
     
     def reload_persona(self) -> None:
-        """重新加载人设并更新系统消息"""
-        self.persona_manager.load_persona()
-        system_message = self._build_system_message()
-        self.memory.set_system_message(system_message)
+        """从文件重新加载人设（人设文件被其他程序修改后调用）并更新系统消息"""
+        self.persona_manager.reload()
+        self.refresh_system_message()
     
     def clear_history(self) -> None:
         """清空对话历史（保留system消息）"""
         self.memory.clear()
+        self.rolling_summary = ""
 
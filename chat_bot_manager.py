@@ -1,5 +1,6 @@
 """ChatBot 实例管理器 - 按用户隔离"""
-from typing import Dict, Optional, Callable
+import os
+from typing import Dict, Optional, Callable, Iterable, List, Tuple
 from chat_bot import ChatBot
 from api_providers.base import BaseAPIProvider
 
@@ -12,6 +13,10 @@ class ChatBotManager:
         self._bots: Dict[int, ChatBot] = {}
         # 存储用户信息查询函数（用于判断是否是 admin）
         self._user_checker: Optional[Callable[[int], bool]] = None
+        # ChatBot 创建后的回调（如订阅记忆变化）
+        self._bot_created_callbacks: List[Callable[[int, ChatBot], None]] = []
+        # ChatBot 被移除（用户登出）后的回调（如总结待总结对话）
+        self._bot_removed_callbacks: List[Callable[[int, ChatBot], None]] = []
     
     def set_user_checker(self, checker: Callable[[int], bool]):
         """
@@ -22,6 +27,24 @@ class ChatBotManager:
         """
         self._user_checker = checker
     
+    def on_bot_created(self, callback: Callable[[int, ChatBot], None]):
+        """
+        注册 ChatBot 创建后的回调
+        
+        Args:
+            callback: 函数，接收 user_id 和新创建的 ChatBot
+        """
+        self._bot_created_callbacks.append(callback)
+    
+    def on_bot_removed(self, callback: Callable[[int, ChatBot], None]):
+        """
+        注册 ChatBot 被移除后的回调（remove_bot_for_user 时调用；用户被删除时不调用）
+        
+        Args:
+            callback: 函数，接收 user_id 和被移除的 ChatBot
+        """
+        self._bot_removed_callbacks.append(callback)
+    
     def _is_admin_user(self, user_id: int) -> bool:
         """
         判断用户是否是 admin
@@ -51,6 +74,8 @@ class ChatBotManager:
         if user_id not in self._bots:
             # 为这个用户创建一个新的 ChatBot 实例
             self._bots[user_id] = self._create_bot_for_user(user_id, api_provider, is_admin)
+            for callback in self._bot_created_callbacks:
+                callback(user_id, self._bots[user_id])
         return self._bots[user_id]
     
     def _create_bot_for_user(self, user_id: int, api_provider: Optional[BaseAPIProvider] = None, is_admin: bool = False) -> ChatBot:
@@ -80,10 +105,43 @@ class ChatBotManager:
         Returns:
             是否成功移除
         """
-        if user_id in self._bots:
-            del self._bots[user_id]
-            return True
-        return False
+        bot = self._bots.pop(user_id, None)
+        if bot is None:
+            return False
+        for callback in self._bot_removed_callbacks:
+            callback(user_id, bot)
+        return True
+    
+    def remove_bots_for_users(self, user_ids: Iterable[int]) -> int:
+        """
+        批量移除 ChatBot 实例（用户被删除时调用，避免继续使用已删除的记忆和人设）
+        
+        与 remove_bot_for_user 不同，这里有意不触发 on_bot_removed 回调：被删除用户的待总结对话
+        不应再总结。调用方还需要通过 MemoryDrainer.forget_users 丢弃已在排空中的对话，然后再删除用户文件。
+        
+        Args:
+            user_ids: 用户ID
+        
+        Returns:
+            移除的实例数量
+        """
+        removed = 0
+        for user_id in user_ids:
+            if self._bots.pop(user_id, None) is not None:
+                removed += 1
+        return removed
+    
+    def find_bot_for_user(self, user_id: int) -> Optional[ChatBot]:
+        """
+        获取指定用户已有的 ChatBot 实例（不存在时不创建）
+        
+        Args:
+            user_id: 用户ID
+        
+        Returns:
+            ChatBot实例，不存在时返回 None
+        """
+        return self._bots.get(user_id)
     
     def has_bot_for_user(self, user_id: int) -> bool:
         """
@@ -96,4 +154,30 @@ class ChatBotManager:
             是否存在
         """
         return user_id in self._bots
-
+    
+    def active_bots(self) -> List[Tuple[int, ChatBot]]:
+        """
+        获取当前所有 ChatBot 实例
+        
+        Returns:
+            [(用户ID, ChatBot)]
+        """
+        return list(self._bots.items())
+    
+    def bots_using_files(self, paths: Iterable[str]) -> List[ChatBot]:
+        """
+        查找使用了指定人设或长期记忆文件的 ChatBot（admin 用户共享全局文件，可能有多个）
+        
+        Args:
+            paths: 文件路径
+        
+        Returns:
+            ChatBot 列表
+        """
+        targets = {os.path.abspath(path) for path in paths}
+        bots = []
+        for bot in list(self._bots.values()):
+            files = (bot.long_term_memory.MEMORY_FILE, bot.persona_manager.PERSONA_FILE)
+            if any(os.path.abspath(path) in targets for path in files):
+                bots.append(bot)
+        return bots
@@ -1,7 +1,7 @@
 """配置管理模块"""
 import os
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Optional, List, Dict
 
 # 加载环境变量
 load_dotenv()
@@ -16,18 +16,99 @@ class Config:
     # OpenAI配置
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    OPENAI_BASE_URL: Optional[str] = os.getenv("OPENAI_BASE_URL")  # 为空时使用官方端点，可指向本地模拟服务
     
     # DeepSeek配置
     DEEPSEEK_API_KEY: Optional[str] = os.getenv("DEEPSEEK_API_KEY")
     DEEPSEEK_MODEL: str = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
+    DEEPSEEK_BASE_URL: str = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
     
     # Anthropic Claude配置
     ANTHROPIC_API_KEY: Optional[str] = os.getenv("ANTHROPIC_API_KEY")
     ANTHROPIC_MODEL: str = os.getenv("ANTHROPIC_MODEL", "claude-3-sonnet-20240229")
+    ANTHROPIC_BASE_URL: Optional[str] = os.getenv("ANTHROPIC_BASE_URL")  # 为空时使用官方端点，可指向本地模拟服务
+    ANTHROPIC_MAX_TOKENS: int = int(os.getenv("ANTHROPIC_MAX_TOKENS", "1024"))  # Messages API 必填的最大输出 token 数
+    ANTHROPIC_PROMPT_CACHE: bool = os.getenv("ANTHROPIC_PROMPT_CACHE", "true").lower() in ("1", "true", "yes")  # 对系统提示启用提示缓存
+    
+    # 上游调用的超时、重试与熔断
+    PROVIDER_REQUEST_BUDGET: float = float(os.getenv("PROVIDER_REQUEST_BUDGET", "60"))  # 单个请求（含重试）的总预算，秒
+    PROVIDER_CALL_TIMEOUT: float = float(os.getenv("PROVIDER_CALL_TIMEOUT", "30"))  # 单次调用的超时上限，秒
+    PROVIDER_MAX_RETRIES: int = int(os.getenv("PROVIDER_MAX_RETRIES", "2"))
+    PROVIDER_RETRY_BASE_DELAY: float = float(os.getenv("PROVIDER_RETRY_BASE_DELAY", "0.5"))  # 秒
+    PROVIDER_RETRY_MAX_DELAY: float = float(os.getenv("PROVIDER_RETRY_MAX_DELAY", "8"))  # 秒
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # 连续失败多少次后熔断
+    CIRCUIT_RESET_TIMEOUT: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))  # 熔断后多久允许探测，秒
+    
+    # 模拟提供者配置（API_PROVIDER=mock，用于离线压测，不发起网络请求）
+    MOCK_MODEL: str = os.getenv("MOCK_MODEL", "mock-chat")
+    MOCK_LATENCY_MS: float = float(os.getenv("MOCK_LATENCY_MS", "200"))
+    MOCK_LATENCY_JITTER_MS: float = float(os.getenv("MOCK_LATENCY_JITTER_MS", "50"))
+    MOCK_LATENCY_DISTRIBUTION: str = os.getenv("MOCK_LATENCY_DISTRIBUTION", "normal").lower()  # fixed | uniform | normal | lognormal
+    MOCK_TOKENS_PER_SECOND: float = float(os.getenv("MOCK_TOKENS_PER_SECOND", "0"))  # 0 表示不模拟逐字输出耗时
+    MOCK_ERROR_RATE: float = float(os.getenv("MOCK_ERROR_RATE", "0"))
+    MOCK_SEED: int = int(os.getenv("MOCK_SEED", "42"))
+    
+    # 多上游路由配置（API_PROVIDER=router）
+    ROUTER_BACKENDS: List[str] = [
+        name.strip().lower() for name in os.getenv("ROUTER_BACKENDS", "deepseek,openai").split(",") if name.strip()
+    ]
+    ROUTER_HEDGE: bool = os.getenv("ROUTER_HEDGE", "false").lower() in ("1", "true", "yes")  # 首个请求超过其 p95 时向另一个后端发起对冲请求
+    ROUTER_HEDGE_MIN_SAMPLES: int = int(os.getenv("ROUTER_HEDGE_MIN_SAMPLES", "20"))  # 后端至少有多少个样本才启用对冲
+    ROUTER_WINDOW_SECONDS: float = float(os.getenv("ROUTER_WINDOW_SECONDS", "300"))  # 延迟和错误率的统计窗口，秒
     
     # 记忆配置
     MAX_HISTORY_LENGTH: int = int(os.getenv("MAX_HISTORY_LENGTH", "20"))
     MEMORY_SUMMARY_INTERVAL: int = int(os.getenv("MEMORY_SUMMARY_INTERVAL", "600"))  # 秒，默认10分钟
+    # 长会话分段总结：待总结对话达到任一阈值时，不等空闲就先总结这一段
+    MEMORY_CHUNK_MAX_MESSAGES: int = int(os.getenv("MEMORY_CHUNK_MAX_MESSAGES", "40"))  # 消息条数（一问一答为 2 条）
+    MEMORY_CHUNK_MAX_TOKENS: int = int(os.getenv("MEMORY_CHUNK_MAX_TOKENS", "4000"))  # 估算 token 数
+    MEMORY_CHUNK_RETRY_DELAY: float = float(os.getenv("MEMORY_CHUNK_RETRY_DELAY", "60"))  # 分段总结失败后等待多少秒再重试
+    ROLLING_SUMMARY_MAX_CHARS: int = int(os.getenv("ROLLING_SUMMARY_MAX_CHARS", "800"))  # 跨段传递的滚动摘要最大字数
+    
+    # 长期记忆压缩：合并近似重复的记忆、限制每类条数、把旧的对话总结移到压缩归档
+    LTM_AUTO_COMPACT: bool = os.getenv("LTM_AUTO_COMPACT", "true").lower() in ("1", "true", "yes")  # 总结入库后超过上限时在后台压缩
+    LTM_DEDUP_SIMILARITY: float = float(os.getenv("LTM_DEDUP_SIMILARITY", "0.8"))  # 字符 2-gram Jaccard 相似度阈值
+    LTM_CATEGORY_CAP: int = int(os.getenv("LTM_CATEGORY_CAP", "50"))  # 每类记忆默认最多保留条数
+    LTM_CATEGORY_CAPS: Dict[str, int] = {  # 按类别覆盖，如 LTM_CATEGORY_CAPS=plan=20,other=30
+        name.strip(): int(cap) for name, cap in (
+            item.split("=", 1) for item in os.getenv("LTM_CATEGORY_CAPS", "").split(",") if "=" in item
+        )
+    }
+    LTM_KEEP_SUMMARIES: int = int(os.getenv("LTM_KEEP_SUMMARIES", "20"))  # 记忆文件中保留的最近对话总结条数
+    LTM_UPDATE_MATCH_THRESHOLD: float = float(os.getenv("LTM_UPDATE_MATCH_THRESHOLD", "0.5"))  # 更新记忆时匹配已有记忆的最低相似度
+    LTM_UPDATE_MATCH_MARGIN: float = float(os.getenv("LTM_UPDATE_MATCH_MARGIN", "0.1"))  # 最相似的记忆需要比第二相似的高出的相似度
+    LTM_MAX_NOTES_LINES: int = int(os.getenv("LTM_MAX_NOTES_LINES", "20"))  # 对话建议最多保留行数
+    
+    # 记忆预筛：用本地规则跳过明显是闲聊的对话，不再调用 LLM 记忆过滤器
+    MEMORY_PREFILTER_ENABLED: bool = os.getenv("MEMORY_PREFILTER_ENABLED", "true").lower() in ("1", "true", "yes")
+    
+    # 记忆过滤/总结结果缓存（相同模型、提示词版本和对话内容不重复调用上游）
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))  # 秒，默认1天
+    RESPONSE_CACHE_PATH: Optional[str] = os.getenv("RESPONSE_CACHE_PATH") or None  # 为空时只缓存在内存中，如 data/response_cache.db
+    
+    # 人设/记忆文件热加载：文件被直接编辑或删除时，把变化推送到正在运行的 ChatBot（仅 Web 服务）
+    HOT_RELOAD_ENABLED: bool = os.getenv("HOT_RELOAD_ENABLED", "true").lower() in ("1", "true", "yes")
+    HOT_RELOAD_DEBOUNCE_MS: int = int(os.getenv("HOT_RELOAD_DEBOUNCE_MS", "500"))  # 合并这段时间内的连续写入
+    
+    # 响应压缩（gzip/brotli），流式响应和小于阈值的响应不压缩
+    RESPONSE_COMPRESSION_ENABLED: bool = os.getenv("RESPONSE_COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    RESPONSE_COMPRESSION_MIN_BYTES: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+    RESPONSE_COMPRESSION_GZIP_LEVEL: int = int(os.getenv("RESPONSE_COMPRESSION_GZIP_LEVEL", "6"))
+    RESPONSE_COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("RESPONSE_COMPRESSION_BROTLI_QUALITY", "4"))
+    RESPONSE_COMPRESSION_THREAD_MIN_BYTES: int = int(os.getenv("RESPONSE_COMPRESSION_THREAD_MIN_BYTES", "65536"))  # 更大的响应在线程池中压缩
+    
+    # 记忆变化推送（SSE）：记忆页面只接收增量，不再轮询
+    MEMORY_EVENTS_ENABLED: bool = os.getenv("MEMORY_EVENTS_ENABLED", "true").lower() in ("1", "true", "yes")
+    MEMORY_EVENTS_QUEUE_SIZE: int = int(os.getenv("MEMORY_EVENTS_QUEUE_SIZE", "64"))  # 每个连接最多积压的事件数
+    MEMORY_EVENTS_KEEPALIVE: float = float(os.getenv("MEMORY_EVENTS_KEEPALIVE", "25"))  # 空闲连接的心跳间隔（秒）
+    
+    # 待总结对话的排空：服务关闭和用户登出时总结内存中的待总结对话，来不及总结的存入持久化队列，下次启动时继续
+    PENDING_DRAIN_WORKERS: int = int(os.getenv("PENDING_DRAIN_WORKERS", "4"))  # 同时总结的对话数
+    PENDING_DRAIN_TIME_BUDGET: float = float(os.getenv("PENDING_DRAIN_TIME_BUDGET", "20"))  # 关闭时排空的总时间预算（秒）
+    PENDING_QUEUE_PATH: str = os.getenv("PENDING_QUEUE_PATH", "data/pending_summaries.db")
+    PENDING_QUEUE_MAX_ATTEMPTS: int = int(os.getenv("PENDING_QUEUE_MAX_ATTEMPTS", "5"))  # 总结失败超过次数后丢弃
     
     @classmethod
     def validate(cls) -> tuple[bool, Optional[str]]:
@@ -46,19 +127,37 @@ class Config:
         elif cls.API_PROVIDER == "claude":
             if not cls.ANTHROPIC_API_KEY:
                 return False, "未设置 ANTHROPIC_API_KEY，请在 .env 文件中配置"
+        elif cls.API_PROVIDER == "mock":
+            # 模拟提供者不需要 API Key
+            pass
+        elif cls.API_PROVIDER == "router":
+            # 路由提供者的后端可以没有系统默认 Key（只服务于自带 Key 的用户）
+            if not cls.ROUTER_BACKENDS:
+                return False, "未设置 ROUTER_BACKENDS，请在 .env 文件中配置"
+            unsupported = [name for name in cls.ROUTER_BACKENDS if name not in ("openai", "deepseek", "claude", "mock")]
+            if unsupported:
+                return False, f"ROUTER_BACKENDS 中有不支持的后端: {', '.join(unsupported)}"
         else:
-            return False, f"不支持的API提供者: {cls.API_PROVIDER}，支持: openai, deepseek, claude"
+            return False, f"不支持的API提供者: {cls.API_PROVIDER}，支持: openai, deepseek, claude, mock, router"
         
         return True, None
     
     @classmethod
-    def get_api_key(cls) -> Optional[str]:
-        """获取当前API提供者的密钥"""
-        if cls.API_PROVIDER == "openai":
+    def get_api_key(cls, provider: Optional[str] = None) -> Optional[str]:
+        """
+        获取API提供者的密钥
+        
+        Args:
+            provider: 提供者名称，默认为当前API提供者
+        """
+        provider = provider or cls.API_PROVIDER
+        if provider == "openai":
             return cls.OPENAI_API_KEY
-        elif cls.API_PROVIDER == "deepseek":
+        elif provider == "deepseek":
             return cls.DEEPSEEK_API_KEY
-        elif cls.API_PROVIDER == "claude":
+        elif provider == "claude":
             return cls.ANTHROPIC_API_KEY
+        elif provider == "mock":
+            return "mock"
         return None
 
@@ -4,7 +4,7 @@
 """
 
 from db.models import Base, User, Session
-from db.database import init_db, get_db, SessionLocal, engine, DATABASE_URL
+from db.database import init_db, get_db, get_engine, SessionLocal, DATABASE_URL
 
 __all__ = [
     # 模型
@@ -14,10 +14,19 @@ __all__ = [
     # 数据库连接
     'init_db',
     'get_db',
+    'get_engine',
     'SessionLocal',
     'engine',
     'DATABASE_URL',
 ]
 
+
+def __getattr__(name):
+    # engine 在第一次访问时创建（见 db.database.get_engine）
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # 延迟导入 crud 模块，避免循环导入
 # 使用时：from db import crud 或 from db.crud import create_user
@@ -1,7 +1,8 @@
 """数据库 CRUD 操作"""
+from sqlalchemy import insert, text
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from db.models import User
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from db.models import Session as SessionModel, User
 from security.password import hash_password
 
 
@@ -48,6 +49,55 @@ def create_user(
     return user
 
 
+def find_existing_usernames(db: Session, usernames: Iterable[str], chunk_size: int = 5000) -> Set[str]:
+    """
+    查询哪些用户名已存在（按块批量查询，不逐个检查）
+    
+    Args:
+        db: 数据库会话
+        usernames: 待检查的用户名
+        chunk_size: 每次查询的用户名数量（受 SQLite 参数个数限制）
+    
+    Returns:
+        已存在的用户名集合
+    """
+    usernames = list(usernames)
+    existing: Set[str] = set()
+    for start in range(0, len(usernames), chunk_size):
+        chunk = usernames[start:start + chunk_size]
+        rows = db.query(User.username).filter(User.username.in_(chunk)).all()
+        existing.update(row[0] for row in rows)
+    return existing
+
+
+def bulk_insert_users(db: Session, rows: List[Dict], batch_size: int = 1000) -> int:
+    """
+    批量插入用户（每批一个事务，密码需要已经哈希）
+    
+    Args:
+        db: 数据库会话
+        rows: 用户字典列表，包含 username、password_hash，可选 api_key
+        batch_size: 每个事务插入的行数
+    
+    Returns:
+        插入的行数
+    
+    Raises:
+        sqlalchemy.exc.IntegrityError: 用户名已存在（当前批次回滚，之前的批次已提交）
+    """
+    inserted = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        try:
+            db.execute(insert(User), batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        inserted += len(batch)
+    return inserted
+
+
 def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
     """
     根据 ID 获取用户
@@ -91,6 +141,50 @@ def get_all_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
     return db.query(User).offset(skip).limit(limit).all()
 
 
+def get_users_page(db: Session, after_id: Optional[int] = None, limit: int = 100) -> List[User]:
+    """
+    按 ID 顺序分页获取用户（键集分页，翻页开销与页码无关）
+    
+    Args:
+        db: 数据库会话
+        after_id: 上一页最后一个用户的 ID（为空时从头开始）
+        limit: 返回的最大记录数
+    
+    Returns:
+        用户列表（按 ID 升序）
+    """
+    query = db.query(User)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    return query.order_by(User.id).limit(limit).all()
+
+
+def iter_users(db: Session, username: Optional[str] = None, batch_size: int = 1000) -> Iterator[User]:
+    """
+    逐批遍历所有用户（或用户名包含指定字符串的用户），不一次性加载到内存
+    
+    Args:
+        db: 数据库会话
+        username: 用户名（支持部分匹配），为空时遍历所有用户
+        batch_size: 每批查询的记录数
+    
+    Yields:
+        用户对象（按 ID 升序）
+    """
+    after_id = None
+    while True:
+        if username:
+            users = search_users_page(db, username, after_id=after_id, limit=batch_size)
+        else:
+            users = get_users_page(db, after_id=after_id, limit=batch_size)
+        yield from users
+        if len(users) < batch_size:
+            return
+        after_id = users[-1].id
+        # 已经输出的对象不再需要，避免会话的 identity map 随遍历无限增长
+        db.expunge_all()
+
+
 def update_user_api_key(db: Session, user_id: int, api_key: Optional[str]) -> Optional[User]:
     """
     更新用户的 API Key
@@ -138,6 +232,70 @@ def search_users_by_username(
     return query.offset(skip).limit(limit).all()
 
 
+# 各数据库是否有用户名 trigram 索引（见 db.database.ensure_username_index）
+_username_fts: Dict[str, bool] = {}
+
+# trigram 索引只能匹配至少 3 个字符的子串
+_FTS_MIN_QUERY_CHARS = 3
+
+
+def _has_username_fts(db: Session) -> bool:
+    """判断当前数据库是否有用户名 trigram 索引（结果按数据库缓存）"""
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _username_fts:
+        if bind.dialect.name != "sqlite":
+            _username_fts[key] = False
+        else:
+            row = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'")
+            ).first()
+            _username_fts[key] = row is not None
+    return _username_fts[key]
+
+
+def search_users_page(
+    db: Session,
+    username: str,
+    after_id: Optional[int] = None,
+    limit: int = 100
+) -> List[User]:
+    """
+    根据用户名搜索用户（支持部分匹配，键集分页）
+    
+    搜索词不少于 3 个字符时使用 FTS5 trigram 索引，只访问匹配的行；
+    更短的搜索词或没有索引时退回 LIKE 扫描（按 ID 顺序扫描，凑够一页即停止）。
+    
+    Args:
+        db: 数据库会话
+        username: 用户名（支持部分匹配）
+        after_id: 上一页最后一个用户的 ID（为空时从头开始）
+        limit: 返回的最大记录数
+    
+    Returns:
+        匹配的用户列表（按 ID 升序）
+    """
+    if len(username) >= _FTS_MIN_QUERY_CHARS and _has_username_fts(db):
+        # 整个搜索词作为一个短语匹配（双引号转义），trigram 短语匹配等价于子串匹配
+        phrase = '"' + username.replace('"', '""') + '"'
+        rows = db.execute(
+            text(
+                "SELECT rowid FROM users_fts WHERE users_fts MATCH :phrase AND rowid > :after_id "
+                "ORDER BY rowid LIMIT :limit"
+            ),
+            {"phrase": phrase, "after_id": after_id if after_id is not None else -1, "limit": limit}
+        ).fetchall()
+        ids = [row[0] for row in rows]
+        if not ids:
+            return []
+        return db.query(User).filter(User.id.in_(ids)).order_by(User.id).all()
+    
+    query = db.query(User).filter(User.username.contains(username, autoescape=True))
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    return query.order_by(User.id).limit(limit).all()
+
+
 def update_user_password(db: Session, user_id: int, new_password: str) -> Optional[User]:
     """
     更新用户密码
@@ -184,4 +342,43 @@ def delete_user(db: Session, user_id: int) -> bool:
     db.delete(user)
     db.commit()
     
-    return True
\ No newline at end of file
+    return True
+
+
+def delete_users(db: Session, user_ids: Optional[Iterable[int]] = None, chunk_size: int = 5000) -> List[int]:
+    """
+    批量删除用户及其会话（集合删除，一个事务）
+    
+    直接执行 DELETE 语句，不逐个加载用户对象，也不依赖 ORM 的 cascade 逐行删除会话。
+    
+    Args:
+        db: 数据库会话
+        user_ids: 要删除的用户 ID，为 None 时删除所有用户
+        chunk_size: 每条 DELETE 语句包含的 ID 数量（受 SQLite 参数个数限制）
+    
+    Returns:
+        实际删除的用户 ID 列表（不存在的 ID 不包含在内）
+    
+    Note:
+        文件系统中的用户数据（记忆、人设文件）需要调用方单独清理（见 db.user_files.purge_user_files）
+    """
+    try:
+        if user_ids is None:
+            deleted = [row[0] for row in db.query(User.id).all()]
+            db.query(SessionModel).delete(synchronize_session=False)
+            db.query(User).delete(synchronize_session=False)
+        else:
+            requested = list(dict.fromkeys(user_ids))
+            deleted = []
+            for start in range(0, len(requested), chunk_size):
+                chunk = requested[start:start + chunk_size]
+                deleted.extend(row[0] for row in db.query(User.id).filter(User.id.in_(chunk)).all())
+                db.query(SessionModel).filter(SessionModel.user_id.in_(chunk)).delete(synchronize_session=False)
+                db.query(User).filter(User.id.in_(chunk)).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    # 会话中可能还缓存着已删除的对象
+    db.expire_all()
+    return deleted
@@ -1,7 +1,9 @@
 """数据库连接和会话管理"""
 import os
 from pathlib import Path
-from sqlalchemy import create_engine
+from typing import Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 from db.models import Base
 
@@ -9,24 +11,98 @@ from db.models import Base
 # 使用相对路径，数据库文件将保存在项目根目录下的 data/data.db
 # 如需使用绝对路径（如 /root/my_chat_bot/data.db），可以修改此处
 DB_DIR = Path("data")
-DB_DIR.mkdir(exist_ok=True)
 DB_FILE = DB_DIR / "data.db"
 DATABASE_URL = f"sqlite:///{DB_FILE.absolute()}"
 
-# 创建数据库引擎
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # SQLite 需要这个参数
-    echo=False  # 设置为 True 可以查看 SQL 语句
-)
+# 数据库引擎在第一次使用时创建（导入本模块不会创建 data 目录），见 get_engine
+_engine: Optional[Engine] = None
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
 
-# 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def get_engine() -> Engine:
+    """
+    获取数据库引擎（第一次调用时创建数据目录和引擎）
+    
+    Returns:
+        数据库引擎
+    """
+    global _engine
+    if _engine is None:
+        DB_DIR.mkdir(exist_ok=True)
+        _engine = create_engine(
+            DATABASE_URL,
+            connect_args={"check_same_thread": False},  # SQLite 需要这个参数
+            echo=False  # 设置为 True 可以查看 SQL 语句
+        )
+        _session_factory.configure(bind=_engine)
+    return _engine
+
+
+def SessionLocal(**kwargs) -> Session:
+    """
+    创建数据库会话（与原来的会话工厂用法相同：SessionLocal() 或 with SessionLocal() as db）
+    
+    Returns:
+        数据库会话
+    """
+    get_engine()
+    return _session_factory(**kwargs)
+
+
+def __getattr__(name):
+    # 兼容 from db.database import engine
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# 用户名子串搜索索引：SQLite FTS5 trigram 外部内容表，由触发器与 users 表保持同步
+# （需要 SQLite 3.34+；不支持时搜索退回 LIKE 扫描，见 crud.search_users_page）
+USERNAME_FTS_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "username, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, username) VALUES (new.id, new.username); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, username) VALUES ('delete', old.id, old.username); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF username ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, username) VALUES ('delete', old.id, old.username); "
+    "INSERT INTO users_fts(rowid, username) VALUES (new.id, new.username); END",
+]
 
 
 def init_db():
-    """初始化数据库，创建所有表"""
+    """初始化数据库，创建所有表和用户名搜索索引"""
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    ensure_username_index(engine)
+
+
+def ensure_username_index(bind) -> bool:
+    """
+    创建用户名 trigram 索引（已存在时跳过；第一次创建时为已有用户建立索引）
+    
+    Args:
+        bind: 数据库引擎
+    
+    Returns:
+        索引是否可用
+    """
+    if bind.dialect.name != "sqlite":
+        return False
+    try:
+        with bind.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'")
+            ).first()
+            for statement in USERNAME_FTS_SQL:
+                conn.execute(text(statement))
+            if not exists:
+                conn.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+        return True
+    except Exception as e:
+        print(f"⚠️  创建用户名搜索索引失败（将使用 LIKE 搜索）: {e}")
+        return False
 
 
 def get_db() -> Session:
@@ -0,0 +1,81 @@
+"""用户数据文件清理 - 删除用户时清理其长期记忆、记忆归档和人设文件"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 用户数据文件：memory/user_{id}_long_term_memory.json、memory/user_{id}_long_term_memory_archive.jsonl.gz、
+# persona/user_{id}_persona.json（原子写入残留的 .tmp 文件一并清理）
+USER_FILE_PATTERN = re.compile(
+    r"^user_(\d+)_(?:long_term_memory\.json|long_term_memory_archive\.jsonl\.gz|persona\.json)(?:\.tmp)?$"
+)
+USER_FILE_DIRS = ("memory", "persona")
+
+
+def index_user_files(directories: Sequence[str] = USER_FILE_DIRS) -> Dict[int, List[str]]:
+    """
+    扫描目录一次，建立 用户ID -> 文件列表 的索引（不对每个用户分别 glob 或 stat）
+    
+    Args:
+        directories: 扫描的目录
+    
+    Returns:
+        {用户ID: [文件路径]}
+    """
+    index: Dict[int, List[str]] = {}
+    for directory in directories:
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                match = USER_FILE_PATTERN.match(entry.name)
+                if match and entry.is_file():
+                    index.setdefault(int(match.group(1)), []).append(entry.path)
+    return index
+
+
+def _unlink(path: str) -> Tuple[str, Optional[str]]:
+    try:
+        os.unlink(path)
+        return path, None
+    except FileNotFoundError:
+        return path, None
+    except OSError as e:
+        return path, str(e)
+
+
+def purge_user_files(
+    user_ids: Optional[Iterable[int]] = None,
+    directories: Sequence[str] = USER_FILE_DIRS,
+    workers: int = 8
+) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """
+    删除用户的数据文件（多线程并行删除）
+    
+    Args:
+        user_ids: 用户 ID，为 None 时删除所有用户的文件（全局的 persona.json 和 long_term_memory.json 不受影响）
+        directories: 用户文件所在目录
+        workers: 删除文件的线程数
+    
+    Returns:
+        (已删除的文件列表, [(删除失败的文件, 错误信息)])
+    """
+    index = index_user_files(directories)
+    if user_ids is None:
+        paths = [path for files in index.values() for path in files]
+    else:
+        paths = [path for user_id in set(user_ids) for path in index.get(user_id, [])]
+    if not paths:
+        return [], []
+    
+    deleted: List[str] = []
+    failed: List[Tuple[str, str]] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths)))) as executor:
+        for path, error in executor.map(_unlink, paths):
+            if error is None:
+                deleted.append(path)
+            else:
+                failed.append((path, error))
+    return deleted, failed
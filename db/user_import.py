@@ -0,0 +1,165 @@
+"""批量导入用户 - 从 CSV/JSONL 读取账户，并行哈希密码，批量写入"""
+import csv
+import json
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from db import crud
+from security.password import hash_passwords
+
+SUPPORTED_FORMATS = ("csv", "jsonl")
+
+
+def detect_format(filename: str) -> str:
+    """
+    根据文件扩展名判断格式
+    
+    Args:
+        filename: 文件名
+    
+    Returns:
+        "csv" 或 "jsonl"（无法判断时按 csv 处理）
+    """
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def parse_user_records(lines: Iterable[str], fmt: str) -> List[Dict]:
+    """
+    解析用户记录
+    
+    CSV 需要表头，列名为 username、password，可选 api_key；JSONL 每行一个对象，字段相同。
+    
+    Args:
+        lines: 文件内容（按行）
+        fmt: "csv" 或 "jsonl"
+    
+    Returns:
+        记录列表，每条包含 line（行号）、username、password、api_key
+    
+    Raises:
+        ValueError: 格式不支持、CSV 缺少必需的列或 JSONL 行无法解析
+    """
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"不支持的格式: {fmt}（支持 {', '.join(SUPPORTED_FORMATS)}）")
+    
+    records = []
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        missing = {"username", "password"} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"CSV 缺少列: {', '.join(sorted(missing))}")
+        # 第 1 行是表头
+        for line_no, row in enumerate(reader, start=2):
+            records.append({
+                "line": line_no,
+                "username": (row.get("username") or "").strip(),
+                "password": (row.get("password") or "").strip(),
+                "api_key": (row.get("api_key") or "").strip() or None
+            })
+    else:
+        for line_no, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"第 {line_no} 行不是有效的 JSON: {e}")
+            records.append({
+                "line": line_no,
+                "username": str(row.get("username") or "").strip(),
+                "password": str(row.get("password") or "").strip(),
+                "api_key": row.get("api_key") or None
+            })
+    return records
+
+
+def import_users(
+    db: Session,
+    records: List[Dict],
+    workers: Optional[int] = None,
+    batch_size: int = 1000,
+    dry_run: bool = False
+) -> Dict:
+    """
+    批量创建用户
+    
+    1. 校验用户名和密码非空，文件内重复的用户名只保留第一条
+    2. 一次批量查询排除数据库中已存在的用户名
+    3. 多进程并行哈希密码
+    4. 分批插入，每批一个事务
+    
+    Args:
+        db: 数据库会话
+        records: parse_user_records 的返回值
+        workers: 哈希密码的进程数，默认为 CPU 核数
+        batch_size: 每个事务插入的行数
+        dry_run: 为 True 时只校验和查重，不哈希、不写入
+    
+    Returns:
+        导入报告：created、existing、duplicates、invalid（后三者为跳过的用户名或行号列表）、
+        seconds、hash_seconds、users_per_second
+    """
+    start = time.perf_counter()
+    invalid: List[int] = []
+    duplicates: List[str] = []
+    seen = set()
+    candidates = []
+    for record in records:
+        if not record["username"] or not record["password"]:
+            invalid.append(record["line"])
+        elif record["username"] in seen:
+            duplicates.append(record["username"])
+        else:
+            seen.add(record["username"])
+            candidates.append(record)
+    
+    existing = crud.find_existing_usernames(db, seen)
+    to_create = [record for record in candidates if record["username"] not in existing]
+    
+    report = {
+        "total": len(records),
+        "created": 0,
+        "existing": sorted(existing),
+        "duplicates": duplicates,
+        "invalid": invalid,
+        "hash_seconds": 0.0,
+    }
+    if to_create and not dry_run:
+        hash_start = time.perf_counter()
+        hashes = hash_passwords([record["password"] for record in to_create], workers=workers)
+        report["hash_seconds"] = round(time.perf_counter() - hash_start, 3)
+        rows = [
+            {"username": record["username"], "password_hash": password_hash, "api_key": record["api_key"]}
+            for record, password_hash in zip(to_create, hashes)
+        ]
+        report["created"] = crud.bulk_insert_users(db, rows, batch_size=batch_size)
+    
+    seconds = time.perf_counter() - start
+    report["seconds"] = round(seconds, 3)
+    report["users_per_second"] = round(report["created"] / seconds, 1) if seconds and report["created"] else 0.0
+    return report
+
+
+def format_report(report: Dict) -> str:
+    """
+    把导入报告格式化为文字
+    
+    Args:
+        report: import_users 的返回值
+    
+    Returns:
+        报告文字
+    """
+    lines = [
+        f"共 {report['total']} 条记录，创建 {report['created']} 个用户，"
+        f"耗时 {report['seconds']}s（哈希 {report['hash_seconds']}s），{report['users_per_second']} 用户/秒"
+    ]
+    if report["existing"]:
+        lines.append(f"已存在，跳过 {len(report['existing'])} 个: {', '.join(report['existing'][:20])}")
+    if report["duplicates"]:
+        lines.append(f"文件内重复，跳过 {len(report['duplicates'])} 个: {', '.join(report['duplicates'][:20])}")
+    if report["invalid"]:
+        lines.append(f"用户名或密码为空，跳过第 {', '.join(str(n) for n in report['invalid'][:20])} 行")
+    return "\n".join(lines)
@@ -0,0 +1,123 @@
+"""人设/记忆文件热加载 - 文件被直接编辑或删除时，把变化推送到正在运行的 ChatBot"""
+import asyncio
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence
+
+from watchfiles import Change, awatch
+
+from config import Config
+from chat_bot_manager import ChatBotManager
+
+
+class FileWatcher:
+    """
+    监听 persona/ 和 memory/ 目录中的 JSON 文件
+    
+    一段时间内的连续写入合并为一批处理（防抖），每批只重新加载使用了这些文件的 ChatBot。
+    ChatBot 自己写入文件也会产生事件，但文件签名与写入后记录的一致，不会重复加载。
+    """
+    
+    def __init__(
+        self,
+        bot_manager: ChatBotManager,
+        directories: Sequence[str] = ("persona", "memory"),
+        debounce_ms: Optional[int] = None
+    ):
+        """
+        初始化文件监听器
+        
+        Args:
+            bot_manager: ChatBot 管理器
+            directories: 监听的目录
+            debounce_ms: 防抖时间（毫秒），默认读取配置
+        """
+        self.bot_manager = bot_manager
+        self.directories = [Path(directory) for directory in directories]
+        self.debounce_ms = debounce_ms if debounce_ms is not None else Config.HOT_RELOAD_DEBOUNCE_MS
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self.batches = 0
+        self.reloads = 0
+    
+    @property
+    def running(self) -> bool:
+        """监听器是否正在运行"""
+        return self._task is not None and not self._task.done()
+    
+    @staticmethod
+    def _watch_filter(change: Change, path: str) -> bool:
+        # 只关心人设和记忆文件（忽略原子写入的 .tmp 文件和 gzip 归档）
+        return path.endswith(".json")
+    
+    async def start(self) -> None:
+        """在当前事件循环中启动监听"""
+        if self.running:
+            return
+        for directory in self.directories:
+            directory.mkdir(exist_ok=True)
+        self._stop_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """停止监听"""
+        if not self.running:
+            return
+        self._stop_event.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self._task.cancel()
+        self._task = None
+    
+    async def _run(self) -> None:
+        try:
+            async for changes in awatch(
+                *self.directories,
+                watch_filter=self._watch_filter,
+                debounce=self.debounce_ms,
+                stop_event=self._stop_event,
+                recursive=False
+            ):
+                paths = {path for _, path in changes}
+                # 读文件放到线程中，不阻塞事件循环
+                await asyncio.to_thread(self.apply_changes, paths)
+        except Exception as e:
+            print(f"[热加载] 文件监听已停止: {e}")
+    
+    def apply_changes(self, paths: Iterable[str]) -> int:
+        """
+        把一批文件变化应用到受影响的 ChatBot
+        
+        Args:
+            paths: 发生变化的文件路径
+        
+        Returns:
+            重新加载的 ChatBot 数量
+        """
+        self.batches += 1
+        reloaded = 0
+        for bot in self.bot_manager.bots_using_files(paths):
+            try:
+                if bot.reload_files():
+                    reloaded += 1
+            except Exception as e:
+                print(f"[热加载] 重新加载失败: {e}")
+        if reloaded:
+            self.reloads += reloaded
+            names = ", ".join(sorted(os.path.basename(path) for path in paths))
+            print(f"[热加载] {names} 已变化，已更新 {reloaded} 个会话")
+        return reloaded
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        获取统计数据
+        
+        Returns:
+            {"running", "batches", "reloads"}
+        """
+        return {
+            "running": self.running,
+            "batches": self.batches,
+            "reloads": self.reloads
+        }
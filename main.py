@@ -1,21 +1,80 @@
 """主程序入口 - CLI交互界面"""
+import argparse
 import sys
-from chat_bot import ChatBot
-from persona.persona_editor import PersonaEditor
 
 
-def main():
+def save_and_wait(bot) -> None:
+    """
+    退出前在后台总结剩余对话，并等待所有后台总结完成（再按一次 Ctrl+C 放弃等待）
+    
+    Args:
+        bot: ChatBot 实例
+    """
+    bot.summarize_in_background()
+    if bot.wait_for_summaries(timeout=0):
+        return
+    print("\n[记忆系统] 正在保存对话记忆...（按 Ctrl+C 放弃）")
+    try:
+        bot.wait_for_summaries()
+    except KeyboardInterrupt:
+        print("\n[记忆系统] 已放弃未完成的总结")
+
+
+def stream_reply(bot, user_input: str) -> None:
+    """
+    逐段输出AI回复；按 Ctrl+C 取消本次回复（断开上游请求，本轮不计入对话历史）
+    
+    Args:
+        bot: ChatBot 实例
+        user_input: 用户输入的消息
+    """
+    stream = bot.chat_stream(user_input, background_summary=True)
+    print("AI: ", end="", flush=True)
+    try:
+        for chunk in stream:
+            print(chunk, end="", flush=True)
+    except KeyboardInterrupt:
+        stream.close()
+        print("\n[已取消本次回复]\n")
+        return
+    print("\n")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行参数（不带参数时进入交互模式）"""
+    parser = argparse.ArgumentParser(description="AI聊天机器人 - CLI")
+    parser.add_argument("--batch", metavar="JSONL", help="批量模式：从 JSONL 文件读取对话（见 batch_runner.load_records）")
+    parser.add_argument("--output", help="批量模式的结果文件，默认为输入文件名加 .results.jsonl")
+    parser.add_argument("--concurrency", type=int, default=4, help="批量模式同时运行的记录数")
+    parser.add_argument("--summarize", action="store_true", help="批量模式中每条记录结束后总结对话")
+    parser.add_argument("--state-dir", help="批量模式的人设和记忆文件目录，默认新建临时目录")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """主函数"""
+    args = parse_args(argv)
+    if args.batch:
+        from batch_runner import run_batch
+        report = run_batch(args.batch, args.output, args.concurrency, args.summarize, args.state_dir)
+        sys.exit(1 if report["errors"] else 0)
+    
     print("=" * 50)
     print("AI聊天机器人 - 情感陪伴版")
     print("=" * 50)
     print("输入消息开始对话")
     print("输入 'persona' 或 'p' 编辑人设")
     print("输入 'memory' 或 'm' 查看长期记忆")
-    print("输入 'summarize' 或 's' 立即总结当前对话")
+    print("输入 'summarize' 或 's' 立即总结当前对话（在后台进行）")
+    print("回复过程中按 Ctrl+C 取消本次回复")
+    print("输入 'compact' 或 'c' 压缩长期记忆（合并重复、归档旧总结）")
     print("输入 'exit' 或 'quit' 退出")
     print("-" * 50)
     
+    # 先显示提示，再加载聊天机器人（导入耗时的部分）
+    from chat_bot import ChatBot
+    from persona.persona_editor import PersonaEditor
+    
     try:
         # 创建聊天机器人实例
         bot = ChatBot()
@@ -34,10 +93,8 @@ def main():
             
             # 检查退出命令
             if user_input.lower() in ['exit', 'quit', '退出']:
-                # 退出前强制总结
-                if bot.pending_conversation:
-                    print("\n[记忆系统] 正在保存对话记忆...")
-                    bot.force_summarize()
+                # 退出前总结剩余对话
+                save_and_wait(bot)
                 print("\n再见啦。")
                 break
             
@@ -89,25 +146,29 @@ def main():
             
             # 检查立即总结命令
             if user_input.lower() in ['summarize', 's', '总结']:
-                if bot.pending_conversation:
-                    bot.force_summarize()
-                    print("\n✓ 对话已总结并保存")
+                if bot.summarize_in_background():
+                    print("\n✓ 正在后台总结对话，可以继续聊天\n")
                 else:
                     print("\n暂无待总结的对话")
                 continue
             
+            # 检查记忆压缩命令
+            if user_input.lower() in ['compact', 'c', '压缩']:
+                from memory.compaction import format_report
+                report = bot.compact_memory()
+                print(f"\n✓ 长期记忆已压缩: {format_report(report)}\n")
+                continue
+            
             # 忽略空输入
             if not user_input:
                 continue
             
-            # 获取AI回复
-            response = bot.chat(user_input)
-            
-            # 输出AI回复
-            print(f"AI: {response}\n")
-            
+            # 获取并逐段输出AI回复
+            stream_reply(bot, user_input)
+        
         except KeyboardInterrupt:
             # 处理 Ctrl+C
+            save_and_wait(bot)
             print("\n\n再见！")
             break
         except Exception as e:
@@ -7,10 +7,22 @@ from memory.simple_memory import SimpleMemory
 from memory.long_term_memory import LongTermMemory
 from memory.memory_filter import MemoryFilter
 from memory.memory_summarizer import MemorySummarizer
+from memory.response_cache import ResponseCache, get_response_cache
+from memory.pending_queue import PendingSummaryQueue
+from memory.prefilter import HeuristicPreFilter, get_prefilter
+from memory.compaction import MemoryCompactor
+from memory.ngram_index import NgramIndex
 
 __all__ = [
     'SimpleMemory',
     'LongTermMemory',
     'MemoryFilter',
     'MemorySummarizer',
+    'ResponseCache',
+    'get_response_cache',
+    'PendingSummaryQueue',
+    'HeuristicPreFilter',
+    'get_prefilter',
+    'MemoryCompactor',
+    'NgramIndex',
 ]
\ No newline at end of file
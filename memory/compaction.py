@@ -0,0 +1,308 @@
+"""长期记忆压缩
+
+LongTermMemory 只会追加：相似的事实反复入库，conversation_summaries 和 notes_for_future 无限增长，
+而整个文件在每次修改时都会重写、每轮对话都会渲染进系统提示。压缩过程：
+1. 用字符 2-gram 的 Jaccard 相似度合并近似重复的记忆（保留较新的内容）
+2. 每类记忆超过上限时只保留最近的若干条
+3. 只在记忆文件中保留最近的若干条对话总结，其余移到 gzip 归档
+4. 对话建议去重并只保留最近的若干行
+
+被合并、淘汰的记忆和归档的总结不会丢失，都会追加到归档文件（每行一条 JSON）。
+
+使用说明（在项目根目录运行）：
+    python -m memory.compaction                 # 压缩 memory/ 下所有用户的记忆文件
+    python -m memory.compaction --user-id 3     # 只压缩指定用户
+    python -m memory.compaction --dry-run       # 只报告，不写文件
+"""
+import argparse
+import gzip
+import json
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from config import Config
+from memory.long_term_memory import LongTermMemory
+from memory.simple_memory import estimate_tokens
+from memory.ngram_index import shingles, jaccard
+
+MEMORY_CATEGORIES = ["personal_profile", "preference", "relationship", "important_event", "plan", "long_term_goal", "other"]
+
+
+def _timestamp(item: Dict) -> str:
+    """记忆的最后修改时间（ISO 字符串可直接比较）"""
+    return item.get("updated_at") or item.get("created_at") or ""
+
+
+class MemoryCompactor:
+    """长期记忆压缩器"""
+    
+    def __init__(
+        self,
+        similarity_threshold: Optional[float] = None,
+        default_cap: Optional[int] = None,
+        category_caps: Optional[Dict[str, int]] = None,
+        keep_summaries: Optional[int] = None,
+        max_notes_lines: Optional[int] = None
+    ):
+        """
+        初始化压缩器（参数默认读取配置）
+        
+        Args:
+            similarity_threshold: 判定为近似重复的相似度阈值
+            default_cap: 每类记忆默认最多保留条数
+            category_caps: 按类别覆盖的上限
+            keep_summaries: 记忆文件中保留的最近对话总结条数
+            max_notes_lines: 对话建议最多保留行数
+        """
+        self.similarity_threshold = similarity_threshold or Config.LTM_DEDUP_SIMILARITY
+        self.default_cap = default_cap or Config.LTM_CATEGORY_CAP
+        self.category_caps = category_caps if category_caps is not None else Config.LTM_CATEGORY_CAPS
+        self.keep_summaries = Config.LTM_KEEP_SUMMARIES if keep_summaries is None else keep_summaries
+        self.max_notes_lines = max_notes_lines or Config.LTM_MAX_NOTES_LINES
+    
+    def cap_for(self, category: str) -> int:
+        """获取指定类别的条数上限"""
+        return self.category_caps.get(category, self.default_cap)
+    
+    def needs_compaction(self, ltm: LongTermMemory) -> bool:
+        """
+        判断是否需要压缩（总结数或某类记忆超过上限）
+        
+        总结数留有一倍余量，避免每次入库都触发压缩。
+        
+        Args:
+            ltm: 长期记忆
+        
+        Returns:
+            是否需要压缩
+        """
+        memories = ltm.memories
+        if len(memories.get("conversation_summaries", [])) > self.keep_summaries * 2:
+            return True
+        return any(len(memories.get(category, [])) > self.cap_for(category) for category in MEMORY_CATEGORIES)
+    
+    def deduplicate(self, items: List[Dict]) -> tuple:
+        """
+        合并近似重复的记忆
+        
+        按时间顺序处理，与已保留的记忆相似时用较新的一条替换，并累计 merged_count。
+        候选记忆通过 k-gram 倒排表查找，不需要两两比较。
+        
+        Args:
+            items: 同一类别的记忆列表
+        
+        Returns:
+            (去重后的列表, 被替换的记忆列表)，被替换的记忆由调用方归档
+        """
+        kept: List[Dict] = []
+        kept_shingles: List[Set[str]] = []
+        index: Dict[str, Set[int]] = {}
+        replaced: List[Dict] = []
+        
+        for item in items:
+            item_shingles = shingles(item.get("content", ""))
+            shared = Counter()
+            for gram in item_shingles:
+                for slot in index.get(gram, ()):
+                    shared[slot] += 1
+            
+            best_slot, best_score = None, 0.0
+            for slot, count in shared.items():
+                score = count / (len(item_shingles) + len(kept_shingles[slot]) - count)
+                if score > best_score:
+                    best_slot, best_score = slot, score
+            
+            if best_slot is not None and best_score >= self.similarity_threshold:
+                previous = kept[best_slot]
+                newer = dict(item)
+                newer["merged_count"] = previous.get("merged_count", 0) + item.get("merged_count", 0) + 1
+                newer.setdefault("first_seen_at", previous.get("first_seen_at") or previous.get("created_at"))
+                for gram in kept_shingles[best_slot]:
+                    index[gram].discard(best_slot)
+                kept[best_slot] = newer
+                kept_shingles[best_slot] = item_shingles
+                replaced.append(previous)
+            else:
+                best_slot = len(kept)
+                kept.append(item)
+                kept_shingles.append(item_shingles)
+            
+            for gram in item_shingles:
+                index.setdefault(gram, set()).add(best_slot)
+        
+        return kept, replaced
+    
+    def _compact_notes(self, notes: str) -> tuple:
+        """对话建议按行去重并只保留最近的若干行，返回 (新内容, 删除的行数)"""
+        lines = [line.strip() for line in notes.split("\n") if line.strip()]
+        kept: List[str] = []
+        kept_shingles: List[Set[str]] = []
+        # 从新到旧遍历，保留较新的表述
+        for line in reversed(lines):
+            line_shingles = shingles(line)
+            if any(jaccard(line_shingles, other) >= self.similarity_threshold for other in kept_shingles):
+                continue
+            kept.append(line)
+            kept_shingles.append(line_shingles)
+            if len(kept) >= self.max_notes_lines:
+                break
+        kept.reverse()
+        return "\n".join(kept), len(lines) - len(kept)
+    
+    def compact(self, ltm: LongTermMemory, dry_run: bool = False) -> Dict:
+        """
+        压缩一个用户的长期记忆
+        
+        Args:
+            ltm: 长期记忆
+            dry_run: 为 True 时只计算报告，不修改记忆和文件
+        
+        Returns:
+            压缩报告（文件大小、系统提示 token 数的前后对比，以及合并、淘汰、归档的条数）
+        """
+        with ltm.lock:
+            file_bytes_before = ltm.MEMORY_FILE.stat().st_size if ltm.MEMORY_FILE.exists() else 0
+            tokens_before = estimate_tokens([{"content": ltm.to_system_context()}])
+            memories = json.loads(json.dumps(ltm.memories))  # 在副本上计算，dry_run 时不影响原数据
+            archived: List[Dict] = []
+            merged_total = 0
+            capped_total = 0
+            
+            for category in MEMORY_CATEGORIES:
+                items, replaced = self.deduplicate(memories.get(category, []))
+                merged_total += len(replaced)
+                archived.extend({"kind": "merged", "category": category, "item": item} for item in replaced)
+                cap = self.cap_for(category)
+                if len(items) > cap:
+                    newest = sorted(range(len(items)), key=lambda i: _timestamp(items[i]), reverse=True)[:cap]
+                    keep = set(newest)
+                    archived.extend(
+                        {"kind": "memory", "category": category, "item": item}
+                        for i, item in enumerate(items) if i not in keep
+                    )
+                    capped_total += len(items) - cap
+                    items = [item for i, item in enumerate(items) if i in keep]
+                memories[category] = items
+            
+            summaries = memories.get("conversation_summaries", [])
+            old_summaries = summaries[:-self.keep_summaries] if self.keep_summaries else summaries
+            if old_summaries:
+                archived.extend({"kind": "summary", "item": item} for item in old_summaries)
+                memories["conversation_summaries"] = summaries[len(old_summaries):]
+            
+            notes_removed = 0
+            if memories.get("notes_for_future"):
+                memories["notes_for_future"], notes_removed = self._compact_notes(memories["notes_for_future"])
+            
+            report = {
+                "merged": merged_total,
+                "capped": capped_total,
+                "summaries_archived": len(old_summaries),
+                "notes_lines_removed": notes_removed,
+                "file_bytes_before": file_bytes_before,
+                "prompt_tokens_before": tokens_before,
+            }
+            
+            if dry_run:
+                report["file_bytes_after"] = len(json.dumps(memories, ensure_ascii=False, indent=2).encode("utf-8"))
+                report["prompt_tokens_after"] = estimate_tokens([{"content": ltm.to_system_context(memories)}])
+                return report
+            
+            if archived:
+                self._archive(ltm.ARCHIVE_FILE, archived)
+            ltm.memories = memories
+            ltm.save_memories()
+            report["file_bytes_after"] = ltm.MEMORY_FILE.stat().st_size
+            report["prompt_tokens_after"] = estimate_tokens([{"content": ltm.to_system_context()}])
+            return report
+    
+    @staticmethod
+    def _archive(path: Path, records: List[Dict]) -> None:
+        """把记录追加到 gzip 归档（多个 gzip 成员拼接，gzip.open 可以连续读取）"""
+        archived_at = datetime.now().isoformat()
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for record in records:
+                record["archived_at"] = archived_at
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def compact_in_background(
+    ltm: LongTermMemory,
+    compactor: Optional[MemoryCompactor] = None,
+    on_done: Optional[Callable[[Dict], None]] = None
+) -> Optional[threading.Thread]:
+    """
+    需要压缩时在后台线程中压缩（不阻塞当前请求）
+    
+    Args:
+        ltm: 长期记忆
+        compactor: 压缩器，默认按配置创建
+        on_done: 压缩完成后的回调（参数为压缩报告），如用于刷新系统消息
+    
+    Returns:
+        启动的线程，不需要压缩时返回 None
+    """
+    compactor = compactor or MemoryCompactor()
+    if not compactor.needs_compaction(ltm):
+        return None
+    
+    def _run():
+        try:
+            report = compactor.compact(ltm)
+            print(f"[记忆系统] 长期记忆已压缩: {format_report(report)}")
+            if on_done:
+                on_done(report)
+        except Exception as e:
+            print(f"[记忆系统] 长期记忆压缩失败: {e}")
+    
+    thread = threading.Thread(target=_run, name="ltm-compaction", daemon=True)
+    thread.start()
+    return thread
+
+
+def format_report(report: Dict) -> str:
+    """
+    把压缩报告格式化为一行文字
+    
+    Args:
+        report: compact 的返回值
+    
+    Returns:
+        报告文字
+    """
+    return (
+        f"合并 {report['merged']} 条、淘汰 {report['capped']} 条、归档总结 {report['summaries_archived']} 条，"
+        f"文件 {report['file_bytes_before']} → {report['file_bytes_after']} 字节，"
+        f"系统提示约 {report['prompt_tokens_before']} → {report['prompt_tokens_after']} tokens"
+    )
+
+
+def main():
+    """命令行入口：压缩 memory/ 下的长期记忆文件"""
+    parser = argparse.ArgumentParser(description="长期记忆压缩")
+    parser.add_argument("--user-id", type=int, default=None, help="只压缩指定用户（默认压缩所有用户和全局记忆）")
+    parser.add_argument("--dry-run", action="store_true", help="只报告，不写文件")
+    args = parser.parse_args()
+    
+    if args.user_id is not None:
+        user_ids = [args.user_id]
+    else:
+        user_ids = [None]
+        for path in sorted(Path("memory").glob("user_*_long_term_memory.json")):
+            user_ids.append(int(path.name.split("_")[1]))
+    
+    compactor = MemoryCompactor()
+    for user_id in user_ids:
+        ltm = LongTermMemory(user_id=user_id)
+        if not ltm.MEMORY_FILE.exists():
+            continue
+        report = compactor.compact(ltm, dry_run=args.dry_run)
+        label = f"用户 {user_id}" if user_id is not None else "全局记忆"
+        print(f"{label}: {format_report(report)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,122 @@
 """长期记忆存储"""
 import json
+import os
+import threading
+from bisect import bisect_left
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 from datetime import datetime
+from config import Config
+from memory.ngram_index import NgramIndex
 
 
 class LongTermMemory:
     """长期记忆管理器，持久化存储重要记忆"""
     
-    def __init__(self, user_id: Optional[int] = None):
+    # 记忆字典中不是记忆列表的字段
+    NON_MEMORY_KEYS = ("conversation_summaries", "notes_for_future")
+    
+    def __init__(self, user_id: Optional[int] = None, base_dir: Optional[str] = None):
         """
         初始化长期记忆管理器
         
         Args:
             user_id: 用户ID，如果提供则使用用户特定的文件路径，否则使用全局路径（向后兼容）
+            base_dir: 数据根目录（其下的 memory/ 存放记忆文件），默认为当前目录
         """
         self.user_id = user_id
+        memory_dir = Path(base_dir or ".") / "memory"
         # 根据 user_id 确定文件路径
         if user_id is not None:
-            self.MEMORY_FILE = Path(f"memory/user_{user_id}_long_term_memory.json")
+            self.MEMORY_FILE = memory_dir / f"user_{user_id}_long_term_memory.json"
         else:
             # 向后兼容：如果未提供 user_id，使用全局文件
-            self.MEMORY_FILE = Path("memory/long_term_memory.json")
+            self.MEMORY_FILE = memory_dir / "long_term_memory.json"
+        
+        # 旧的对话总结和被淘汰的记忆归档到同目录下的 gzip 文件（见 memory/compaction.py）
+        self.ARCHIVE_FILE = self.MEMORY_FILE.with_name(f"{self.MEMORY_FILE.stem}_archive.jsonl.gz")
         
         # 确保目录存在
-        self.MEMORY_FILE.parent.mkdir(exist_ok=True)
+        self.MEMORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+        # 后台压缩和总结入库可能在不同线程中修改记忆
+        self.lock = threading.RLock()
+        # 记忆版本号：记忆每次变化时递增，用于缓存渲染结果（见 to_system_context）
+        self.version = 0
+        # 版本号只在进程内有效，和随机的实例标识一起组成对外的修订号（见 revision）
+        self._epoch = os.urandom(4).hex()
+        # 记忆变化的监听函数（见 add_listener）
+        self._listeners: List[Callable[["LongTermMemory", Dict], None]] = []
+        self._context_cache: Optional[Tuple[int, str]] = None
+        # 记忆文件的 (修改时间, 大小)，用于判断文件是否被其他程序修改（见 reload_if_changed）
+        self._file_signature: Optional[Tuple[int, int]] = None
         self.memories = self.load_memories()
+        # 记忆内容的 n-gram 索引（首次查找时构建）
+        self._index: Optional[NgramIndex] = None
+        self._indexed_memories: Optional[Dict] = None
+        self._indexed_items: Dict[int, Tuple[str, Dict]] = {}
+    
+    @property
+    def memories(self) -> Dict:
+        """记忆字典"""
+        return self._memories
+    
+    @memories.setter
+    def memories(self, memories: Dict) -> None:
+        # 整体替换（重新加载、压缩）也视为一次变化
+        self._memories = memories
+        self.touch()
+    
+    @property
+    def revision(self) -> str:
+        """记忆修订号：记忆变化或重新创建实例（如服务重启）后都会改变，可用作 ETag"""
+        return f"{self._epoch}-{self.version}"
+    
+    def touch(self, *changes: Dict) -> None:
+        """
+        标记记忆已变化（直接修改 self.memories 中的内容后需要调用）
+        
+        Args:
+            changes: 本次变化的内容，如 {"op": "add", "category": ..., "item": ...}，
+                不传时表示整体变化（监听者需要重新获取全部记忆）
+        """
+        with self.lock:
+            base = self.revision
+            self.version += 1
+            if not self._listeners:
+                return
+            event = {"base": base, "revision": self.revision, "changes": list(changes) or [{"op": "reset"}]}
+            for listener in list(self._listeners):
+                try:
+                    listener(self, event)
+                except Exception as e:
+                    print(f"记忆变化通知失败: {e}")
+    
+    def add_listener(self, listener: Callable[["LongTermMemory", Dict], None]) -> None:
+        """
+        注册记忆变化监听函数
+        
+        每次变化后（持有锁时）调用 listener(ltm, event)，event 为
+        {"base": 变化前的修订号, "revision": 变化后的修订号, "changes": [...]}。
+        changes 中的 op：add（追加 item）、update（替换 index 处的 item）、delete（删除 index 处的记忆）、
+        set（notes_for_future 的新值 value）、reset（整体变化）。监听函数应尽快返回。
+        
+        Args:
+            listener: 监听函数
+        """
+        with self.lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[["LongTermMemory", Dict], None]) -> None:
+        """
+        移除记忆变化监听函数
+        
+        Args:
+            listener: add_listener 注册的函数
+        """
+        with self.lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
     
     def load_memories(self) -> Dict:
         """
@@ -34,6 +125,8 @@ class LongTermMemory:
         Returns:
             记忆字典
         """
+        # 读取前记录文件签名：读取期间文件被修改时，下次检查会再读一次
+        self._file_signature = self._stat_file()
         if self.MEMORY_FILE.exists():
             try:
                 with open(self.MEMORY_FILE, 'r', encoding='utf-8') as f:
@@ -46,13 +139,34 @@ class LongTermMemory:
         else:
             return self._create_empty_memory()
     
+    def _stat_file(self) -> Optional[Tuple[int, int]]:
+        """获取记忆文件的 (修改时间, 大小)，文件不存在时返回 None"""
+        try:
+            st = self.MEMORY_FILE.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+    
+    def reload_if_changed(self) -> bool:
+        """
+        记忆文件被其他程序修改或删除时重新加载（自己写入的修改不会触发重新加载）
+        
+        Returns:
+            是否重新加载
+        """
+        with self.lock:
+            if self._stat_file() == self._file_signature:
+                return False
+            self.memories = self.load_memories()
+            return True
+    
     def _ensure_memory_structure(self, memories: Dict) -> Dict:
         """
         确保记忆字典包含所有必需的字段（向后兼容）
         
         Args:
             memories: 从文件加载的记忆字典
-            
+        
         Returns:
             补全后的记忆字典
         """
@@ -97,14 +211,67 @@ class LongTermMemory:
             是否保存成功
         """
         try:
-            with open(self.MEMORY_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.memories, f, ensure_ascii=False, indent=2)
+            # 先写临时文件再替换，避免写入中途失败或并发读取时读到不完整的文件
+            tmp_file = self.MEMORY_FILE.with_name(self.MEMORY_FILE.name + ".tmp")
+            with self.lock:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.memories, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_file, self.MEMORY_FILE)
+                self._file_signature = self._stat_file()
             return True
         except Exception as e:
             print(f"保存长期记忆失败: {e}")
             return False
     
-    def add_memory(self, memory_type: str, content: str, reason: str) -> bool:
+    def _memory_index(self) -> NgramIndex:
+        """
+        获取记忆内容的 n-gram 索引（调用方持有锁）
+        
+        索引在增删改时增量维护；self.memories 被整体替换（重新加载、压缩）时自动重建。
+        """
+        if self._index is None or self._indexed_memories is not self.memories:
+            self._index = NgramIndex()
+            self._indexed_items = {}
+            for memory_type, memories in self.memories.items():
+                if memory_type in self.NON_MEMORY_KEYS or not isinstance(memories, list):
+                    continue
+                for memory in memories:
+                    self._index_memory(memory_type, memory)
+            self._indexed_memories = self.memories
+        return self._index
+    
+    def _index_memory(self, memory_type: str, memory: Dict) -> None:
+        """把一条记忆加入索引（以对象 id 为键，索引持有引用，id 不会被复用）"""
+        self._indexed_items[id(memory)] = (memory_type, memory)
+        self._index.add(id(memory), memory.get("content", ""))
+    
+    def find_memories(self, query: str, limit: int = 5) -> List[Tuple[str, Dict, float]]:
+        """
+        按相似度查找记忆
+        
+        相似度为字符 2-gram 的 IDF 加权 Dice 系数；查询是记忆内容的子串时视为完全匹配（与旧的子串查找兼容）。
+        
+        Args:
+            query: 查询文本
+            limit: 最多返回的结果数
+        
+        Returns:
+            [(记忆类型, 记忆, 相似度)]，按相似度从高到低排序
+        """
+        with self.lock:
+            index = self._memory_index()
+            query_lower = query.lower()
+            results = []
+            # 多取一些候选，子串匹配的记忆可能因长度差异 Dice 分数不高
+            for key, score in index.search(query, limit=limit * 4):
+                memory_type, memory = self._indexed_items[key]
+                if query_lower and query_lower in memory.get("content", "").lower():
+                    score = 1.0
+                results.append((memory_type, memory, score))
+            results.sort(key=lambda item: item[2], reverse=True)
+            return results[:limit]
+    
+    def add_memory(self, memory_type: str, content: str, reason: str, save: bool = True) -> bool:
         """
         添加一条记忆
         
@@ -112,11 +279,12 @@ class LongTermMemory:
             memory_type: 记忆类型
             content: 记忆内容
             reason: 为什么值得记忆
+            save: 是否立即写入文件（批量修改时由调用方最后统一保存）
         
         Returns:
             是否添加成功
         """
-        if memory_type not in self.memories:
+        if memory_type not in self.memories or memory_type in self.NON_MEMORY_KEYS:
             memory_type = "other"
         
         memory_item = {
@@ -125,35 +293,69 @@ class LongTermMemory:
             "created_at": datetime.now().isoformat()
         }
         
-        self.memories[memory_type].append(memory_item)
-        return self.save_memories()
+        with self.lock:
+            self._memory_index()
+            self.memories[memory_type].append(memory_item)
+            self._index_memory(memory_type, memory_item)
+            self.touch({"op": "add", "category": memory_type, "item": memory_item})
+        return self.save_memories() if save else True
     
-    def update_memory(self, target: str, new_content: str, reason: str) -> bool:
+    def update_memory(self, target: str, new_content: str, reason: str, save: bool = True) -> bool:
         """
         更新已有记忆
         
+        只用 target（要更新的记忆描述）在索引中查找最相似的记忆：相似度达到 LTM_UPDATE_MATCH_THRESHOLD、
+        并且比第二相似的记忆高出至少 LTM_UPDATE_MATCH_MARGIN 时原地更新；匹配不明确时作为新记忆添加，
+        宁可多一条记忆也不覆盖无关的记忆。
+        
         Args:
             target: 要更新的记忆描述
             new_content: 更新后的内容
             reason: 更新原因
+            save: 是否立即写入文件（批量修改时由调用方最后统一保存）
         
         Returns:
             是否更新成功
         """
-        # 在所有类型中查找匹配的记忆
-        for memory_type, memories in self.memories.items():
-            if memory_type == "conversation_summaries" or memory_type == "notes_for_future":
-                continue
-            
-            for memory in memories:
-                if target.lower() in memory.get("content", "").lower():
-                    memory["content"] = new_content
-                    memory["updated_at"] = datetime.now().isoformat()
-                    memory["update_reason"] = reason
-                    return self.save_memories()
+        with self.lock:
+            candidates = self.find_memories(target, limit=2)
+            best_score = candidates[0][2] if candidates else 0.0
+            runner_up = candidates[1][2] if len(candidates) > 1 else 0.0
+            if best_score >= Config.LTM_UPDATE_MATCH_THRESHOLD and best_score - runner_up >= Config.LTM_UPDATE_MATCH_MARGIN:
+                memory_type, memory, _ = candidates[0]
+                memory["content"] = new_content
+                memory["updated_at"] = datetime.now().isoformat()
+                memory["update_reason"] = reason
+                self._index_memory(memory_type, memory)
+                index = next(i for i, item in enumerate(self.memories[memory_type]) if item is memory)
+                self.touch({"op": "update", "category": memory_type, "index": index, "item": memory})
+                return self.save_memories() if save else True
         
         # 如果没找到，作为新记忆添加
-        return self.add_memory("other", new_content, reason)
+        return self.add_memory("other", new_content, reason, save=save)
+    
+    def delete_memory(self, memory_type: str, position: int, save: bool = True) -> bool:
+        """
+        删除一条记忆
+        
+        Args:
+            memory_type: 记忆类型
+            position: 记忆在该类型列表中的位置
+            save: 是否立即写入文件
+        
+        Returns:
+            是否删除成功
+        """
+        with self.lock:
+            memories = self.memories.get(memory_type)
+            if memory_type in self.NON_MEMORY_KEYS or not isinstance(memories, list) or not 0 <= position < len(memories):
+                return False
+            self._memory_index()
+            memory = memories.pop(position)
+            self._index.remove(id(memory))
+            self._indexed_items.pop(id(memory), None)
+            self.touch({"op": "delete", "category": memory_type, "index": position})
+        return self.save_memories() if save else True
     
     def add_summary(self, summary: Dict) -> bool:
         """
@@ -165,6 +367,11 @@ class LongTermMemory:
         Returns:
             是否添加成功
         """
+        with self.lock:
+            return self._add_summary(summary)
+    
+    def _add_summary(self, summary: Dict) -> bool:
+        """add_summary 的实现（调用方持有锁）"""
         summary_item = {
             "summary": summary.get("summary", ""),
             "memories_added": summary.get("memories_to_add", []),
@@ -186,7 +393,8 @@ class LongTermMemory:
             self.add_memory(
                 memory.get("type", "other"),
                 memory.get("content", ""),
-                memory.get("reason", "")
+                memory.get("reason", ""),
+                save=False
             )
         
         # 更新已有记忆
@@ -194,7 +402,8 @@ class LongTermMemory:
             self.update_memory(
                 memory.get("target", ""),
                 memory.get("content", ""),
-                memory.get("reason", "")
+                memory.get("reason", ""),
+                save=False
             )
         
         # 更新未来对话建议
@@ -210,12 +419,53 @@ class LongTermMemory:
             else:
                 self.memories["notes_for_future"] = summary["notes_for_future_conversation"]
         
+        changes = [{"op": "add", "category": "conversation_summaries", "item": summary_item}]
+        if summary.get("notes_for_future_conversation"):
+            changes.append({"op": "set", "category": "notes_for_future", "value": self.memories["notes_for_future"]})
+        self.touch(*changes)
         return self.save_memories()
     
     def get_all_memories(self) -> Dict:
         """获取所有记忆"""
         return self.memories.copy()
     
+    def get_memories_page(
+        self,
+        categories: Optional[List[str]] = None,
+        summary_limit: Optional[int] = None,
+        summary_cursor: Optional[str] = None
+    ) -> Tuple[Dict, Optional[str]]:
+        """
+        按类别获取记忆，对话总结按时间倒序分页
+        
+        Args:
+            categories: 要返回的字段（记忆类型、conversation_summaries、notes_for_future），默认全部
+            summary_limit: 每页返回的对话总结条数，默认全部（按原顺序）
+            summary_cursor: 上一页最后一条总结的 created_at，返回更早的总结
+        
+        Returns:
+            (记忆字典, 下一页游标)，没有更早的总结时游标为 None
+        """
+        with self.lock:
+            keys = self.memories.keys() if categories is None else [k for k in categories if k in self.memories]
+            result = {}
+            next_cursor = None
+            for key in keys:
+                value = self.memories[key]
+                if key == "conversation_summaries" and (summary_limit is not None or summary_cursor):
+                    # 总结按时间顺序追加，created_at 递增
+                    end = len(value)
+                    if summary_cursor:
+                        # bisect 的 key 参数需要 Python 3.10，这里先取出时间列表（支持 3.9）
+                        end = bisect_left([item.get("created_at", "") for item in value], summary_cursor)
+                    start = 0 if summary_limit is None else max(0, end - summary_limit)
+                    result[key] = value[start:end][::-1]
+                    if start > 0 and result[key]:
+                        next_cursor = result[key][-1].get("created_at")
+                else:
+                    result[key] = value.copy() if isinstance(value, (list, dict)) else value
+            return result, next_cursor
+    
     def get_memories_by_type(self, memory_type: str) -> List[Dict]:
         """
         获取指定类型的记忆
@@ -228,54 +478,69 @@ class LongTermMemory:
         """
         return self.memories.get(memory_type, []).copy()
     
-    def to_system_context(self) -> str:
+    def to_system_context(self, memories: Optional[Dict] = None) -> str:
         """
         将长期记忆转换为系统上下文（用于增强对话）
         
+        当前记忆的渲染结果按版本号缓存，记忆没有变化时直接返回缓存。
+        
+        Args:
+            memories: 要渲染的记忆字典，默认为当前记忆（压缩预览时传入压缩后的副本）
+        
         Returns:
             格式化的上下文字符串
         """
+        if memories is not None:
+            return self._render_context(memories)
+        with self.lock:
+            if self._context_cache is None or self._context_cache[0] != self.version:
+                self._context_cache = (self.version, self._render_context(self.memories))
+            return self._context_cache[1]
+    
+    @staticmethod
+    def _render_context(memories: Dict) -> str:
+        """把记忆字典渲染为系统上下文"""
         parts = []
         
         # 个人档案
-        if self.memories.get("personal_profile"):
+        if memories.get("personal_profile"):
             parts.append("【用户档案】")
-            for mem in self.memories["personal_profile"]:
+            for mem in memories["personal_profile"]:
                 parts.append(f"- {mem['content']}")
         
         # 偏好
-        if self.memories.get("preference"):
+        if memories.get("preference"):
             parts.append("\n【用户偏好】")
-            for mem in self.memories["preference"]:
+            for mem in memories["preference"]:
                 parts.append(f"- {mem['content']}")
         
         # 重要关系
-        if self.memories.get("relationship"):
+        if memories.get("relationship"):
             parts.append("\n【重要关系】")
-            for mem in self.memories["relationship"]:
+            for mem in memories["relationship"]:
                 parts.append(f"- {mem['content']}")
         
         # 重要事件
-        if self.memories.get("important_event"):
+        if memories.get("important_event"):
             parts.append("\n【重要事件】")
-            for mem in self.memories["important_event"]:
+            for mem in memories["important_event"]:
                 parts.append(f"- {mem['content']}")
         
         # 计划
-        if self.memories.get("plan"):
+        if memories.get("plan"):
             parts.append("\n【约定与计划】")
-            for mem in self.memories["plan"]:
+            for mem in memories["plan"]:
                 parts.append(f"- {mem['content']}")
         
         # 长期目标
-        if self.memories.get("long_term_goal"):
+        if memories.get("long_term_goal"):
             parts.append("\n【长期目标】")
-            for mem in self.memories["long_term_goal"]:
+            for mem in memories["long_term_goal"]:
                 parts.append(f"- {mem['content']}")
         
         # 未来对话建议
-        if self.memories.get("notes_for_future"):
-            parts.append(f"\n【对话建议】\n{self.memories['notes_for_future']}")
+        if memories.get("notes_for_future"):
+            parts.append(f"\n【对话建议】\n{memories['notes_for_future']}")
         
         if not parts:
             return ""
@@ -2,6 +2,9 @@
 import json
 from typing import Dict, List, Optional
 from api_providers.base import BaseAPIProvider
+from api_providers.errors import ProviderError
+from memory.response_cache import ResponseCache, get_response_cache, prompt_version
+from memory.prefilter import HeuristicPreFilter, get_prefilter
 
 
 class MemoryFilter:
@@ -44,22 +47,40 @@ class MemoryFilter:
   "reason": "一句话说明为什么（例如：包含新的职业信息 / 只是普通闲聊等）"
 }"""
     
-    def __init__(self, api_provider: BaseAPIProvider):
+    # 提示词版本，修改提示词后旧的缓存结果自动失效
+    PROMPT_VERSION = prompt_version(FILTER_PROMPT)
+    
+    def __init__(
+        self,
+        api_provider: BaseAPIProvider,
+        cache: Optional[ResponseCache] = None,
+        prefilter: Optional[HeuristicPreFilter] = None
+    ):
         """
         初始化记忆过滤器
         
         Args:
             api_provider: API提供者实例
+            cache: 结果缓存，默认使用全局共享的缓存（未启用时为 None）
+            prefilter: 本地预筛器，默认使用全局共享的预筛器（未启用时为 None）
         """
         self.api_provider = api_provider
+        self.cache = cache if cache is not None else get_response_cache()
+        self.prefilter = prefilter if prefilter is not None else get_prefilter()
     
-    def should_save(self, conversation: List[Dict[str, str]], api_key: Optional[str] = None) -> Dict[str, any]:
+    def should_save(
+        self,
+        conversation: List[Dict[str, str]],
+        api_key: Optional[str] = None,
+        context: Optional[str] = None
+    ) -> Dict[str, any]:
         """
         判断对话是否值得存储
         
         Args:
             conversation: 对话历史列表，格式为 [{"role": "user", "content": "..."}, ...]
             api_key: 可选的 API 密钥，如果提供则优先使用，否则使用 provider 的默认 key
+            context: 可选的前文摘要（长会话分段总结时，之前各段的滚动摘要），只作为理解本段对话的背景
         
         Returns:
             {
@@ -67,8 +88,27 @@ class MemoryFilter:
                 "reason": str
             }
         """
+        # 本地预筛：明显的闲聊直接判定为不需要储存，不调用 API
+        if self.prefilter is not None:
+            skip, reason = self.prefilter.classify(conversation)
+            if skip:
+                return {
+                    "should_save": False,
+                    "reason": f"本地预筛：{reason}"
+                }
+        
         # 构建对话文本
         conversation_text = self._format_conversation(conversation)
+        if context:
+            conversation_text = f"【前文摘要（仅作背景，其中的信息已处理过）】\n{context}\n\n【本段对话】\n{conversation_text}"
+        
+        # 相同的对话已经分析过时直接返回缓存结果
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.make_key("filter", self.api_provider.model, self.PROMPT_VERSION, conversation_text)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
         
         # 构建消息
         messages = [
@@ -96,14 +136,21 @@ class MemoryFilter:
             if "reason" not in result:
                 result["reason"] = "无法判断"
             
-            return result
+            # 只缓存成功解析的结果，失败时下次仍会重新调用
+            if cache_key is not None:
+                self.cache.set(cache_key, result)
             
+            return result
+        
         except json.JSONDecodeError as e:
             # JSON解析失败，默认不保存
             return {
                 "should_save": False,
                 "reason": f"解析失败: {str(e)}"
             }
+        except ProviderError:
+            # 上游故障（超时、限流、熔断等）交给调用方处理：保留对话稍后重试，而不是当作“不值得存储”丢掉
+            raise
         except Exception as e:
             # 其他错误，默认不保存
             return {
@@ -2,6 +2,8 @@
 import json
 from typing import Dict, List, Optional
 from api_providers.base import BaseAPIProvider
+from api_providers.errors import ProviderError
+from memory.response_cache import ResponseCache, get_response_cache, prompt_version
 
 
 class MemorySummarizer:
@@ -66,28 +68,49 @@ class MemorySummarizer:
 - 如果用户对聊天风格提出要求（如"不要太严肃""别老讲大道理""多一点鼓励"），记录为 preference。
 - 如果用户提到未来希望你"记得某个纪念日、考试时间、面试时间"等，记录为 plan，并在 reason 中标明"可以在临近时主动关心或询问"。"""
     
-    def __init__(self, api_provider: BaseAPIProvider):
+    # 提示词版本，修改提示词后旧的缓存结果自动失效
+    PROMPT_VERSION = prompt_version(SUMMARIZE_PROMPT)
+    
+    def __init__(self, api_provider: BaseAPIProvider, cache: Optional[ResponseCache] = None):
         """
         初始化记忆总结器
         
         Args:
             api_provider: API提供者实例
+            cache: 结果缓存，默认使用全局共享的缓存（未启用时为 None）
         """
         self.api_provider = api_provider
+        self.cache = cache if cache is not None else get_response_cache()
     
-    def summarize(self, conversation: List[Dict[str, str]], api_key: Optional[str] = None) -> Dict[str, any]:
+    def summarize(
+        self,
+        conversation: List[Dict[str, str]],
+        api_key: Optional[str] = None,
+        context: Optional[str] = None
+    ) -> Dict[str, any]:
         """
         总结对话并提取记忆
         
         Args:
             conversation: 对话历史列表
             api_key: 可选的 API 密钥，如果提供则优先使用，否则使用 provider 的默认 key
+            context: 可选的前文摘要（长会话分段总结时，之前各段的滚动摘要），只作为理解本段对话的背景
         
         Returns:
             总结结果字典
         """
         # 构建对话文本
         conversation_text = self._format_conversation(conversation)
+        if context:
+            conversation_text = f"【前文摘要（仅作背景，其中的信息已处理过）】\n{context}\n\n【本段对话】\n{conversation_text}"
+        
+        # 相同的对话已经分析过时直接返回缓存结果
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.make_key("summarizer", self.api_provider.model, self.PROMPT_VERSION, conversation_text)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
         
         # 构建消息
         messages = [
@@ -120,6 +143,10 @@ class MemorySummarizer:
             if "notes_for_future_conversation" not in result:
                 result["notes_for_future_conversation"] = ""
             
+            # 只缓存成功解析的结果，失败时下次仍会重新调用
+            if cache_key is not None:
+                self.cache.set(cache_key, result)
+            
             return result
             
         except json.JSONDecodeError as e:
@@ -131,6 +158,9 @@ class MemorySummarizer:
                 "should_save_memory": False,
                 "notes_for_future_conversation": ""
             }
+        except ProviderError:
+            # 上游故障交给调用方处理（见 MemoryFilter.should_save）
+            raise
         except Exception as e:
             # 其他错误
             return {
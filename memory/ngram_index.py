@@ -0,0 +1,141 @@
+"""字符 n-gram 倒排索引 - 用于中文记忆的相似度查找（不需要分词）"""
+import heapq
+import math
+import re
+from typing import Dict, Hashable, List, Set, Tuple
+
+# 计算相似度时忽略的字符（标点和空白）
+_IGNORED_CHARS = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def shingles(text: str, k: int = 2) -> Set[str]:
+    """
+    把文本切成字符 k-gram 集合（适合不分词的中文）
+    
+    Args:
+        text: 文本
+        k: gram 长度
+    
+    Returns:
+        k-gram 集合
+    """
+    normalized = _IGNORED_CHARS.sub("", text.lower())
+    if len(normalized) <= k:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + k] for i in range(len(normalized) - k + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """两个集合的 Jaccard 相似度"""
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+class NgramIndex:
+    """
+    字符 n-gram 倒排索引
+    
+    支持增量添加、更新和删除文档，按 IDF 加权的 Dice 系数排序：几乎每条记忆都有的 n-gram（如"用户"）
+    权重很低，不会让无关的记忆显得相似。查询时只通过较少见的 n-gram 查找候选文档，出现在大部分文档中的
+    停用 n-gram 只参与打分，避免每次查询都访问整个索引。
+    """
+    
+    def __init__(self, k: int = 2, stop_ratio: float = 0.05, stop_min_docs: int = 50, shortlist: int = 32):
+        """
+        初始化索引
+        
+        Args:
+            k: gram 长度（中文短句用 2 效果较好）
+            stop_ratio: 出现在超过该比例文档中的 n-gram 视为停用 n-gram，不用于查找候选
+            stop_min_docs: 停用 n-gram 的最少文档数（文档较少时不启用停用）
+            shortlist: 计算完整相似度的候选数下限（按共享的少见 n-gram 粗排）
+        """
+        self.k = k
+        self.stop_ratio = stop_ratio
+        self.stop_min_docs = stop_min_docs
+        self.shortlist = shortlist
+        self._postings: Dict[str, Set[Hashable]] = {}
+        self._grams: Dict[Hashable, Set[str]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._grams)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._grams
+    
+    def add(self, key: Hashable, text: str) -> None:
+        """
+        添加（或替换）一个文档
+        
+        Args:
+            key: 文档键
+            text: 文档内容
+        """
+        if key in self._grams:
+            self.remove(key)
+        grams = shingles(text, self.k)
+        self._grams[key] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+    
+    def remove(self, key: Hashable) -> None:
+        """
+        删除一个文档（不存在时忽略）
+        
+        Args:
+            key: 文档键
+        """
+        for gram in self._grams.pop(key, ()):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[gram]
+    
+    def _weight(self, gram: str) -> float:
+        """n-gram 的 IDF 权重（平滑，出现在所有文档中的 n-gram 权重为 1）"""
+        return math.log((len(self._grams) + 1) / (len(self._postings.get(gram, ())) + 1)) + 1
+    
+    def search(self, text: str, min_score: float = 0.0, limit: int = 5) -> List[Tuple[Hashable, float]]:
+        """
+        查找与文本最相似的文档
+        
+        Args:
+            text: 查询文本
+            min_score: 最低相似度（IDF 加权的 Dice 系数，0~1）
+            limit: 最多返回的结果数
+        
+        Returns:
+            [(文档键, 相似度)]，按相似度从高到低排序
+        """
+        query = shingles(text, self.k)
+        known = [gram for gram in query if gram in self._postings]
+        if not known:
+            return []
+        cutoff = max(self.stop_min_docs, self.stop_ratio * len(self._grams))
+        probe = [gram for gram in known if len(self._postings[gram]) <= cutoff]
+        if not probe:
+            # 查询只由停用 n-gram 组成：只用其中最少见的一个查找候选
+            probe = [min(known, key=lambda gram: len(self._postings[gram]))]
+        weights = {gram: self._weight(gram) for gram in query}
+        # 先按共享的少见 n-gram 权重粗排，只对排在前面的候选计算完整的相似度
+        partial: Dict[Hashable, float] = {}
+        for gram in probe:
+            gram_weight = weights[gram]
+            for key in self._postings[gram]:
+                partial[key] = partial.get(key, 0.0) + gram_weight
+        shortlist = heapq.nlargest(max(limit * 4, self.shortlist), partial, key=partial.__getitem__)
+        
+        query_weight = sum(weights.values())
+        results = []
+        for key in shortlist:
+            grams = self._grams[key]
+            shared = sum(gram_weight for gram, gram_weight in weights.items() if gram in grams)
+            doc_weight = sum(weights[gram] if gram in weights else self._weight(gram) for gram in grams)
+            score = 2 * shared / (query_weight + doc_weight)
+            if score >= min_score:
+                results.append((key, score))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:limit]
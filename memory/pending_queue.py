@@ -0,0 +1,134 @@
+"""待总结对话的持久化队列
+
+服务关闭时来不及总结的对话（以及总结失败的对话）写入 SQLite，下次启动时继续总结。
+队列中只保存对话内容和用户 ID，不保存 API Key：重新总结时按用户 ID 查询当时的 Key。
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+class PendingSummaryQueue:
+    """待总结对话的持久化队列（SQLite，可在多个线程中使用）"""
+    
+    def __init__(self, path: str, max_attempts: int = 5):
+        """
+        初始化队列
+        
+        Args:
+            path: SQLite 文件路径
+            max_attempts: 总结失败超过该次数后丢弃（如用户一直没有配置可用的 Key）
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pending_summaries ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, is_admin INTEGER NOT NULL, "
+            "conversation TEXT NOT NULL, context TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL)"
+        )
+        self._db.commit()
+    
+    def put(self, user_id: int, is_admin: bool, conversation: List[Dict], context: str = "") -> int:
+        """
+        写入一段待总结对话
+        
+        Args:
+            user_id: 用户ID
+            is_admin: 是否是 admin 用户（admin 用户的记忆在全局文件中）
+            conversation: 待总结对话
+            context: 这段对话的滚动摘要
+        
+        Returns:
+            队列条目 ID
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO pending_summaries (user_id, is_admin, conversation, context, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (user_id, int(is_admin), json.dumps(conversation, ensure_ascii=False), context, time.time())
+            )
+            self._db.commit()
+            return cursor.lastrowid
+    
+    def items(self) -> List[Dict]:
+        """
+        读取所有条目（按写入顺序）
+        
+        Returns:
+            [{"id", "user_id", "is_admin", "conversation", "context", "attempts"}]
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, user_id, is_admin, conversation, context, attempts FROM pending_summaries ORDER BY id"
+            ).fetchall()
+        return [
+            {
+                "id": row[0],
+                "user_id": row[1],
+                "is_admin": bool(row[2]),
+                "conversation": json.loads(row[3]),
+                "context": row[4],
+                "attempts": row[5],
+            }
+            for row in rows
+        ]
+    
+    def remove(self, item_id: int) -> None:
+        """
+        删除已总结的条目
+        
+        Args:
+            item_id: 队列条目 ID
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM pending_summaries WHERE id = ?", (item_id,))
+            self._db.commit()
+    
+    def record_failure(self, item_id: int) -> bool:
+        """
+        记录一次总结失败，超过最大次数时丢弃
+        
+        Args:
+            item_id: 队列条目 ID
+        
+        Returns:
+            条目是否保留（下次启动时重试）
+        """
+        with self._lock:
+            self._db.execute("UPDATE pending_summaries SET attempts = attempts + 1 WHERE id = ?", (item_id,))
+            deleted = self._db.execute(
+                "DELETE FROM pending_summaries WHERE id = ? AND attempts >= ?", (item_id, self.max_attempts)
+            ).rowcount
+            self._db.commit()
+            return deleted == 0
+    
+    def remove_users(self, user_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        删除指定用户的条目（用户被删除时调用）
+        
+        Args:
+            user_ids: 用户ID，为 None 时删除所有条目
+        
+        Returns:
+            删除的条目数
+        """
+        with self._lock:
+            if user_ids is None:
+                deleted = self._db.execute("DELETE FROM pending_summaries").rowcount
+            else:
+                deleted = self._db.executemany(
+                    "DELETE FROM pending_summaries WHERE user_id = ?", [(user_id,) for user_id in user_ids]
+                ).rowcount
+            self._db.commit()
+            return deleted
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM pending_summaries").fetchone()[0]
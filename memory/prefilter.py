@@ -0,0 +1,133 @@
+"""记忆预筛器 - 在调用 LLM 记忆过滤器之前用本地规则排除明显的闲聊"""
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+
+class HeuristicPreFilter:
+    """
+    本地启发式预筛器
+    
+    只做一件事：有把握时直接判定"不需要储存"，其余情况一律交给 LLM 过滤器。
+    因此规则偏保守——宁可多转发，也不能漏掉值得记忆的对话。
+    
+    只有两种情况会跳过（只看用户消息）：没有用户消息，或者全部由"哈哈哈""好困啊"这类无信息量的短句组成。
+    文本长度和第一人称代词都不作为跳过依据：中文常省略主语，"刚拿到驾照了！"这类短句同样值得记忆。
+    线索词和数字只用于说明转发原因（对应 FILTER_PROMPT 中的 7 类信息）。
+    """
+    
+    # 线索词：命中任意一个就转发给 LLM
+    CUE_PATTERN = re.compile("|".join([
+        # 个人档案
+        r"我叫", r"叫我", r"名字", r"昵称", r"我是", r"岁", r"生日", r"职业", r"工作", r"上班", r"公司", r"同事",
+        r"老板", r"学校", r"大学", r"专业", r"毕业", r"读书", r"老家", r"住在", r"城市",
+        # 稳定偏好
+        r"喜欢", r"讨厌", r"爱吃", r"爱看", r"爱玩", r"不爱", r"受不了", r"习惯", r"爱好", r"兴趣",
+        r"最爱", r"偏好", r"口味", r"平时", r"经常", r"总是", r"一直", r"每天", r"每周", r"周末",
+        r"过敏", r"不吃", r"不能吃", r"吃素",
+        # 重要关系
+        r"妈", r"爸", r"父母", r"家人", r"老婆", r"老公", r"男朋友", r"女朋友", r"对象", r"伴侣",
+        r"孩子", r"儿子", r"女儿", r"哥", r"姐", r"弟", r"妹", r"朋友", r"闺蜜", r"室友",
+        r"猫", r"狗", r"宠物",
+        # 重要事件
+        r"换工作", r"辞职", r"离职", r"面试", r"考试", r"考研", r"失恋", r"分手", r"结婚", r"离婚",
+        r"搬家", r"生病", r"住院", r"手术", r"怀孕", r"去世", r"毕业", r"录取", r"升职",
+        # 约定与计划、长期目标
+        r"提醒", r"记住", r"记得", r"别忘", r"以后", r"下次", r"明天", r"后天", r"下周", r"下个月",
+        r"明年", r"打算", r"计划", r"目标", r"坚持", r"准备", r"要去", r"想要",
+        # 聊天方式要求
+        r"称呼", r"语气", r"别老", r"不要再", r"别再", r"少说", r"多一点",
+        # 情绪长期议题
+        r"焦虑", r"失眠", r"抑郁", r"压力",
+    ]))
+    
+    # 无信息量的短句（整条消息完全匹配时视为闲聊）
+    TRIVIAL_PATTERN = re.compile(
+        r"^(哈+|嘿+|呵+|嗯+|哦+|噢+|啊+|好的?|行|可以|对|是的?|没事|谢谢|多谢|晚安|早安?|午安|你好|在吗|"
+        r"好困啊?|好累啊?|好无聊啊?|好冷啊?|好热啊?|无聊|困了|饿了|累了|拜拜|再见|ok|OK|[。.!！?？~～…\s]*)"
+        r"[。.!！?？~～…\s]*$"
+    )
+    DIGIT_PATTERN = re.compile(r"\d|[一二三四五六七八九十]+(岁|号|点|月)")
+    
+    def __init__(self):
+        """初始化预筛器"""
+        self.skipped = 0
+        self.forwarded = 0
+        # 预筛器在所有请求线程间共享
+        self._lock = threading.Lock()
+    
+    def classify(self, conversation: List[Dict[str, str]]) -> Tuple[bool, str]:
+        """
+        判断对话是否可以跳过 LLM 过滤
+        
+        Args:
+            conversation: 对话历史列表
+        
+        Returns:
+            (是否跳过, 原因)：跳过表示确定不需要储存
+        """
+        skip, reason = self._classify(conversation)
+        with self._lock:
+            if skip:
+                self.skipped += 1
+            else:
+                self.forwarded += 1
+        return skip, reason
+    
+    def _classify(self, conversation: List[Dict[str, str]]) -> Tuple[bool, str]:
+        user_messages = [
+            (msg.get("content") or "").strip()
+            for msg in conversation if msg.get("role") == "user"
+        ]
+        user_messages = [text for text in user_messages if text]
+        if not user_messages:
+            return True, "没有用户消息"
+        
+        if all(self.TRIVIAL_PATTERN.match(message) for message in user_messages):
+            return True, "只有无信息量的短句"
+        
+        text = "\n".join(user_messages)
+        cue = self.CUE_PATTERN.search(text)
+        if cue:
+            return False, f"包含线索词「{cue.group(0)}」"
+        if self.DIGIT_PATTERN.search(text):
+            return False, "包含数字（可能是年龄、日期或时间）"
+        return False, "无法确定，交给记忆过滤器判断"
+    
+    def stats(self) -> Dict[str, float]:
+        """
+        获取预筛统计
+        
+        Returns:
+            {"skipped", "forwarded", "skip_rate"}
+        """
+        with self._lock:
+            skipped, forwarded = self.skipped, self.forwarded
+        total = skipped + forwarded
+        return {
+            "skipped": skipped,
+            "forwarded": forwarded,
+            "skip_rate": skipped / total if total else 0.0
+        }
+
+
+_prefilter: Optional[HeuristicPreFilter] = None
+_prefilter_lock = threading.Lock()
+
+
+def get_prefilter() -> Optional[HeuristicPreFilter]:
+    """
+    获取全局共享的预筛器（统计数据在所有用户间汇总）
+    
+    Returns:
+        预筛器实例，MEMORY_PREFILTER_ENABLED=false 时返回 None
+    """
+    global _prefilter
+    if not Config.MEMORY_PREFILTER_ENABLED:
+        return None
+    with _prefilter_lock:
+        if _prefilter is None:
+            _prefilter = HeuristicPreFilter()
+        return _prefilter
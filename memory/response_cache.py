@@ -0,0 +1,224 @@
+"""记忆过滤/总结结果缓存
+
+MemoryFilter.should_save 和 MemorySummarizer.summarize 的结果只取决于模型、提示词和对话内容，
+同一段对话被重复分析（总结中途失败后重试、手动总结与自动总结重叠等）时直接返回缓存结果，不再调用上游。
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Any
+
+from config import Config
+
+
+def content_hash(text: str) -> str:
+    """
+    计算文本的内容哈希
+    
+    Args:
+        text: 文本
+    
+    Returns:
+        sha256 十六进制摘要
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prompt_version(prompt: str) -> str:
+    """
+    根据提示词内容生成版本号，修改提示词后旧缓存自动失效
+    
+    Args:
+        prompt: 提示词
+    
+    Returns:
+        版本号（哈希前 12 位）
+    """
+    return content_hash(prompt)[:12]
+
+
+class ResponseCache:
+    """
+    有界的结果缓存（LRU + TTL），可选持久化到 SQLite
+    
+    内存中最多保留 max_entries 条；配置了 path 时同时写入 SQLite，进程重启后仍可命中。
+    """
+    
+    # 每写入多少次清理一次持久化存储中的过期/超量条目
+    PRUNE_INTERVAL = 100
+    
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 86400, path: Optional[str] = None):
+        """
+        初始化缓存
+        
+        Args:
+            max_entries: 最多缓存的条目数
+            ttl_seconds: 条目有效期（秒）
+            path: SQLite 文件路径，为空时只缓存在内存中
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        # key -> (过期时间, JSON 字符串)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._writes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+    
+    @staticmethod
+    def make_key(namespace: str, model: str, version: str, conversation_text: str) -> str:
+        """
+        生成缓存键：(用途, 模型, 提示词版本, 对话内容哈希)
+        
+        Args:
+            namespace: 用途（如 filter、summarizer）
+            model: 模型名称
+            version: 提示词版本
+            conversation_text: 对话文本
+        
+        Returns:
+            缓存键
+        """
+        return f"{namespace}:{model}:{version}:{content_hash(conversation_text)}"
+    
+    def _record(self, namespace: str, hit: bool) -> None:
+        stats = self._stats.setdefault(namespace, {"hits": 0, "misses": 0})
+        stats["hits" if hit else "misses"] += 1
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        读取缓存
+        
+        Args:
+            key: 缓存键（make_key 的返回值）
+        
+        Returns:
+            缓存的结果（每次返回新的副本），未命中或已过期时返回 None
+        """
+        namespace = key.split(":", 1)[0]
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self._record(namespace, True)
+                return json.loads(entry[1])
+            if entry:
+                del self._entries[key]
+            
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM response_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row:
+                    self._put(key, row[1], row[0])
+                    self._record(namespace, True)
+                    return json.loads(row[0])
+            
+            self._record(namespace, False)
+            return None
+    
+    def set(self, key: str, value: Any) -> None:
+        """
+        写入缓存
+        
+        Args:
+            key: 缓存键
+            value: 可 JSON 序列化的结果
+        """
+        expires_at = time.time() + self.ttl_seconds
+        serialized = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._put(key, expires_at, serialized)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, serialized, expires_at)
+                )
+                self._writes += 1
+                if self._writes % self.PRUNE_INTERVAL == 0:
+                    self._prune_db()
+                self._db.commit()
+    
+    def _put(self, key: str, expires_at: float, serialized: str) -> None:
+        """写入内存并按 LRU 淘汰（调用方持有锁）"""
+        self._entries[key] = (expires_at, serialized)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def _prune_db(self) -> None:
+        """删除持久化存储中过期的条目，并只保留最近写入的 max_entries 条（调用方持有锁）"""
+        self._db.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM response_cache WHERE key NOT IN ("
+            "SELECT key FROM response_cache ORDER BY expires_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+    
+    def clear(self) -> None:
+        """清空缓存和统计"""
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM response_cache")
+                self._db.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取命中率统计
+        
+        Returns:
+            {"entries", "persistent", "namespaces": {用途: {"hits", "misses", "hit_rate"}}}
+        """
+        with self._lock:
+            namespaces = {}
+            for namespace, counts in self._stats.items():
+                total = counts["hits"] + counts["misses"]
+                namespaces[namespace] = {
+                    **counts,
+                    "hit_rate": counts["hits"] / total if total else 0.0
+                }
+            return {
+                "entries": len(self._entries),
+                "persistent": self._db is not None,
+                "namespaces": namespaces
+            }
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    获取全局共享的结果缓存（按配置创建）
+    
+    Returns:
+        缓存实例，RESPONSE_CACHE_ENABLED=false 时返回 None
+    """
+    global _response_cache
+    if not Config.RESPONSE_CACHE_ENABLED:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES,
+                ttl_seconds=Config.RESPONSE_CACHE_TTL,
+                path=Config.RESPONSE_CACHE_PATH
+            )
+        return _response_cache
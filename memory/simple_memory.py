@@ -1,6 +1,30 @@
 """简单内存记忆管理"""
+import re
 from typing import List, Dict, Optional
 
+# 中日韩字符
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    """
+    粗略估算消息列表的 token 数（不依赖分词器，见 memory/token_analysis.md）
+    
+    中文字符约 1.5 token，其他字符约 4 个 1 token，每条消息另有约 15 token 的格式开销。
+    
+    Args:
+        messages: 消息列表
+    
+    Returns:
+        估算的 token 数
+    """
+    total = 0
+    for msg in messages:
+        content = msg.get("content") or ""
+        cjk = len(_CJK_PATTERN.findall(content))
+        total += int(cjk * 1.5 + (len(content) - cjk) / 4) + 15
+    return total
+
 
 class SimpleMemory:
     """简单内存记忆管理器，在内存中存储对话历史"""
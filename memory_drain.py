@@ -0,0 +1,271 @@
+"""待总结对话排空 - 服务关闭和用户登出时总结内存中的待总结对话，来不及总结的存入持久化队列，下次启动时继续"""
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Union
+
+from chat_bot import ChatBot
+from chat_bot_manager import ChatBotManager
+from memory.pending_queue import PendingSummaryQueue
+
+# 按 (用户ID, ChatBot) 返回总结时使用的 API Key（None 表示使用默认 Key，路由提供者为 {后端名: Key}）；
+# ChatBot 为 None 表示用户当前没有 ChatBot，按默认提供者查询；用户已不存在时抛出 LookupError，这段对话直接丢弃
+KeyResolver = Callable[[int, Optional[ChatBot]], Union[str, Dict[str, Optional[str]], None]]
+
+
+class _DrainJob:
+    """一段待总结对话"""
+    
+    def __init__(
+        self,
+        user_id: int,
+        is_admin: bool,
+        conversation: List[Dict],
+        context: str,
+        bot: Optional[ChatBot] = None,
+        queue_id: Optional[int] = None
+    ):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.conversation = conversation
+        self.context = context
+        self.bot = bot  # 被移除的 ChatBot；为 None 时（从队列恢复）使用该用户当前的 ChatBot
+        self.queue_id = queue_id  # 已存入持久化队列时的条目 ID
+        self.outcome: Optional[str] = None  # summarized / failed / dropped
+        self.discarded = False  # 用户已被删除：不再总结，也不写入持久化队列
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+
+
+class MemoryDrainer:
+    """
+    用固定数量的后台线程总结待总结对话
+    
+    - 用户登出（ChatBot 被移除）：取出其待总结对话，在后台总结，不阻塞登出请求
+    - 服务关闭：取出所有 ChatBot 的待总结对话并行总结，在时间预算内没有完成的存入持久化队列
+    - 服务启动：在后台继续总结队列中的对话
+    
+    总结失败的对话同样存入队列。队列中不保存 API Key，总结时通过 key_resolver 按用户查询。
+    工作线程是守护线程，超出时间预算后不会阻止进程退出。
+    """
+    
+    def __init__(
+        self,
+        bot_manager: ChatBotManager,
+        key_resolver: KeyResolver,
+        workers: int = 4,
+        session_checker: Optional[Callable[[int], bool]] = None
+    ):
+        """
+        初始化排空器
+        
+        Args:
+            bot_manager: ChatBot 管理器（ChatBot 被移除时排空其待总结对话）
+            key_resolver: 按用户查询 API Key 的函数
+            workers: 同时总结的对话数
+            session_checker: 按用户ID判断是否还有登录会话；为恢复队列中的对话而创建的 ChatBot，
+                总结后用户没有会话时移除（不传时保留）
+        """
+        self.bot_manager = bot_manager
+        self.key_resolver = key_resolver
+        self.session_checker = session_checker
+        self.workers = max(1, workers)
+        self.pending_queue: Optional[PendingSummaryQueue] = None
+        self.closed = False
+        self._jobs: "queue.Queue[_DrainJob]" = queue.Queue()
+        self._active: Set[_DrainJob] = set()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._stats = {"submitted": 0, "summarized": 0, "failed": 0, "persisted": 0, "dropped": 0, "replayed": 0}
+        bot_manager.on_bot_removed(self.evict)
+    
+    def start(self, pending_queue: PendingSummaryQueue) -> int:
+        """
+        打开持久化队列，在后台继续总结上次没有完成的对话（应用启动时调用）
+        
+        Args:
+            pending_queue: 持久化队列
+        
+        Returns:
+            恢复的对话段数
+        """
+        self.pending_queue = pending_queue
+        self.closed = False
+        items = pending_queue.items()
+        for item in items:
+            self._submit(_DrainJob(
+                item["user_id"], item["is_admin"], item["conversation"], item["context"], queue_id=item["id"]
+            ))
+        self._stats["replayed"] += len(items)
+        return len(items)
+    
+    def evict(self, user_id: int, bot: ChatBot) -> None:
+        """
+        在后台总结被移除的 ChatBot 的待总结对话（ChatBotManager.remove_bot_for_user 的回调）
+        
+        Args:
+            user_id: 用户ID
+            bot: 被移除的 ChatBot
+        """
+        conversation, context = bot.take_pending()
+        if not conversation:
+            return
+        job = _DrainJob(user_id, bot.user_id is None, conversation, context, bot=bot)
+        if self.closed:
+            self._persist(job)
+        else:
+            self._submit(job)
+    
+    def drain(self, time_budget: float) -> Dict[str, int]:
+        """
+        总结所有 ChatBot 的待总结对话（应用关闭时调用），最多等待 time_budget 秒
+        
+        超时后不再开始新的总结，没有完成的对话（包括正在进行的）存入持久化队列；
+        正在进行的总结如果在进程退出前完成，会把自己从队列中删除。
+        
+        Args:
+            time_budget: 总时间预算（秒）
+        
+        Returns:
+            {"jobs": 本次等待的对话段数, "summarized": 完成数, "persisted": 存入队列数, "elapsed_ms"}
+        """
+        started_at = time.monotonic()
+        deadline = started_at + time_budget
+        for user_id, bot in self.bot_manager.active_bots():
+            conversation, context = bot.take_pending()
+            if conversation:
+                self._submit(_DrainJob(user_id, bot.user_id is None, conversation, context, bot=bot))
+        
+        with self._lock:
+            jobs = list(self._active)
+        for job in jobs:
+            job.done.wait(max(0.0, deadline - time.monotonic()))
+        self.closed = True
+        
+        persisted = sum(1 for job in jobs if self._persist(job))
+        return {
+            "jobs": len(jobs),
+            "summarized": sum(1 for job in jobs if job.outcome == "summarized"),
+            "persisted": persisted,
+            "elapsed_ms": round((time.monotonic() - started_at) * 1000),
+        }
+    
+    def forget_users(self, user_ids: Iterable[int], timeout: float = 5.0) -> int:
+        """
+        丢弃指定用户的待总结对话（用户被删除时调用，须在删除用户文件之前）
+        
+        还没开始的总结不再进行；正在进行的总结最多等待 timeout 秒，避免在用户文件删除之后再写入记忆文件，
+        其结果（包括失败）不再写入持久化队列；持久化队列中该用户的条目直接删除。
+        
+        Args:
+            user_ids: 用户ID
+            timeout: 等待正在进行的总结的最长时间（秒）
+        
+        Returns:
+            丢弃的对话段数
+        """
+        user_ids = set(user_ids)
+        with self._lock:
+            jobs = [job for job in self._active if job.user_id in user_ids]
+        for job in jobs:
+            with job.lock:
+                job.discarded = True
+        deadline = time.monotonic() + timeout
+        for job in jobs:
+            job.done.wait(max(0.0, deadline - time.monotonic()))
+        
+        removed = self.pending_queue.remove_users(user_ids) if self.pending_queue is not None else 0
+        return removed + sum(1 for job in jobs if job.queue_id is None)
+    
+    def _submit(self, job: _DrainJob) -> None:
+        with self._lock:
+            self._active.add(job)
+            self._stats["submitted"] += 1
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._worker, name=f"memory-drain-{len(self._threads)}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        self._jobs.put(job)
+    
+    def _worker(self) -> None:
+        while True:
+            job = self._jobs.get()
+            # 关闭后不再开始新的总结（drain 已经把它们存入队列）
+            if not self.closed:
+                self._run(job)
+    
+    def _run(self, job: _DrainJob) -> None:
+        """总结一段对话，按结果更新持久化队列"""
+        error = None
+        try:
+            if job.discarded:
+                raise LookupError("用户已被删除")
+            # 用户已重新登录时使用当前的 ChatBot，避免两个实例先后覆盖同一个记忆文件
+            bot = self.bot_manager.find_bot_for_user(job.user_id) or job.bot
+            # 先确认用户仍存在并查到 Key，再创建 ChatBot（用户已删除或没有 Key 时不创建实例）
+            api_key = self.key_resolver(job.user_id, bot)
+            created = bot is None
+            if created:
+                bot = self.bot_manager.get_bot_for_user(job.user_id, is_admin=job.is_admin)
+            try:
+                bot.summarize_conversation(job.conversation, job.context, api_key=api_key)
+            finally:
+                if created and self.session_checker is not None and not self.session_checker(job.user_id):
+                    # 只为这段对话创建的 ChatBot：用户没有登录会话，不再常驻内存
+                    self.bot_manager.remove_bot_for_user(job.user_id)
+            if bot is job.bot and self.bot_manager.has_bot_for_user(job.user_id):
+                # 总结期间用户重新登录：让新的 ChatBot 读取刚写入的记忆
+                self.bot_manager.get_bot_for_user(job.user_id, is_admin=job.is_admin).reload_files()
+            outcome = "summarized"
+        except LookupError as e:
+            error, outcome = e, "dropped"
+        except Exception as e:
+            error, outcome = e, "failed"
+        if error is not None:
+            print(f"[记忆系统] 用户 {job.user_id} 的待总结对话未能总结: {error}")
+        
+        with job.lock:
+            if job.discarded:
+                # 持久化队列中的条目由 forget_users 删除
+                outcome = "dropped"
+            elif outcome == "failed":
+                if job.queue_id is None:
+                    self._write_queue(job)
+                elif self.pending_queue is not None and not self.pending_queue.record_failure(job.queue_id):
+                    outcome = "dropped"
+            elif job.queue_id is not None and self.pending_queue is not None:
+                self.pending_queue.remove(job.queue_id)
+            job.outcome = outcome
+        with self._lock:
+            self._stats[outcome] += 1
+            self._active.discard(job)
+        job.done.set()
+    
+    def _persist(self, job: _DrainJob) -> bool:
+        """没有完成的对话存入持久化队列，返回是否新写入"""
+        with job.lock:
+            if job.outcome is not None or job.queue_id is not None or job.discarded:
+                return False
+            return self._write_queue(job)
+    
+    def _write_queue(self, job: _DrainJob) -> bool:
+        """写入持久化队列（调用方持有 job.lock）"""
+        if self.pending_queue is None:
+            print(f"[记忆系统] 持久化队列未打开，丢弃用户 {job.user_id} 的 {len(job.conversation)} 条待总结消息")
+            return False
+        job.queue_id = self.pending_queue.put(job.user_id, job.is_admin, job.conversation, job.context)
+        with self._lock:
+            self._stats["persisted"] += 1
+        return True
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        获取统计数据
+        
+        Returns:
+            {"active", "queued", "submitted", "summarized", "failed", "persisted", "dropped", "replayed"}
+        """
+        with self._lock:
+            stats = {"active": len(self._active), **self._stats}
+        stats["queued"] = len(self.pending_queue) if self.pending_queue is not None else 0
+        return stats
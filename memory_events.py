@@ -0,0 +1,144 @@
+"""记忆变化推送 - 把长期记忆的增量变化通过 SSE 推送给该用户打开的页面"""
+import asyncio
+from typing import AsyncIterator, Dict, Optional, Set
+
+from memory.long_term_memory import LongTermMemory
+from response_encoding import dumps
+
+# 订阅者的队列溢出（页面长时间没有读取）时发送的事件：页面需要重新获取全部记忆
+RESYNC_EVENT = "event: resync\ndata: {}\n\n"
+
+
+class MemoryEventBroker:
+    """
+    按用户分发记忆变化事件
+    
+    每个 SSE 连接对应一个有界队列，空闲时只占用一个等待中的协程，没有轮询；
+    记忆在任意线程中变化时，事件只序列化一次，再通过事件循环投递给该用户的所有连接。
+    """
+    
+    def __init__(self, queue_size: int = 64, keepalive_seconds: float = 25):
+        """
+        初始化事件分发器
+        
+        Args:
+            queue_size: 每个连接最多积压的事件数，超出时丢弃积压并通知页面重新获取
+            keepalive_seconds: 空闲连接发送心跳注释的间隔（防止代理断开空闲连接）
+        """
+        self.queue_size = queue_size
+        self.keepalive_seconds = keepalive_seconds
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.closed = False
+        self.published = 0
+        self.resyncs = 0
+    
+    @property
+    def subscriber_count(self) -> int:
+        """当前连接数"""
+        return sum(len(queues) for queues in self._subscribers.values())
+    
+    def attach(self, user_id: int, ltm: LongTermMemory) -> None:
+        """
+        监听某个用户的长期记忆（ChatBot 创建时调用）
+        
+        Args:
+            user_id: 用户ID
+            ltm: 该用户的长期记忆
+        """
+        ltm.add_listener(lambda _, event: self.publish(user_id, event))
+    
+    def publish(self, user_id: int, event: Dict) -> None:
+        """
+        发布记忆变化事件（可以在任意线程中调用）
+        
+        Args:
+            user_id: 用户ID
+            event: LongTermMemory 的变化事件
+        """
+        # 没有连接时不序列化
+        if not self._subscribers.get(user_id) or self._loop is None or self._loop.is_closed():
+            return
+        # 在调用线程中序列化，得到变化时刻的快照
+        message = f"id: {event['revision']}\nevent: memory\ndata: {dumps(event).decode('utf-8')}\n\n"
+        self._loop.call_soon_threadsafe(self._deliver, user_id, message)
+    
+    def _deliver(self, user_id: int, message: Optional[str]) -> None:
+        self.published += 1
+        for queue in list(self._subscribers.get(user_id, ())):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # 积压过多：丢弃积压的增量，让页面重新获取一次
+                self.resyncs += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC_EVENT)
+    
+    async def subscribe(self, user_id: int, revision: str) -> AsyncIterator[str]:
+        """
+        订阅某个用户的记忆变化（生成 SSE 文本）
+        
+        连接后先发送 hello 事件（当前修订号），页面据此判断是否需要重新获取；之后逐条发送 memory 事件。
+        
+        Args:
+            user_id: 用户ID
+            revision: 当前记忆修订号
+        
+        Yields:
+            SSE 消息
+        """
+        if self.closed:
+            return
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        try:
+            yield f"retry: 5000\nevent: hello\ndata: {dumps({'revision': revision}).decode('utf-8')}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=self.keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+    
+    def close(self) -> None:
+        """
+        结束所有连接，之后的订阅立即结束（可以在任意线程或信号处理函数中调用）
+        
+        uvicorn 要等所有连接结束后才执行应用的 shutdown 事件，因此需要在收到退出信号时调用，
+        否则空闲的长连接会让关闭一直等待。
+        """
+        self.closed = True
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._close_queues)
+    
+    def _close_queues(self) -> None:
+        for user_id in list(self._subscribers):
+            for queue in list(self._subscribers.get(user_id, ())):
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        获取统计数据
+        
+        Returns:
+            {"users", "subscribers", "published", "resyncs"}
+        """
+        return {
+            "users": len(self._subscribers),
+            "subscribers": self.subscriber_count,
+            "published": self.published,
+            "resyncs": self.resyncs
+        }
@@ -4,7 +4,10 @@
 """
 
 from persona.persona_manager import PersonaManager
+from persona.persona_store import PersonaStore, get_persona_store
 
 __all__ = [
     'PersonaManager',
+    'PersonaStore',
+    'get_persona_store',
 ]
\ No newline at end of file
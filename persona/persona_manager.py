@@ -1,8 +1,9 @@
 """人设管理器"""
 import json
 import os
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from pathlib import Path
+from persona.persona_store import get_persona_store
 
 
 class PersonaManager:
@@ -21,47 +22,68 @@ class PersonaManager:
         "备注": ""
     }
     
-    def __init__(self, user_id: Optional[int] = None):
+    def __init__(self, user_id: Optional[int] = None, base_dir: Optional[str] = None):
         """
         初始化人设管理器
         
         Args:
             user_id: 用户ID，如果提供则使用用户特定的文件路径，否则使用全局路径（向后兼容）
+            base_dir: 数据根目录（其下的 persona/ 存放人设文件），默认为当前目录
         """
         self.user_id = user_id
+        persona_dir = Path(base_dir or ".") / "persona"
         # 根据 user_id 确定文件路径
         if user_id is not None:
-            self.PERSONA_FILE = Path(f"persona/user_{user_id}_persona.json")
+            self.PERSONA_FILE = persona_dir / f"user_{user_id}_persona.json"
         else:
             # 向后兼容：如果未提供 user_id，使用全局文件
-            self.PERSONA_FILE = Path("persona/persona.json")
+            self.PERSONA_FILE = persona_dir / "persona.json"
         
         # 确保persona目录存在
-        self.PERSONA_FILE.parent.mkdir(exist_ok=True)
+        self.PERSONA_FILE.parent.mkdir(parents=True, exist_ok=True)
+        # 人设版本号：人设每次变化时递增，用于缓存系统消息（见 to_system_message）
+        self.version = 0
+        self._system_message_cache: Optional[Tuple[int, str]] = None
+        # 人设文件的 (修改时间, 大小)，用于判断是否需要重新读取
+        self._file_signature: Optional[Tuple[int, int]] = None
+        self.store = get_persona_store()
         self.persona = self.load_persona()
     
     def load_persona(self) -> Dict[str, str]:
         """
         从文件加载人设
         
+        文件不存在时使用默认人设（不创建文件，第一次保存时才写入）；
+        文件修改时间没有变化时使用缓存，不重新读取（见 PersonaStore）。
+        
         Returns:
-            人设字典
+            人设字典（与其他用户共享的实例，不能原地修改）
         """
-        if self.PERSONA_FILE.exists():
-            try:
-                with open(self.PERSONA_FILE, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # 确保所有字段都存在
-                    persona = self.DEFAULT_PERSONA.copy()
-                    persona.update(data)
-                    return persona
-            except Exception as e:
-                print(f"加载人设文件失败: {e}，使用默认人设")
-                return self.DEFAULT_PERSONA.copy()
-        else:
-            # 如果文件不存在，创建默认人设文件
-            self.save_persona(self.DEFAULT_PERSONA.copy())
-            return self.DEFAULT_PERSONA.copy()
+        try:
+            persona, self._file_signature = self.store.load(self.PERSONA_FILE, self.DEFAULT_PERSONA)
+            return persona
+        except Exception as e:
+            print(f"加载人设文件失败: {e}，使用默认人设")
+            self._file_signature = self.store.stat(self.PERSONA_FILE)
+            return self.store.intern(self.DEFAULT_PERSONA)
+    
+    def reload(self) -> bool:
+        """
+        从文件重新加载人设（文件被其他程序修改后调用）
+        
+        文件修改时间和大小没有变化时不读取文件。
+        
+        Returns:
+            人设是否有变化
+        """
+        if self.store.stat(self.PERSONA_FILE) == self._file_signature:
+            return False
+        persona = self.load_persona()
+        if persona == self.persona:
+            return False
+        self.persona = persona
+        self.version += 1
+        return True
     
     def save_persona(self, persona: Optional[Dict[str, str]] = None) -> bool:
         """
@@ -79,7 +101,9 @@ class PersonaManager:
         try:
             with open(self.PERSONA_FILE, 'w', encoding='utf-8') as f:
                 json.dump(persona, f, ensure_ascii=False, indent=2)
-            self.persona = persona
+            self.persona = self.store.intern(persona)
+            self._file_signature = self.store.remember_file(self.PERSONA_FILE, self.persona)
+            self.version += 1
             return True
         except Exception as e:
             print(f"保存人设文件失败: {e}")
@@ -108,8 +132,10 @@ class PersonaManager:
         if field not in self.DEFAULT_PERSONA:
             return False
         
-        self.persona[field] = value
-        return self.save_persona()
+        # 人设字典可能与其他用户共享，修改时先复制
+        persona = dict(self.persona)
+        persona[field] = value
+        return self.save_persona(persona)
     
     def update_persona(self, persona: Dict[str, str]) -> bool:
         """
@@ -121,49 +147,60 @@ class PersonaManager:
         Returns:
             是否更新成功
         """
-        # 只更新存在的字段
+        # 只更新存在的字段（人设字典可能与其他用户共享，修改时先复制）
+        updated = dict(self.persona)
         for key in self.DEFAULT_PERSONA.keys():
             if key in persona:
-                self.persona[key] = persona[key]
+                updated[key] = persona[key]
         
-        return self.save_persona()
+        return self.save_persona(updated)
     
     def to_system_message(self) -> str:
         """
         将人设转换为系统消息
         
+        按版本号缓存，人设没有变化时直接返回缓存；相同内容的人设在所有用户间只渲染一次。
+        
         Returns:
             系统消息字符串
         """
+        if self._system_message_cache is None or self._system_message_cache[0] != self.version:
+            message = self.store.system_message(self.persona, self._render_system_message)
+            self._system_message_cache = (self.version, message)
+        return self._system_message_cache[1]
+    
+    @staticmethod
+    def _render_system_message(persona: Dict[str, str]) -> str:
+        """把人设渲染为系统消息"""
         parts = []
         
         # 构建人设描述
-        if self.persona.get("任务"):
-            parts.append(f"【任务】{self.persona['任务']}")
+        if persona.get("任务"):
+            parts.append(f"【任务】{persona['任务']}")
         
-        if self.persona.get("角色"):
-            parts.append(f"【角色】{self.persona['角色']}")
+        if persona.get("角色"):
+            parts.append(f"【角色】{persona['角色']}")
         
-        if self.persona.get("外表"):
-            parts.append(f"【外表】{self.persona['外表']}")
+        if persona.get("外表"):
+            parts.append(f"【外表】{persona['外表']}")
         
-        if self.persona.get("经历"):
-            parts.append(f"【经历】{self.persona['经历']}")
+        if persona.get("经历"):
+            parts.append(f"【经历】{persona['经历']}")
         
-        if self.persona.get("性格"):
-            parts.append(f"【性格】{self.persona['性格']}")
+        if persona.get("性格"):
+            parts.append(f"【性格】{persona['性格']}")
         
-        if self.persona.get("喜好"):
-            parts.append(f"【喜好】{self.persona['喜好']}")
+        if persona.get("喜好"):
+            parts.append(f"【喜好】{persona['喜好']}")
         
-        if self.persona.get("经典台词"):
-            parts.append(f"【经典台词】{self.persona['经典台词']}")
+        if persona.get("经典台词"):
+            parts.append(f"【经典台词】{persona['经典台词']}")
         
-        if self.persona.get("输出示例"):
-            parts.append(f"【输出示例】{self.persona['输出示例']}")
+        if persona.get("输出示例"):
+            parts.append(f"【输出示例】{persona['输出示例']}")
         
-        if self.persona.get("备注"):
-            parts.append(f"【备注】{self.persona['备注']}")
+        if persona.get("备注"):
+            parts.append(f"【备注】{persona['备注']}")
         
         # 如果没有任何人设信息，使用默认提示
         if not parts:
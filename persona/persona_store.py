@@ -0,0 +1,189 @@
+"""人设存储 - 在所有用户和 ChatBot 之间共享相同的人设和系统消息"""
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+
+class PersonaStore:
+    """
+    人设存储
+    
+    - 相同内容的人设只保留一份（驻留），大多数用户使用的默认人设在内存中只有一个实例
+    - 渲染后的系统消息按人设内容缓存，相同人设只渲染一次
+    - 按文件修改时间缓存读取结果，文件没有变化时不重新读取（多个管理员 ChatBot 共享全局人设文件）
+    - 人设文件不存在时视为默认人设，不写文件
+    
+    驻留的人设字典会被多个 PersonaManager 共享，调用方不能原地修改，只能整体替换。
+    """
+    
+    def __init__(self, max_entries: int = 1024):
+        """
+        初始化人设存储
+        
+        Args:
+            max_entries: 最多驻留的不同人设数（超出时淘汰最久未使用的，淘汰只影响共享，不影响正确性）
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # 人设内容键 -> [人设字典, 渲染后的系统消息（未渲染时为 None）]
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        # 文件路径 -> (修改时间, 文件大小, 人设字典)
+        self._files: Dict[str, Tuple[int, int, Dict[str, str]]] = {}
+        self.file_reads = 0
+        self.file_cache_hits = 0
+        self.renders = 0
+        self.render_cache_hits = 0
+    
+    @staticmethod
+    def _key(persona: Dict[str, str]) -> str:
+        return json.dumps(persona, ensure_ascii=False, sort_keys=True)
+    
+    def _entry(self, persona: Dict[str, str]) -> list:
+        """获取人设对应的驻留条目（调用方持有锁）"""
+        key = self._key(persona)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = [dict(persona), None]
+            self._entries[key] = entry
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return entry
+    
+    def intern(self, persona: Dict[str, str]) -> Dict[str, str]:
+        """
+        获取与给定人设内容相同的共享实例
+        
+        Args:
+            persona: 人设字典
+        
+        Returns:
+            共享的人设字典（不能原地修改）
+        """
+        with self._lock:
+            return self._entry(persona)[0]
+    
+    def system_message(self, persona: Dict[str, str], render: Callable[[Dict[str, str]], str]) -> str:
+        """
+        获取人设的系统消息（相同人设只渲染一次）
+        
+        Args:
+            persona: 人设字典
+            render: 渲染函数
+        
+        Returns:
+            系统消息
+        """
+        with self._lock:
+            entry = self._entry(persona)
+            if entry[1] is not None:
+                self.render_cache_hits += 1
+                return entry[1]
+        message = render(entry[0])
+        with self._lock:
+            entry[1] = message
+            self.renders += 1
+        return message
+    
+    @staticmethod
+    def stat(path: Path) -> Optional[Tuple[int, int]]:
+        """获取文件的 (修改时间, 大小)，文件不存在时返回 None"""
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+    
+    def load(self, path: Path, default: Dict[str, str]) -> Tuple[Dict[str, str], Optional[Tuple[int, int]]]:
+        """
+        读取人设文件
+        
+        文件不存在时返回默认人设（不创建文件）；文件修改时间和大小与上次读取相同时直接返回缓存。
+        
+        Args:
+            path: 人设文件路径
+            default: 默认人设（文件中缺少的字段用默认值补全）
+        
+        Returns:
+            (共享的人设字典, 文件的 (修改时间, 大小))
+        
+        Raises:
+            OSError, ValueError: 文件读取或解析失败
+        """
+        signature = self.stat(path)
+        if signature is None:
+            return self.intern(default), None
+        
+        cache_key = str(path.resolve())
+        with self._lock:
+            cached = self._files.get(cache_key)
+            if cached is not None and cached[:2] == signature:
+                self.file_cache_hits += 1
+                return cached[2], signature
+        
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        # 确保所有字段都存在
+        persona = dict(default)
+        persona.update(data)
+        
+        with self._lock:
+            self.file_reads += 1
+            persona = self._entry(persona)[0]
+            self._files[cache_key] = (signature[0], signature[1], persona)
+        return persona, signature
+    
+    def remember_file(self, path: Path, persona: Dict[str, str]) -> Optional[Tuple[int, int]]:
+        """
+        记录刚写入的文件内容，避免之后重新读取
+        
+        Args:
+            path: 人设文件路径
+            persona: 写入的人设（共享实例）
+        
+        Returns:
+            文件的 (修改时间, 大小)
+        """
+        signature = self.stat(path)
+        if signature is not None:
+            with self._lock:
+                self._files[str(path.resolve())] = (signature[0], signature[1], persona)
+        return signature
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        获取统计数据
+        
+        Returns:
+            {"interned", "files", "file_reads", "file_cache_hits", "renders", "render_cache_hits"}
+        """
+        with self._lock:
+            return {
+                "interned": len(self._entries),
+                "files": len(self._files),
+                "file_reads": self.file_reads,
+                "file_cache_hits": self.file_cache_hits,
+                "renders": self.renders,
+                "render_cache_hits": self.render_cache_hits
+            }
+
+
+_store: Optional[PersonaStore] = None
+_store_lock = threading.Lock()
+
+
+def get_persona_store() -> PersonaStore:
+    """
+    获取全局共享的人设存储
+    
+    Returns:
+        人设存储实例
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PersonaStore()
+        return _store
@@ -0,0 +1,174 @@
+"""响应编码 - 更快的 JSON 序列化和 gzip/brotli 响应压缩"""
+import gzip
+import json
+from typing import Any, Iterable, List, Optional
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from static_assets import brotli, parse_accept_encoding
+
+try:
+    import orjson
+except ImportError:  # 未安装时使用标准库
+    orjson = None
+
+# 逐块发送的响应（SSE、NDJSON 导出）要尽快到达客户端，不缓冲、不压缩
+STREAMING_CONTENT_TYPES = ("text/event-stream", "application/x-ndjson")
+# 已经压缩过的内容再压缩没有收益
+INCOMPRESSIBLE_CONTENT_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip", "font/woff2")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    把对象序列化为 UTF-8 JSON（紧凑格式，不转义非 ASCII 字符）
+    
+    Args:
+        content: 可 JSON 序列化的对象
+    
+    Returns:
+        JSON 字节串
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """使用 orjson 序列化的 JSON 响应（未安装 orjson 时退回标准库，输出同样紧凑）"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class CompressionMiddleware:
+    """
+    gzip/brotli 响应压缩中间件
+    
+    按 Accept-Encoding 选择 gzip 或 br，只压缩一次性发送、不小于 minimum_size 的响应；
+    流式响应（SSE、NDJSON 或分多块发送的响应）、已设置 Content-Encoding 的响应
+    （如预压缩的静态资源）和 Cache-Control: no-transform 的响应原样透传。
+    
+    默认优先 gzip：动态压缩可承受的 brotli 质量（4）对记忆 JSON 的压缩率不如 gzip 6
+    （1000 条总结 17.6 KB 对 12.0 KB）。不小于 thread_min_size 的响应体在线程池中压缩，不阻塞事件循环。
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        encodings: Iterable[str] = ("gzip", "br"),
+        thread_min_size: int = 64 * 1024
+    ):
+        """
+        初始化压缩中间件
+        
+        Args:
+            app: 下游 ASGI 应用
+            minimum_size: 小于该字节数的响应不压缩
+            gzip_level: gzip 压缩级别（1-9）
+            brotli_quality: brotli 压缩质量（0-11，动态压缩建议 4-5）
+            encodings: 按优先级排列的可用编码
+            thread_min_size: 不小于该字节数的响应体在线程池中压缩
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.thread_min_size = thread_min_size
+        self.encodings: List[str] = [e for e in encodings if e != "br" or brotli is not None]
+    
+    def choose_encoding(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """
+        选择压缩编码
+        
+        Args:
+            accept_encoding: 请求的 Accept-Encoding 头
+        
+        Returns:
+            "gzip"、"br"，客户端不支持时返回 None
+        """
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in self.encodings:
+            if accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return encoding
+        return None
+    
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """
+        压缩响应体
+        
+        Args:
+            body: 响应体
+            encoding: "br" 或 "gzip"
+        
+        Returns:
+            压缩后的字节串
+        """
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        
+        start_message: Optional[Message] = None
+        passthrough = False
+        
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                # 先暂存响应头，等拿到响应体再决定是否压缩
+                start_message = message
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or "no-transform" in headers.get("cache-control", "")
+                    or content_type.startswith(STREAMING_CONTENT_TYPES + INCOMPRESSIBLE_CONTENT_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            
+            body = message.get("body", b"")
+            if message.get("more_body", False) or start_message is None:
+                # 分块发送的响应：原样透传
+                passthrough = True
+                if start_message is not None:
+                    await send(start_message)
+                await send(message)
+                return
+            
+            headers = MutableHeaders(raw=start_message["headers"])
+            if len(body) >= self.minimum_size and start_message["status"] not in (204, 304):
+                if len(body) >= self.thread_min_size:
+                    compressed = await anyio.to_thread.run_sync(self.compress, body, encoding)
+                else:
+                    compressed = self.compress(body, encoding)
+                if len(compressed) < len(body):
+                    body = compressed
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    etag = headers.get("etag")
+                    # 压缩后字节不同，强 ETag 改为弱 ETag
+                    if etag and not etag.startswith("W/"):
+                        headers["ETag"] = f"W/{etag}"
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+        
+        await self.app(scope, receive, send_wrapper)
@@ -1,9 +1,27 @@
 """密码加密和验证"""
-from passlib.context import CryptContext
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Optional
 
-# 创建密码上下文，使用 argon2 算法
-# argon2 是当前最安全的密码哈希算法，获得密码哈希竞赛冠军
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+
+@lru_cache(maxsize=None)
+def get_password_context():
+    """
+    获取密码上下文（第一次哈希或验证密码时才导入 passlib）
+    
+    使用 argon2 算法：argon2 是当前最安全的密码哈希算法，获得密码哈希竞赛冠军
+    """
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["argon2"], deprecated="auto")
+
+
+def __getattr__(name):
+    # 兼容 from security.password import pwd_context
+    if name == "pwd_context":
+        return get_password_context()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def hash_password(password: str) -> str:
@@ -19,7 +37,7 @@ def hash_password(password: str) -> str:
     Note:
         使用 argon2 算法，无密码长度限制（比 bcrypt 更安全）
     """
-    return pwd_context.hash(password)
+    return get_password_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -36,4 +54,26 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Note:
         使用 argon2 算法进行验证
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_context().verify(plain_password, hashed_password)
+
+
+def hash_passwords(passwords: List[str], workers: Optional[int] = None) -> List[str]:
+    """
+    批量哈希密码（多进程并行，argon2 是 CPU 密集型计算，线程无法并行）
+    
+    Args:
+        passwords: 明文密码列表
+        workers: 进程数，默认为 CPU 核数；为 1 或密码很少时在当前进程中计算
+    
+    Returns:
+        密码哈希列表（与输入顺序一致）
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(passwords) < workers * 2:
+        return [hash_password(password) for password in passwords]
+    
+    # 使用 spawn 启动子进程：Web 服务是多线程的，fork 可能复制到被其他线程持有的锁
+    context = multiprocessing.get_context("spawn")
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        return list(executor.map(hash_password, passwords, chunksize=chunksize))
@@ -186,7 +186,8 @@ const apiService = {
     },
     
     async getMemory() {
-        const response = await fetch(`${API_BASE}/memory`, { credentials: 'include' });
+        // 记忆页面不显示对话总结；记忆未变化时浏览器按 ETag 重新验证（304），不会重新下载
+        const response = await fetch(`${API_BASE}/memory?summary_limit=0`, { credentials: 'include' });
         if (!response.ok) {
             const errorData = await this.safeJsonResponse(response);
             throw new Error(errorData.detail || errorData.error || `请求失败 (${response.status})`);
@@ -898,21 +899,66 @@ function PersonaPage({ theme }) {
     );
 }
 
+// 把服务器推送的记忆变化（add / update / delete / set）应用到当前记忆上
+function applyMemoryChanges(memories, changes) {
+    const next = { ...memories };
+    for (const change of changes) {
+        const { op, category } = change;
+        // 记忆页面不显示对话总结
+        if (category === 'conversation_summaries') continue;
+        if (op === 'set') {
+            next[category] = change.value;
+            continue;
+        }
+        const items = Array.isArray(next[category]) ? [...next[category]] : [];
+        if (op === 'add') items.push(change.item);
+        else if (op === 'update') items[change.index] = change.item;
+        else if (op === 'delete') items.splice(change.index, 1);
+        next[category] = items;
+    }
+    return next;
+}
+
 // 记忆页面组件（A2UI 风格）
 function MemoryPage({ theme }) {
     const [memories, setMemories] = React.useState(null);
     const [loading, setLoading] = React.useState(true);
+    const revisionRef = React.useRef(null);
     const t = themes[theme];
     
     React.useEffect(() => {
         loadMemory();
+        
+        // 订阅记忆变化：只接收增量，修订号对不上（错过了事件）时才重新获取全部记忆
+        const events = new EventSource(`${API_BASE}/memory/events`, { withCredentials: true });
+        events.addEventListener('hello', (e) => {
+            const { revision } = JSON.parse(e.data);
+            if (revisionRef.current !== null && revision !== revisionRef.current) loadMemory(true);
+        });
+        events.addEventListener('memory', (e) => {
+            const event = JSON.parse(e.data);
+            if (event.base !== revisionRef.current) {
+                if (event.revision !== revisionRef.current) loadMemory(true);
+                return;
+            }
+            // reset：记忆被整体替换（重新加载、压缩），没有增量可用
+            if (event.changes.some((change) => change.op === 'reset')) {
+                loadMemory(true);
+                return;
+            }
+            revisionRef.current = event.revision;
+            setMemories((current) => current && applyMemoryChanges(current, event.changes));
+        });
+        events.addEventListener('resync', () => loadMemory(true));
+        return () => events.close();
     }, []);
     
-    const loadMemory = async () => {
-        setLoading(true);
+    const loadMemory = async (silent = false) => {
+        if (!silent) setLoading(true);
         try {
             const data = await apiService.getMemory();
             if (data.success) {
+                revisionRef.current = data.revision;
                 setMemories(data.memories);
             } else {
                 setMemories({});
@@ -921,7 +967,7 @@ function MemoryPage({ theme }) {
             console.error('加载记忆失败:', err);
             setMemories({});
         } finally {
-            setLoading(false);
+            if (!silent) setLoading(false);
         }
     };
     
@@ -1000,7 +1046,7 @@ function MemoryPage({ theme }) {
                 <div className="flex justify-between items-center mb-6">
                     <h2 className={`text-2xl font-semibold ${t.textPrimary}`}>长期记忆</h2>
                     <button
-                        onClick={loadMemory}
+                        onClick={() => loadMemory()}
                         className={`px-4 py-2.5 rounded-xl ${t.buttonBase} text-sm transition-all ${t.shadowHover}`}
                     >
                         刷新
@@ -1019,11 +1065,15 @@ function MemoryPage({ theme }) {
     );
 }
 
+// 可配置 API Key 的提供者
+const API_KEY_PROVIDERS = { deepseek: 'DeepSeek', openai: 'OpenAI', claude: 'Claude' };
+
 // 设置页面组件（A2UI 风格）
 function SettingsPage({ theme, setTheme }) {
     const [apiKeys, setApiKeys] = React.useState({
         deepseek: { value: '', status: null, masked: null },
         openai: { value: '', status: null, masked: null },
+        claude: { value: '', status: null, masked: null },
     });
     const [loading, setLoading] = React.useState(true);
     const [saving, setSaving] = React.useState({});
@@ -1039,7 +1089,7 @@ function SettingsPage({ theme, setTheme }) {
             const status = await apiService.getApiKeyStatus();
             const newKeys = { ...apiKeys };
             
-            for (const provider of ['deepseek', 'openai']) {
+            for (const provider of Object.keys(API_KEY_PROVIDERS)) {
                 const hasKey = status[`has_${provider}_key`] || false;
                 newKeys[provider].status = hasKey;
                 if (hasKey) {
@@ -1117,13 +1167,13 @@ function SettingsPage({ theme, setTheme }) {
                 </div>
                 
                 {/* API Key 设置 */}
-                {['deepseek', 'openai'].map((provider) => (
+                {Object.keys(API_KEY_PROVIDERS).map((provider) => (
                     <div key={provider} className={`${t.card} border rounded-2xl p-6 transition-colors`}>
                         <h3 className={`text-lg font-semibold mb-2 ${t.textPrimary}`}>
-                            {provider === 'deepseek' ? 'DeepSeek' : 'OpenAI'} API Key
+                            {API_KEY_PROVIDERS[provider]} API Key
                         </h3>
                         <p className={`text-sm mb-4 ${t.textSecondary}`}>
-                            配置你的 {provider === 'deepseek' ? 'DeepSeek' : 'OpenAI'} API Key
+                            配置你的 {API_KEY_PROVIDERS[provider]} API Key
                         </p>
                         <div className="space-y-4">
                             <div>
@@ -1134,7 +1184,7 @@ function SettingsPage({ theme, setTheme }) {
                                         ...apiKeys,
                                         [provider]: { ...apiKeys[provider], value: e.target.value }
                                     })}
-                                    placeholder={`输入 ${provider === 'deepseek' ? 'DeepSeek' : 'OpenAI'} API Key`}
+                                    placeholder={`输入 ${API_KEY_PROVIDERS[provider]} API Key`}
                                     className={`w-full px-4 py-3 rounded-xl ${t.input} ${t.inputFocus} border focus:outline-none focus:ring-2 transition-all`}
                                 />
                                 {apiKeys[provider].status && apiKeys[provider].masked && (
@@ -0,0 +1,293 @@
+"""静态资源管线 - 启动时为静态文件生成带内容哈希的文件名和 gzip/brotli 预压缩版本，常驻内存提供服务"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+try:
+    import brotlicffi as brotli
+except ImportError:  # 未安装时只提供 gzip
+    brotli = None
+
+# 参与指纹化的静态文件类型（备份文件、文档等不会被页面引用，跳过）
+ASSET_EXTENSIONS = (".jsx", ".js", ".css", ".svg", ".json", ".ico", ".png", ".woff2")
+# 值得压缩的文本类型
+COMPRESSIBLE_EXTENSIONS = (".html", ".jsx", ".js", ".css", ".svg", ".json")
+# 小于该大小的文件压缩收益抵不上解压开销
+MIN_COMPRESS_BYTES = 512
+# 文件名带内容哈希，内容变化时 URL 随之变化，可以永久缓存
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 入口页面引用的资源 URL 会变化，每次都要向服务器确认（内容未变时返回 304）
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+ASSETS_URL_PREFIX = "/assets/"
+_STATIC_REF_PATTERN = re.compile(r'(?P<attr>src|href)="/static/(?P<name>[^"?#]+)(?:\?[^"#]*)?"')
+
+mimetypes.add_type("text/javascript", ".jsx")
+
+
+class Asset:
+    """一个静态文件的所有预压缩版本"""
+    
+    __slots__ = ("name", "url", "content_type", "etag", "variants", "cache_control")
+    
+    def __init__(self, name: str, url: str, content: bytes, content_type: str, cache_control: str):
+        """
+        初始化资源并生成压缩版本
+        
+        Args:
+            name: 原始文件名（相对静态目录）
+            url: 对外的 URL
+            content: 文件内容
+            content_type: MIME 类型
+            cache_control: Cache-Control 头
+        """
+        self.name = name
+        self.url = url
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.etag = content_hash(content)
+        self.variants: Dict[str, bytes] = {"identity": content}
+        if len(content) >= MIN_COMPRESS_BYTES and name.endswith(COMPRESSIBLE_EXTENSIONS):
+            compressed = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(content, quality=11)
+            # 只保留确实更小的版本
+            for encoding, data in compressed.items():
+                if len(data) < len(content):
+                    self.variants[encoding] = data
+    
+    def select(self, accept_encoding: Optional[str]) -> Tuple[str, bytes]:
+        """
+        按 Accept-Encoding 选择版本（优先 br，其次 gzip）
+        
+        Args:
+            accept_encoding: 请求的 Accept-Encoding 头
+        
+        Returns:
+            (编码, 内容)
+        """
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return encoding, self.variants[encoding]
+        return "identity", self.variants["identity"]
+
+
+def content_hash(content: bytes, length: int = 12) -> str:
+    """
+    计算内容哈希
+    
+    Args:
+        content: 文件内容
+        length: 哈希长度（十六进制字符数）
+    
+    Returns:
+        哈希字符串
+    """
+    return hashlib.sha256(content).hexdigest()[:length]
+
+
+def hashed_name(name: str, digest: str) -> str:
+    """
+    生成带哈希的文件名：app.jsx -> app.<hash>.jsx
+    
+    Args:
+        name: 原始文件名
+        digest: 内容哈希
+    
+    Returns:
+        带哈希的文件名
+    """
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """
+    解析 Accept-Encoding 头
+    
+    Args:
+        header: 请求头的值，如 "gzip, deflate, br;q=0.9"
+    
+    Returns:
+        {编码: q 值}
+    """
+    accepted: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        encoding, _, params = part.strip().partition(";")
+        encoding = encoding.strip().lower()
+        if not encoding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[encoding] = q
+    return accepted
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    判断 If-None-Match 是否命中（弱比较，忽略 W/ 前缀）
+    
+    Args:
+        if_none_match: 请求的 If-None-Match 头
+        etag: 当前 ETag（带引号）
+    
+    Returns:
+        是否命中
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+class AssetPipeline:
+    """
+    静态资源管线
+    
+    启动时调用 build()：读取静态目录中的资源文件，生成 name.<hash>.ext 形式的 URL 和 gzip/brotli 版本；
+    把入口页面中 /static/xxx 的引用改写为带哈希的 URL，入口页面本身也常驻内存。之后的请求不再读磁盘。
+    修改静态文件后需要重启服务（/static/ 仍然直接提供磁盘上的文件）。
+    """
+    
+    def __init__(self, static_dir: str = "static", index_name: str = "index.html"):
+        """
+        初始化资源管线
+        
+        Args:
+            static_dir: 静态文件目录
+            index_name: 入口页面文件名
+        """
+        self.static_dir = static_dir
+        self.index_name = index_name
+        self.assets: Dict[str, Asset] = {}        # 带哈希的文件名 -> 资源
+        self.manifest: Dict[str, str] = {}        # 原始文件名 -> 带哈希的 URL
+        self.index: Optional[Asset] = None
+    
+    @property
+    def built(self) -> bool:
+        """是否已构建"""
+        return self.index is not None
+    
+    def build(self) -> Dict[str, str]:
+        """
+        构建所有资源
+        
+        Returns:
+            清单 {原始文件名: 带哈希的 URL}
+        
+        Raises:
+            FileNotFoundError: 入口页面不存在
+        """
+        assets: Dict[str, Asset] = {}
+        manifest: Dict[str, str] = {}
+        for name in self._asset_files():
+            with open(os.path.join(self.static_dir, name), "rb") as f:
+                content = f.read()
+            fingerprinted = hashed_name(name, content_hash(content))
+            url = ASSETS_URL_PREFIX + fingerprinted
+            assets[fingerprinted] = Asset(name, url, content, self._content_type(name), IMMUTABLE_CACHE_CONTROL)
+            manifest[name] = url
+        
+        with open(os.path.join(self.static_dir, self.index_name), "r", encoding="utf-8") as f:
+            html = self.rewrite_html(f.read(), manifest)
+        index = Asset(self.index_name, "/", html.encode("utf-8"), "text/html; charset=utf-8", REVALIDATE_CACHE_CONTROL)
+        
+        self.assets, self.manifest, self.index = assets, manifest, index
+        return manifest
+    
+    def _asset_files(self) -> Iterable[str]:
+        with os.scandir(self.static_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(ASSET_EXTENSIONS):
+                    yield entry.name
+    
+    @staticmethod
+    def _content_type(name: str) -> str:
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        return content_type
+    
+    @staticmethod
+    def rewrite_html(html: str, manifest: Mapping[str, str]) -> str:
+        """
+        把 HTML 中 src/href="/static/xxx[?v=...]" 的引用替换为带哈希的 URL（清单中没有的保持不变）
+        
+        Args:
+            html: HTML 内容
+            manifest: build() 返回的清单
+        
+        Returns:
+            改写后的 HTML
+        """
+        def replace(match: re.Match) -> str:
+            url = manifest.get(match.group("name"))
+            return f'{match.group("attr")}="{url}"' if url else match.group(0)
+        
+        return _STATIC_REF_PATTERN.sub(replace, html)
+    
+    def get(self, name: str) -> Optional[Asset]:
+        """
+        按带哈希的文件名查找资源
+        
+        Args:
+            name: 带哈希的文件名
+        
+        Returns:
+            资源，不存在时返回 None
+        """
+        return self.assets.get(name)
+    
+    @staticmethod
+    def respond(asset: Asset, headers: Mapping[str, str]) -> Tuple[int, bytes, Dict[str, str]]:
+        """
+        生成响应：协商编码，If-None-Match 命中时返回 304
+        
+        Args:
+            asset: 资源
+            headers: 请求头
+        
+        Returns:
+            (状态码, 响应体, 响应头)
+        """
+        encoding, body = asset.select(headers.get("accept-encoding"))
+        # 不同编码是不同的表示，ETag 需要区分
+        etag = f'"{asset.etag}"' if encoding == "identity" else f'"{asset.etag}-{encoding}"'
+        response_headers = {
+            "ETag": etag,
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(headers.get("if-none-match"), etag):
+            return 304, b"", response_headers
+        response_headers["Content-Type"] = asset.content_type
+        if encoding != "identity":
+            response_headers["Content-Encoding"] = encoding
+        return 200, body, response_headers
+    
+    def stats(self) -> Dict:
+        """
+        获取各资源的大小
+        
+        Returns:
+            {"brotli": 是否可用, "assets": {URL: {编码: 字节数}}}
+        """
+        assets = list(self.assets.values()) + ([self.index] if self.index else [])
+        return {
+            "brotli": brotli is not None,
+            "assets": {
+                asset.url: {encoding: len(data) for encoding, data in asset.variants.items()}
+                for asset in assets
+            }
+        }
@@ -18,6 +18,7 @@ try:
     from db.database import init_db, SessionLocal
     from db import crud
     from db.models import User
+    from db.user_files import purge_user_files
 except ImportError as e:
     print(f"❌ 导入模块失败: {e}")
     print("\n请确保：")
@@ -29,33 +30,14 @@ except ImportError as e:
 
 def cleanup_all_user_files():
     """
-    清理所有用户相关的文件数据
+    清理所有用户相关的文件数据（扫描一次目录，多线程并行删除）
     
     Returns:
         已删除的文件列表
     """
-    deleted_files = []
-    
-    # 清理所有用户长期记忆文件
-    memory_dir = Path("memory")
-    if memory_dir.exists():
-        for memory_file in memory_dir.glob("user_*_long_term_memory.json"):
-            try:
-                memory_file.unlink()
-                deleted_files.append(str(memory_file))
-            except Exception as e:
-                print(f"⚠️  删除文件失败 {memory_file}: {e}")
-    
-    # 清理所有用户人设文件
-    persona_dir = Path("persona")
-    if persona_dir.exists():
-        for persona_file in persona_dir.glob("user_*_persona.json"):
-            try:
-                persona_file.unlink()
-                deleted_files.append(str(persona_file))
-            except Exception as e:
-                print(f"⚠️  删除文件失败 {persona_file}: {e}")
-    
+    deleted_files, failed = purge_user_files()
+    for path, error in failed:
+        print(f"⚠️  删除文件失败 {path}: {error}")
     return deleted_files
 
 
@@ -66,7 +48,7 @@ def clear_all_users():
     print("=" * 80)
     print("\n⚠️  警告：此操作将：")
     print("  - 删除数据库中所有用户记录")
-    print("  - 删除所有用户会话记录（通过 cascade 自动删除）")
+    print("  - 删除所有用户会话记录")
     print("  - 删除所有用户的长期记忆文件 (memory/user_*_long_term_memory.json)")
     print("  - 删除所有用户的人设文件 (persona/user_*_persona.json)")
     print("\n⚠️  此操作不可恢复！")
@@ -86,27 +68,21 @@ def clear_all_users():
         init_db()
         db = SessionLocal()
         
-        # 获取所有用户
-        users = crud.get_all_users(db, limit=10000)  # 获取所有用户
+        # 统计用户数
+        user_count = db.query(User).count()
         
-        if not users:
+        if not user_count:
             print("\n✅ 数据库中没有用户记录，无需清理")
             db.close()
             return
         
-        print(f"\n找到 {len(users)} 个用户，开始清理...")
+        print(f"\n找到 {user_count} 个用户，开始清理...")
         
         # 清理所有用户文件
         deleted_files = cleanup_all_user_files()
         
-        # 删除数据库中的所有用户记录（Session 会通过 cascade 自动删除）
-        deleted_count = 0
-        for user in users:
-            try:
-                crud.delete_user(db, user.id)
-                deleted_count += 1
-            except Exception as e:
-                print(f"⚠️  删除用户 {user.username} (ID: {user.id}) 失败: {e}")
+        # 删除数据库中的所有用户和会话记录（一个事务中批量删除）
+        deleted_count = len(crud.delete_users(db))
         
         db.close()
         
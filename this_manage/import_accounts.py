@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+批量导入用户脚本
+使用说明：
+1. 准备 CSV（表头 username,password[,api_key]）或 JSONL（每行 {"username": ..., "password": ...}）文件
+2. 运行：python3 import_accounts.py students.csv
+   - --workers N      哈希密码的进程数（默认 CPU 核数）
+   - --batch-size N   每个事务插入的用户数（默认 1000）
+   - --dry-run        只校验和查重，不创建用户
+"""
+
+import argparse
+import sys
+
+# 尝试导入，如果失败给出友好提示
+try:
+    from db.database import init_db, SessionLocal
+    from db.user_import import detect_format, parse_user_records, import_users, format_report, SUPPORTED_FORMATS
+except ImportError as e:
+    print(f"❌ 导入模块失败: {e}")
+    print("\n请确保：")
+    print("1. 已安装所有依赖: pip install -r requirements.txt")
+    print("2. 如果使用虚拟环境，请先激活: source venv/bin/activate")
+    print("3. 如果使用 conda，请先激活: conda activate chat_bot")
+    sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量导入用户")
+    parser.add_argument("file", help="CSV 或 JSONL 文件")
+    parser.add_argument("--format", choices=SUPPORTED_FORMATS, help="文件格式（默认按扩展名判断）")
+    parser.add_argument("--workers", type=int, default=None, help="哈希密码的进程数")
+    parser.add_argument("--batch-size", type=int, default=1000, help="每个事务插入的用户数")
+    parser.add_argument("--dry-run", action="store_true", help="只校验和查重，不创建用户")
+    args = parser.parse_args()
+    
+    try:
+        with open(args.file, "r", encoding="utf-8-sig", newline="") as f:
+            records = parse_user_records(f, args.format or detect_format(args.file))
+    except (OSError, ValueError) as e:
+        print(f"❌ 读取文件失败: {e}")
+        sys.exit(1)
+    
+    try:
+        init_db()
+        db = SessionLocal()
+    except Exception as e:
+        print(f"❌ 数据库初始化失败: {e}")
+        print("请检查数据库文件权限和路径")
+        sys.exit(1)
+    
+    try:
+        print(f"读取到 {len(records)} 条记录，开始导入...")
+        report = import_users(db, records, workers=args.workers, batch_size=args.batch_size, dry_run=args.dry_run)
+        if args.dry_run:
+            print("（dry-run，未创建用户）")
+        print(f"✅ {format_report(report)}")
+    except Exception as e:
+        print(f"❌ 导入失败：{e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
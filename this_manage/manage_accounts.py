@@ -17,6 +17,7 @@ from getpass import getpass
 try:
     from db.database import init_db, SessionLocal
     from db import crud
+    from db.user_files import purge_user_files
 except ImportError as e:
     print(f"❌ 导入模块失败: {e}")
     print("\n请确保：")
@@ -26,33 +27,19 @@ except ImportError as e:
     sys.exit(1)
 
 
-def cleanup_user_files(user_id: int):
+def cleanup_user_files(user_ids):
     """
-    清理用户相关的文件数据
+    清理用户相关的文件数据（长期记忆、记忆归档、人设文件）
     
     Args:
-        user_id: 用户 ID
-    """
-    deleted_files = []
-    
-    # 清理长期记忆文件
-    memory_file = Path(f"memory/user_{user_id}_long_term_memory.json")
-    if memory_file.exists():
-        try:
-            memory_file.unlink()
-            deleted_files.append(str(memory_file))
-        except Exception as e:
-            print(f"⚠️  删除记忆文件失败: {e}")
-    
-    # 清理人设文件
-    persona_file = Path(f"persona/user_{user_id}_persona.json")
-    if persona_file.exists():
-        try:
-            persona_file.unlink()
-            deleted_files.append(str(persona_file))
-        except Exception as e:
-            print(f"⚠️  删除人设文件失败: {e}")
+        user_ids: 用户 ID 列表
     
+    Returns:
+        已删除的文件列表
+    """
+    deleted_files, failed = purge_user_files(user_ids)
+    for path, error in failed:
+        print(f"⚠️  删除文件失败 {path}: {error}")
     return deleted_files
 
 
@@ -120,25 +107,28 @@ def change_password(db):
 
 
 def delete_account(db):
-    """删除账户"""
+    """删除账户（找到多个用户时可以选择其中一个或全部）"""
     users = search_accounts(db)
     if not users:
         return
     
     if len(users) > 1:
-        try:
-            choice = int(input(f"\n请选择要删除的用户 (1-{len(users)}): ").strip())
-            if choice < 1 or choice > len(users):
+        choice = input(f"\n请选择要删除的用户 (1-{len(users)}，输入 'all' 删除以上全部): ").strip().lower()
+        if choice != "all":
+            try:
+                index = int(choice)
+            except ValueError:
+                print("❌ 请输入有效数字")
+                return
+            if index < 1 or index > len(users):
                 print("❌ 无效的选择")
                 return
-            user = users[choice - 1]
-        except ValueError:
-            print("❌ 请输入有效数字")
-            return
-    else:
-        user = users[0]
+            users = [users[index - 1]]
     
-    print(f"\n⚠️  警告：即将删除用户 '{user.username}' (ID: {user.id})")
+    if len(users) == 1:
+        print(f"\n⚠️  警告：即将删除用户 '{users[0].username}' (ID: {users[0].id})")
+    else:
+        print(f"\n⚠️  警告：即将删除以上 {len(users)} 个用户")
     print("这将删除：")
     print("  - 数据库中的用户记录")
     print("  - 所有关联的会话记录")
@@ -151,14 +141,17 @@ def delete_account(db):
         return
     
     try:
-        # 清理文件
-        deleted_files = cleanup_user_files(user.id)
+        user_ids = [user.id for user in users]
+        names = {user.id: user.username for user in users}
         
-        # 删除数据库记录（Session 会通过 cascade 自动删除）
-        success = crud.delete_user(db, user.id)
+        # 删除数据库记录（用户和会话在一个事务中批量删除）
+        deleted_ids = crud.delete_users(db, user_ids)
+        
+        # 清理文件
+        deleted_files = cleanup_user_files(user_ids)
         
-        if success:
-            print(f"✅ 账户删除成功！用户: {user.username}")
+        if deleted_ids:
+            print(f"✅ 账户删除成功！用户: {', '.join(names[user_id] for user_id in deleted_ids)}")
             if deleted_files:
                 print(f"   已删除文件: {', '.join(deleted_files)}")
         else:
@@ -1,21 +1,36 @@
 """FastAPI Web 应用入口"""
-from fastapi import FastAPI, Depends, HTTPException, Response, status, Cookie, Request
+from fastapi import FastAPI, Depends, HTTPException, Response, status, Cookie, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel, ConfigDict 
-from typing import Optional, List, Dict
+from typing import Callable, Optional, List, Dict, Union
 from sqlalchemy.orm import Session
+import asyncio
+import signal
+import weakref
 import traceback
 import logging
 
-from db.database import init_db, get_db
-from db import crud
+from db.database import init_db, get_db, SessionLocal
+from db import crud, user_import
+from db.user_files import purge_user_files
 from db.models import User
 from security.password import verify_password
 from security.auth import create_session, delete_session, get_current_user, count_active_sessions_for_user
+from chat_bot import ChatBot
 from chat_bot_manager import ChatBotManager
+from file_watcher import FileWatcher
+from memory_events import MemoryEventBroker
+from memory_drain import MemoryDrainer
+from static_assets import AssetPipeline, etag_matches
+from response_encoding import CompressionMiddleware, FastJSONResponse
+from api_providers.errors import ProviderError
+from memory.response_cache import get_response_cache
+from memory.pending_queue import PendingSummaryQueue
+from memory.prefilter import get_prefilter
+from config import Config
 import json
 
 # 配置日志
@@ -23,11 +38,74 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # 创建 FastAPI 应用
-app = FastAPI(title="AI聊天机器人 API", version="1.0.0")
+app = FastAPI(title="AI聊天机器人 API", version="1.0.0", default_response_class=FastJSONResponse)
 
 # 创建 ChatBot 管理器（全局单例）
 bot_manager = ChatBotManager()
 
+# 人设/记忆文件热加载（文件被直接编辑或删除时更新正在运行的 ChatBot）
+file_watcher = FileWatcher(bot_manager)
+
+# 记忆变化推送（SSE）：ChatBot 创建时开始监听其长期记忆
+memory_events = MemoryEventBroker(
+    queue_size=Config.MEMORY_EVENTS_QUEUE_SIZE,
+    keepalive_seconds=Config.MEMORY_EVENTS_KEEPALIVE
+)
+if Config.MEMORY_EVENTS_ENABLED:
+    bot_manager.on_bot_created(lambda user_id, bot: memory_events.attach(user_id, bot.long_term_memory))
+
+# 每个 ChatBot 一把锁：同一用户的聊天、总结、清空历史在线程池中逐个执行
+_bot_locks: "weakref.WeakKeyDictionary[ChatBot, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+async def _call_bot(bot: ChatBot, method: Callable, *args, **kwargs):
+    """
+    在线程池中调用 ChatBot 的同步方法，不阻塞事件循环
+    
+    上游调用在请求预算内可能等待、退避重试几十秒，直接在协程中调用会卡住所有用户的请求（包括 SSE 和静态资源）。
+    
+    Args:
+        bot: ChatBot 实例
+        method: 该 ChatBot 的方法
+        *args, **kwargs: 传给方法的参数
+    
+    Returns:
+        方法的返回值
+    """
+    lock = _bot_locks.get(bot)
+    if lock is None:
+        lock = _bot_locks[bot] = asyncio.Lock()
+    async with lock:
+        return await asyncio.to_thread(method, *args, **kwargs)
+
+
+def _close_streams_on_exit(close: Callable[[], None]) -> None:
+    """
+    收到退出信号时先结束长连接
+    
+    uvicorn 要等所有连接结束后才执行 shutdown 事件，SSE 长连接会让关闭一直等待，
+    因此在 uvicorn 安装的信号处理函数之前先调用 close。只能在主线程中安装。
+    
+    Args:
+        close: 结束长连接的函数
+    """
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+        
+        def handler(signum, frame, previous=previous):
+            close()
+            previous(signum, frame)
+        
+        try:
+            signal.signal(sig, handler)
+        except ValueError:  # 不在主线程中（如测试时在线程中运行服务）
+            return
+
+# 静态资源管线（启动时构建：带哈希的文件名 + 预压缩，入口页面常驻内存）
+asset_pipeline = AssetPipeline("static")
+
 
 def _is_admin_user(user: User) -> bool:
     """
@@ -42,7 +120,16 @@ def _is_admin_user(user: User) -> bool:
     return user.username.lower() == "admin"
 
 
-def _get_user_api_key_for_provider(user: User, provider_class_name: str) -> Optional[str]:
+def _provider_display_name(provider_class_name: str) -> str:
+    """根据 Provider 类名返回用于提示信息的提供者名称"""
+    if "DeepSeek" in provider_class_name:
+        return "DeepSeek"
+    if "Anthropic" in provider_class_name:
+        return "Claude"
+    return "OpenAI"
+
+
+def _get_user_api_key_for_provider(user: User, provider_class_name: str) -> Union[str, Dict[str, Optional[str]], None]:
     """
     从用户配置中获取指定 provider 的 API Key
     
@@ -55,13 +142,22 @@ def _get_user_api_key_for_provider(user: User, provider_class_name: str) -> Opti
         provider_class_name: Provider 类名（如 "DeepSeekProvider" 或 "OpenAIProvider"）
     
     Returns:
-        API Key 字符串，如果是 admin 且未配置则返回 None（使用默认 Key）
+        API Key 字符串，如果是 admin 且未配置则返回 None（使用默认 Key）；
+        路由提供者返回 {后端名: Key} 字典
     
     Raises:
         ValueError: 非 admin 用户未配置 API Key
     """
     is_admin = _is_admin_user(user)
     
+    # 模拟提供者不需要真实的 Key（用于离线压测）
+    if "Mock" in provider_class_name:
+        return None
+    
+    # 路由提供者：返回 {后端名: Key}，只路由到用户有 Key 的后端
+    if "Router" in provider_class_name:
+        return _get_user_api_keys_for_router(user, is_admin)
+    
     # 如果没有配置 api_key
     if not user.api_key:
         if is_admin:
@@ -69,7 +165,7 @@ def _get_user_api_key_for_provider(user: User, provider_class_name: str) -> Opti
             return None
         else:
             # 非 admin 用户必须配置 Key
-            provider_name = "DeepSeek" if "DeepSeek" in provider_class_name else "OpenAI"
+            provider_name = _provider_display_name(provider_class_name)
             raise ValueError(f"请先在设置页面配置 {provider_name} API Key 后才能使用聊天功能")
     
     try:
@@ -81,6 +177,8 @@ def _get_user_api_key_for_provider(user: User, provider_class_name: str) -> Opti
                 key = api_keys.get("deepseek")
             elif "OpenAI" in provider_class_name:
                 key = api_keys.get("openai")
+            elif "Anthropic" in provider_class_name:
+                key = api_keys.get("claude")
             else:
                 key = None
         else:
@@ -97,11 +195,94 @@ def _get_user_api_key_for_provider(user: User, provider_class_name: str) -> Opti
             return None
         else:
             # 非 admin 用户必须配置 Key
-            provider_name = "DeepSeek" if "DeepSeek" in provider_class_name else "OpenAI"
+            provider_name = _provider_display_name(provider_class_name)
             raise ValueError(f"请先在设置页面配置 {provider_name} API Key 后才能使用聊天功能")
     
     return key
 
+
+def _get_user_api_keys_for_router(user: User, is_admin: bool) -> Dict[str, Optional[str]]:
+    """
+    获取路由提供者可用的后端及 Key
+    
+    Args:
+        user: 用户对象
+        is_admin: 是否为 admin 用户
+    
+    Returns:
+        {后端名: Key}；admin 用户未配置的后端值为 None（使用系统默认 Key）
+    
+    Raises:
+        ValueError: 非 admin 用户没有配置任何后端的 API Key
+    """
+    api_keys = {}
+    if user.api_key:
+        try:
+            parsed = json.loads(user.api_key) if isinstance(user.api_key, str) else user.api_key
+            if isinstance(parsed, dict):
+                api_keys = parsed
+        except (json.JSONDecodeError, TypeError):
+            pass
+    
+    keys = {}
+    for name in Config.ROUTER_BACKENDS:
+        if name == "mock":
+            keys[name] = None
+        elif api_keys.get(name):
+            keys[name] = api_keys[name]
+        elif is_admin:
+            keys[name] = None
+    
+    if not keys:
+        raise ValueError("请先在设置页面配置至少一个 API Key 后才能使用聊天功能")
+    return keys
+
+
+# API_PROVIDER 配置值对应的 Provider 类名（用户还没有 ChatBot 时按它查询 Key）
+_PROVIDER_CLASS_NAMES = {
+    "openai": "OpenAIProvider",
+    "deepseek": "DeepSeekProvider",
+    "claude": "AnthropicProvider",
+    "mock": "MockProvider",
+    "router": "RouterProvider",
+}
+
+
+def _resolve_drain_api_key(user_id: int, bot: Optional[ChatBot]) -> Union[str, Dict[str, Optional[str]], None]:
+    """
+    排空待总结对话时按用户查询 API Key（持久化队列中不保存 Key）
+    
+    bot 为 None（从队列恢复且用户当前没有 ChatBot）时按默认提供者 API_PROVIDER 查询。
+    
+    Raises:
+        LookupError: 用户已被删除
+        ValueError: 非 admin 用户未配置 API Key
+    """
+    if bot is not None:
+        provider_class_name = bot.api_provider.__class__.__name__
+    else:
+        provider_class_name = _PROVIDER_CLASS_NAMES.get(Config.API_PROVIDER, "")
+    with SessionLocal() as db:
+        user = crud.get_user_by_id(db, user_id)
+        if user is None:
+            raise LookupError(f"用户 {user_id} 不存在")
+        return _get_user_api_key_for_provider(user, provider_class_name)
+
+
+def _has_active_session(user_id: int) -> bool:
+    """用户是否还有未过期的登录会话"""
+    with SessionLocal() as db:
+        return count_active_sessions_for_user(db, user_id) > 0
+
+
+# 待总结对话排空：用户登出和服务关闭时总结内存中的待总结对话，来不及的存入持久化队列，下次启动时继续
+memory_drainer = MemoryDrainer(
+    bot_manager,
+    _resolve_drain_api_key,
+    workers=Config.PENDING_DRAIN_WORKERS,
+    session_checker=_has_active_session
+)
+
 # 配置 CORS（允许前端访问）
 app.add_middleware(
     CORSMiddleware,
@@ -111,6 +292,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩（预压缩的静态资源和流式响应原样透传）
+if Config.RESPONSE_COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=Config.RESPONSE_COMPRESSION_MIN_BYTES,
+        gzip_level=Config.RESPONSE_COMPRESSION_GZIP_LEVEL,
+        brotli_quality=Config.RESPONSE_COMPRESSION_BROTLI_QUALITY,
+        thread_min_size=Config.RESPONSE_COMPRESSION_THREAD_MIN_BYTES
+    )
+
 # 挂载静态文件目录
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -134,6 +325,34 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
+def _provider_error_response(exc: ProviderError, content: Dict) -> JSONResponse:
+    """
+    把上游调用异常转换为对应状态码的 JSON 响应
+    
+    Args:
+        exc: 上游调用异常
+        content: 响应体
+    
+    Returns:
+        JSON 响应（限流和熔断时带 Retry-After 头）
+    """
+    headers = {}
+    if exc.retry_after:
+        headers["Retry-After"] = str(int(max(exc.retry_after, 1)))
+    return JSONResponse(status_code=exc.status_code, content=content, headers=headers)
+
+
+@app.exception_handler(ProviderError)
+async def provider_exception_handler(request: Request, exc: ProviderError):
+    """上游调用异常处理器（超时 504、限流 429、不可用/熔断 503、Key 无效 400）"""
+    logger.warning(f"上游调用失败: {exc}")
+    return _provider_error_response(exc, {
+        "detail": str(exc),
+        "error": "Upstream Error",
+        "type": type(exc).__name__
+    })
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """请求验证异常处理器"""
@@ -151,6 +370,34 @@ async def startup_event():
     """应用启动时初始化数据库"""
     init_db()
     print("✓ 数据库已初始化")
+    try:
+        asset_pipeline.build()
+        print(f"✓ 静态资源已构建（{len(asset_pipeline.manifest)} 个文件）")
+    except FileNotFoundError as e:
+        print(f"⚠️  静态资源构建失败: {e}")
+    if Config.MEMORY_EVENTS_ENABLED:
+        _close_streams_on_exit(memory_events.close)
+    if Config.HOT_RELOAD_ENABLED:
+        await file_watcher.start()
+        print("✓ 人设/记忆文件热加载已启动")
+    pending_queue = await asyncio.to_thread(
+        PendingSummaryQueue, Config.PENDING_QUEUE_PATH, Config.PENDING_QUEUE_MAX_ATTEMPTS
+    )
+    replayed = memory_drainer.start(pending_queue)
+    if replayed:
+        print(f"✓ 继续总结上次关闭时未完成的 {replayed} 段对话（后台进行）")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """应用关闭时停止文件监听，结束记忆推送连接，总结所有待总结对话"""
+    await file_watcher.stop()
+    memory_events.close()
+    report = await asyncio.to_thread(memory_drainer.drain, Config.PENDING_DRAIN_TIME_BUDGET)
+    if report["jobs"]:
+        print(f"✓ 已总结 {report['summarized']}/{report['jobs']} 段待总结对话（{report['elapsed_ms']} ms）")
+    if report["persisted"]:
+        print(f"✓ {report['persisted']} 段待总结对话已存入队列，下次启动时继续")
 
 
 # ========== 请求/响应模型 ==========
@@ -200,7 +447,7 @@ class ChatResponse(BaseModel):
 
 class ApiKeyUpdateRequest(BaseModel):
     """API Key 更新请求"""
-    provider: str  # "deepseek" 或 "openai"
+    provider: str  # "deepseek"、"openai" 或 "claude"
     api_key: Optional[str] = None  # None 表示清除
 
 
@@ -208,6 +455,7 @@ class ApiKeyStatusResponse(BaseModel):
     """API Key 状态响应"""
     has_deepseek_key: bool
     has_openai_key: bool
+    has_claude_key: bool = False
 
 
 class PersonaUpdateRequest(BaseModel):
@@ -249,7 +497,7 @@ async def login(
         request: 登录请求
         response: HTTP 响应对象（用于设置 Cookie）
         db: 数据库会话
-        
+    
     Returns:
         登录结果
     """
@@ -308,7 +556,7 @@ async def logout(
         session_id: 会话 ID（从 Cookie 获取）
         db: 数据库会话
         current_user: 当前登录用户
-        
+    
     Returns:
         登出结果
     """
@@ -337,7 +585,7 @@ async def get_current_user_info(
     
     Args:
         current_user: 当前用户（通过依赖注入获取）
-        
+    
     Returns:
         用户信息
     """
@@ -364,7 +612,7 @@ async def create_user(
         request: 创建用户请求
         db: 数据库会话
         current_user: 当前登录用户
-        
+    
     Returns:
         创建的用户信息
     """
@@ -388,8 +636,30 @@ async def create_user(
         raise HTTPException(status_code=500, detail=f"创建用户失败: {str(e)}")
 
 
+def _user_response(user: User) -> UserResponse:
+    """把用户对象转换为响应模型"""
+    return UserResponse(
+        id=user.id,
+        username=user.username,
+        api_key=user.api_key,
+        created_at=user.created_at.isoformat()
+    )
+
+
+def _set_next_cursor(response: Response, users: List[User], limit: int) -> None:
+    """
+    设置下一页游标响应头（X-Next-Cursor，值为本页最后一个用户的 ID，作为下一次请求的 after_id）
+    
+    本页不满时说明已经是最后一页，不设置游标。
+    """
+    if users and len(users) >= limit:
+        response.headers["X-Next-Cursor"] = str(users[-1].id)
+
+
 @app.get("/admin/users", response_model=List[UserResponse])
 async def list_users(
+    response: Response,
+    after_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
@@ -398,27 +668,26 @@ async def list_users(
     """
     获取所有用户列表（管理接口，需要登录）
     
+    按 ID 升序键集分页：下一页游标在响应头 X-Next-Cursor 中，作为 after_id 传入。
+    
     Args:
-        skip: 跳过的记录数
+        after_id: 上一页最后一个用户的 ID（游标）
+        skip: 跳过的记录数（旧的 OFFSET 分页，偏移越大越慢，建议改用 after_id）
         limit: 返回的最大记录数
         db: 数据库会话
         current_user: 当前登录用户
-        
+    
     Returns:
         用户列表
     """
     try:
-        users = crud.get_all_users(db=db, skip=skip, limit=limit)
+        if skip:
+            users = crud.get_all_users(db=db, skip=skip, limit=limit)
+        else:
+            users = crud.get_users_page(db=db, after_id=after_id, limit=limit)
+            _set_next_cursor(response, users, limit)
         
-        return [
-            UserResponse(
-                id=user.id,
-                username=user.username,
-                api_key=user.api_key,
-                created_at=user.created_at.isoformat()
-            )
-            for user in users
-        ]
+        return [_user_response(user) for user in users]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取用户列表失败: {str(e)}")
 
@@ -426,6 +695,8 @@ async def list_users(
 @app.get("/admin/users/search", response_model=List[UserResponse])
 async def search_users(
     username: str,
+    response: Response,
+    after_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
@@ -434,13 +705,16 @@ async def search_users(
     """
     根据用户名搜索用户列表（支持部分匹配，管理接口，需要登录）
     
+    不少于 3 个字符的搜索词使用 trigram 索引；分页方式与 /admin/users 相同。
+    
     Args:
         username: 用户名（支持部分匹配）
-        skip: 跳过的记录数
+        after_id: 上一页最后一个用户的 ID（游标）
+        skip: 跳过的记录数（旧的 OFFSET 分页）
         limit: 返回的最大记录数
         db: 数据库会话
         current_user: 当前登录用户
-        
+    
     Returns:
         匹配的用户列表
     """
@@ -448,28 +722,153 @@ async def search_users(
         if not username or not username.strip():
             raise HTTPException(status_code=400, detail="用户名不能为空")
         
-        users = crud.search_users_by_username(
-            db=db, 
-            username=username.strip(), 
-            skip=skip, 
-            limit=limit
-        )
-        
-        return [
-            UserResponse(
-                id=user.id,
-                username=user.username,
-                api_key=user.api_key,
-                created_at=user.created_at.isoformat()
+        if skip:
+            users = crud.search_users_by_username(
+                db=db, 
+                username=username.strip(), 
+                skip=skip, 
+                limit=limit
             )
-            for user in users
-        ]
+        else:
+            users = crud.search_users_page(db=db, username=username.strip(), after_id=after_id, limit=limit)
+            _set_next_cursor(response, users, limit)
+        
+        return [_user_response(user) for user in users]
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"搜索用户失败: {str(e)}")
 
 
+@app.get("/admin/users/export")
+async def export_users(
+    username: Optional[str] = None,
+    current_user: User = Depends(get_current_user)  # 需要登录
+):
+    """
+    流式导出用户（NDJSON，每行一个用户 JSON，供脚本使用，不受分页大小限制）
+    
+    Args:
+        username: 只导出用户名包含该字符串的用户（为空时导出所有用户）
+        current_user: 当前登录用户
+    
+    Returns:
+        application/x-ndjson 流式响应
+    """
+    keyword = username.strip() if username else None
+    
+    def generate():
+        # 流式响应在请求处理函数返回后才开始输出，使用独立的数据库会话
+        db = SessionLocal()
+        try:
+            # 按批输出，避免每个用户一次网络写入
+            lines = []
+            for user in crud.iter_users(db, username=keyword):
+                lines.append(json.dumps(_user_response(user).model_dump(), ensure_ascii=False))
+                if len(lines) >= 500:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@app.post("/admin/users/import")
+async def import_users(
+    request: Request,
+    format: str = "csv",
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)  # 需要登录
+):
+    """
+    批量导入用户（管理接口，仅 admin）
+    
+    请求体为 CSV（表头 username,password[,api_key]）或 JSONL 文件内容。
+    已存在和文件内重复的用户名会被跳过，密码在多进程中并行哈希，分批写入。
+    
+    Args:
+        request: 请求（读取原始请求体）
+        format: "csv" 或 "jsonl"
+        dry_run: 为 True 时只校验和查重，不创建用户
+        db: 数据库会话
+        current_user: 当前登录用户
+    
+    Returns:
+        导入报告（created、existing、duplicates、invalid、seconds、users_per_second 等）
+    """
+    if not _is_admin_user(current_user):
+        raise HTTPException(status_code=403, detail="仅管理员可以导入用户")
+    
+    try:
+        content = (await request.body()).decode("utf-8-sig")
+        records = user_import.parse_user_records(content.splitlines(), format)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"解析导入文件失败: {str(e)}")
+    
+    try:
+        # 哈希和写库都是阻塞操作，放到线程中执行
+        report = await asyncio.to_thread(user_import.import_users, db, records, dry_run=dry_run)
+        print(f"[用户导入] {user_import.format_report(report)}")
+        return report
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"导入用户失败: {str(e)}")
+
+
+class BulkDeleteUsersRequest(BaseModel):
+    """批量删除用户请求"""
+    user_ids: List[int]
+
+
+@app.post("/admin/users/bulk-delete")
+async def bulk_delete_users(
+    request: BulkDeleteUsersRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)  # 需要登录
+):
+    """
+    批量删除用户（管理接口，仅 admin）
+    
+    在一个事务中删除用户和会话记录，并行清理用户的记忆、人设文件，并移除这些用户正在运行的 ChatBot。
+    当前登录的管理员不会被删除。
+    
+    Args:
+        request: 要删除的用户 ID 列表
+        db: 数据库会话
+        current_user: 当前登录用户
+    
+    Returns:
+        {"deleted": 删除的用户数, "deleted_ids", "files_deleted", "files_failed", "bots_evicted"}
+    """
+    if not _is_admin_user(current_user):
+        raise HTTPException(status_code=403, detail="仅管理员可以删除用户")
+    
+    user_ids = [user_id for user_id in request.user_ids if user_id != current_user.id]
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="没有可删除的用户")
+    
+    try:
+        deleted_ids = await asyncio.to_thread(crud.delete_users, db, user_ids)
+        # 先移除 ChatBot、丢弃待总结对话，再删除文件，避免总结结果在删除之后重新写入记忆文件
+        bots_evicted = bot_manager.remove_bots_for_users(deleted_ids)
+        await asyncio.to_thread(memory_drainer.forget_users, deleted_ids)
+        deleted_files, failed_files = await asyncio.to_thread(purge_user_files, deleted_ids)
+        for path, error in failed_files:
+            print(f"[用户删除] 删除文件失败 {path}: {error}")
+        return {
+            "deleted": len(deleted_ids),
+            "deleted_ids": deleted_ids,
+            "files_deleted": len(deleted_files),
+            "files_failed": len(failed_files),
+            "bots_evicted": bots_evicted
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"删除用户失败: {str(e)}")
+
+
 @app.get("/admin/users/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
@@ -483,7 +882,7 @@ async def get_user(
         user_id: 用户 ID
         db: 数据库会话
         current_user: 当前登录用户
-        
+    
     Returns:
         用户信息
     """
@@ -499,17 +898,114 @@ async def get_user(
     )
 
 
+@app.get("/admin/stats/response-cache")
+async def get_response_cache_stats(
+    current_user: User = Depends(get_current_user)  # 需要登录
+):
+    """
+    获取记忆过滤/总结结果缓存的命中率（管理接口，仅 admin）
+    
+    Args:
+        current_user: 当前登录用户
+    
+    Returns:
+        缓存统计（未启用缓存时 enabled 为 false）
+    """
+    if not _is_admin_user(current_user):
+        raise HTTPException(status_code=403, detail="仅管理员可以查看")
+    
+    cache = get_response_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.get("/admin/stats/memory-events")
+async def get_memory_events_stats(
+    current_user: User = Depends(get_current_user)  # 需要登录
+):
+    """
+    获取记忆变化推送的连接数和事件数（管理接口，仅 admin）
+    
+    Args:
+        current_user: 当前登录用户
+    
+    Returns:
+        推送统计（未启用推送时 enabled 为 false）
+    """
+    if not _is_admin_user(current_user):
+        raise HTTPException(status_code=403, detail="仅管理员可以查看")
+    
+    if not Config.MEMORY_EVENTS_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **memory_events.stats()}
+
+
+@app.get("/admin/stats/memory-drain")
+async def get_memory_drain_stats(
+    current_user: User = Depends(get_current_user)  # 需要登录
+):
+    """
+    获取待总结对话排空的统计（管理接口，仅 admin）
+    
+    Args:
+        current_user: 当前登录用户
+    
+    Returns:
+        排空统计（进行中、持久化队列中的对话段数，以及总结、失败、存入队列、丢弃的次数）
+    """
+    if not _is_admin_user(current_user):
+        raise HTTPException(status_code=403, detail="仅管理员可以查看")
+    
+    return await asyncio.to_thread(memory_drainer.stats)
+
+
+@app.get("/admin/stats/memory-prefilter")
+async def get_memory_prefilter_stats(
+    current_user: User = Depends(get_current_user)  # 需要登录
+):
+    """
+    获取记忆预筛的跳过率（管理接口，仅 admin）
+    
+    Args:
+        current_user: 当前登录用户
+    
+    Returns:
+        预筛统计（未启用预筛时 enabled 为 false）
+    """
+    if not _is_admin_user(current_user):
+        raise HTTPException(status_code=403, detail="仅管理员可以查看")
+    
+    prefilter = get_prefilter()
+    if prefilter is None:
+        return {"enabled": False}
+    return {"enabled": True, **prefilter.stats()}
+
+
+def _asset_response(asset, request: Request) -> Response:
+    """把预构建的资源转换为响应（协商压缩编码，ETag 命中时返回 304）"""
+    status_code, body, headers = AssetPipeline.respond(asset, request.headers)
+    return Response(content=body, status_code=status_code, headers=headers)
+
+
 @app.get("/", response_class=HTMLResponse)
-async def read_root():
-    """返回主页面"""
-    try:
-        with open("static/index.html", "r", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
+async def read_root(request: Request):
+    """返回主页面（启动时已加载到内存）"""
+    if asset_pipeline.index is None:
         return HTMLResponse(
             content="<h1>错误：找不到 index.html 文件</h1>",
             status_code=404
         )
+    return _asset_response(asset_pipeline.index, request)
+
+
+@app.get("/assets/{name}")
+async def get_asset(name: str, request: Request):
+    """返回带内容哈希的静态资源（可永久缓存）"""
+    asset = asset_pipeline.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="资源不存在")
+    return _asset_response(asset, request)
 
 
 # ========== Profile API 接口 ==========
@@ -525,7 +1021,7 @@ async def get_api_key_status(
         current_user: 当前登录用户
     
     Returns:
-        API Key 状态（是否已配置 DeepSeek 和 OpenAI 的 Key）
+        API Key 状态（是否已配置 DeepSeek、OpenAI 和 Claude 的 Key）
     """
     # 解析 api_key 字段（可能是 JSON 字符串或单个字符串）
     api_keys = {}
@@ -542,7 +1038,8 @@ async def get_api_key_status(
     
     return ApiKeyStatusResponse(
         has_deepseek_key=bool(api_keys.get("deepseek")),
-        has_openai_key=bool(api_keys.get("openai"))
+        has_openai_key=bool(api_keys.get("openai")),
+        has_claude_key=bool(api_keys.get("claude"))
     )
 
 
@@ -566,10 +1063,10 @@ async def update_api_key(
     import json
     
     # 验证 provider
-    if request.provider not in ["deepseek", "openai"]:
+    if request.provider not in ["deepseek", "openai", "claude"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"不支持的 provider: {request.provider}，支持: deepseek, openai"
+            detail=f"不支持的 provider: {request.provider}，支持: deepseek, openai, claude"
         )
     
     # 读取现有的 api_keys（如果有）
@@ -590,7 +1087,7 @@ async def update_api_key(
         # 清除该 provider 的 key
         api_keys.pop(request.provider, None)
         # 如果没有其他 key，清除 legacy key
-        if not api_keys.get("deepseek") and not api_keys.get("openai") and "legacy" in api_keys:
+        if not any(api_keys.get(name) for name in ("deepseek", "openai", "claude")) and "legacy" in api_keys:
             api_keys.pop("legacy", None)
     
     # 将 api_keys 转换为 JSON 字符串存储
@@ -621,13 +1118,13 @@ async def get_api_key_for_provider(
     获取指定 provider 的 API Key（用于前端显示已配置的 key 的部分内容）
     
     Args:
-        provider: provider 名称（deepseek 或 openai）
+        provider: provider 名称（deepseek、openai 或 claude）
         current_user: 当前登录用户
     
     Returns:
         API Key 的部分显示（只显示前4位和后4位，中间用*代替）
     """
-    if provider not in ["deepseek", "openai"]:
+    if provider not in ["deepseek", "openai", "claude"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"不支持的 provider: {provider}"
@@ -668,7 +1165,7 @@ async def chat(
     Args:
         request: 聊天请求（包含用户消息）
         current_user: 当前登录用户（通过依赖注入获取）
-        
+    
     Returns:
         聊天响应（包含AI回复或错误信息）
     """
@@ -697,16 +1194,22 @@ async def chat(
                 error=str(e)
             )
         
-        # 调用 ChatBot 处理消息（同步函数）
+        # 调用 ChatBot 处理消息（同步函数，在线程池中执行）
         # admin 用户如果没有配置 Key，user_api_key 为 None，会使用默认 Key
         # 非 admin 用户必须有 Key（已在上面检查）
-        response_text = bot.chat(request.message.strip(), api_key=user_api_key)
+        response_text = await _call_bot(
+            bot, bot.chat, request.message.strip(), api_key=user_api_key, background_summary=True
+        )
         
         return ChatResponse(
             success=True,
             response=response_text
         )
-        
+    
+    except ProviderError as e:
+        # 上游调用失败：保持响应体格式不变，用状态码区分失败原因
+        print(f"聊天接口上游错误 (用户 {current_user.id}): {e}")
+        return _provider_error_response(e, ChatResponse(success=False, error=str(e)).model_dump())
     except Exception as e:
         # 记录错误日志（生产环境应使用 proper logging）
         print(f"聊天接口错误 (用户 {current_user.id}): {e}")
@@ -779,8 +1282,8 @@ async def update_persona(
         success = bot.persona_manager.update_persona(request.persona)
         
         if success:
-            # 重新加载人设并更新系统消息
-            bot.reload_persona()
+            # 人设已在内存中更新，只需刷新系统消息（不重新读取文件）
+            bot.refresh_system_message()
             
             return PersonaResponse(
                 success=True,
@@ -807,16 +1310,27 @@ class MemoryResponse(BaseModel):
     success: bool
     memories: Optional[Dict] = None
     message: Optional[str] = None
+    revision: Optional[str] = None
 
 
 @app.get("/api/memory", response_model=MemoryResponse)
 async def get_memory(
+    request: Request,
+    categories: Optional[str] = None,
+    summary_limit: Optional[int] = Query(None, ge=0),
+    summary_cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
     """
     获取当前用户的长期记忆
     
+    响应带 ETag（记忆修订号），记忆没有变化时对 If-None-Match 返回 304。
+    对话总结按时间倒序分页：下一页游标在响应头 X-Next-Cursor 中，作为 summary_cursor 传入。
+    
     Args:
+        categories: 只返回这些字段（逗号分隔，如 preference,plan,notes_for_future），默认全部
+        summary_limit: 每页返回的对话总结条数（0 表示不返回），默认全部
+        summary_cursor: 对话总结游标（上一页最后一条的 created_at）
         current_user: 当前登录用户
     
     Returns:
@@ -829,15 +1343,31 @@ async def get_memory(
         # 获取该用户的 ChatBot 实例
         bot = bot_manager.get_bot_for_user(current_user.id, is_admin=is_admin)
         
-        # 重新加载记忆（确保获取最新数据）
-        bot.long_term_memory.memories = bot.long_term_memory.load_memories()
+        # 热加载运行时内存中的记忆就是最新的；否则检查文件是否被修改（只比较修改时间和大小）
+        if not file_watcher.running:
+            bot.reload_files()
         
-        # 获取所有记忆
-        memories = bot.long_term_memory.get_all_memories()
+        ltm = bot.long_term_memory
+        # 浏览器按 URL 缓存，切换账号后可能带着其他用户的 ETag，因此加上用户 ID
+        revision = ltm.revision
+        etag = f'"{current_user.id}-{revision}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
         
-        return MemoryResponse(
-            success=True,
-            memories=memories
+        fields = [c.strip() for c in categories.split(",") if c.strip()] if categories else None
+        memories, next_cursor = ltm.get_memories_page(
+            categories=fields,
+            summary_limit=summary_limit,
+            summary_cursor=summary_cursor
+        )
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        
+        # 记忆可能有几百 KB，直接序列化，跳过按 response_model 重新校验整个字典
+        return FastJSONResponse(
+            {"success": True, "memories": memories, "message": None, "revision": revision},
+            headers=headers
         )
     except Exception as e:
         print(f"获取长期记忆错误 (用户 {current_user.id}): {e}")
@@ -847,6 +1377,75 @@ async def get_memory(
         )
 
 
+@app.get("/api/memory/events")
+async def memory_events_stream(session_id: Optional[str] = Cookie(None)):
+    """
+    订阅当前用户的记忆变化（SSE）
+    
+    事件：hello（连接时的记忆修订号）、memory（增量变化，见 LongTermMemory.add_listener）、
+    resync（积压过多，需要重新获取 /api/memory）。
+    
+    Args:
+        session_id: 会话 ID（Cookie）
+    
+    Returns:
+        text/event-stream 响应；未启用推送时返回 204（浏览器不再重连）
+    """
+    if not Config.MEMORY_EVENTS_ENABLED:
+        return Response(status_code=204)
+    
+    # 长连接不占用数据库会话：认证完立即关闭
+    with SessionLocal() as db:
+        current_user = get_current_user(session_id=session_id, db=db)
+        user_id, is_admin = current_user.id, _is_admin_user(current_user)
+    
+    bot = bot_manager.get_bot_for_user(user_id, is_admin=is_admin)
+    return StreamingResponse(
+        memory_events.subscribe(user_id, bot.long_term_memory.revision),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+class CompactMemoryResponse(BaseModel):
+    """记忆压缩响应"""
+    success: bool
+    message: str
+    report: Optional[Dict] = None
+
+
+@app.post("/api/memory/compact", response_model=CompactMemoryResponse)
+async def compact_memory(
+    dry_run: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    压缩当前用户的长期记忆（合并近似重复、限制每类条数、归档旧的对话总结）
+    
+    Args:
+        dry_run: 为 true 时只返回压缩报告，不修改记忆
+        current_user: 当前登录用户
+    
+    Returns:
+        压缩报告（文件大小和系统提示 token 数的前后对比）
+    """
+    try:
+        is_admin = _is_admin_user(current_user)
+        bot = bot_manager.get_bot_for_user(current_user.id, is_admin=is_admin)
+        report = bot.compact_memory(dry_run=dry_run)
+        return CompactMemoryResponse(
+            success=True,
+            message="预览完成" if dry_run else "长期记忆已压缩",
+            report=report
+        )
+    except Exception as e:
+        print(f"压缩长期记忆错误 (用户 {current_user.id}): {e}")
+        return CompactMemoryResponse(
+            success=False,
+            message=f"压缩长期记忆失败: {str(e)}"
+        )
+
+
 class SummarizeResponse(BaseModel):
     """总结响应"""
     success: bool
@@ -891,16 +1490,13 @@ async def summarize_conversation(
             )
         
         # 强制总结对话（传递用户的 API Key）
-        bot.force_summarize(api_key=user_api_key)
-        
-        # 重新加载长期记忆以确保数据已保存
-        bot.long_term_memory.memories = bot.long_term_memory.load_memories()
+        await _call_bot(bot, bot.force_summarize, api_key=user_api_key)
         
         return SummarizeResponse(
             success=True,
             message="对话总结完成"
         )
-        
+    
     except Exception as e:
         print(f"总结对话错误 (用户 {current_user.id}): {e}")
         import traceback
@@ -938,7 +1534,7 @@ async def clear_history(
         bot = bot_manager.get_bot_for_user(current_user.id, is_admin=is_admin)
         
         # 清空历史
-        bot.clear_history()
+        await _call_bot(bot, bot.clear_history)
         bot.pending_conversation = []  # 同时清空待总结的对话
         
         return ClearHistoryResponse(